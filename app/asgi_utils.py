@@ -0,0 +1,27 @@
+"""ASGIミドルウェアで共有するヘッダーの読み取りとJSONレスポンスの送信"""
+import json
+from typing import Any, Iterable, Optional, Tuple
+
+def get_header(headers: Iterable[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    """ASGIのヘッダーから最初に一致する値を返します（nameは小文字のバイト列）"""
+    for key, value in headers:
+        if key == name:
+            return value
+    return None
+
+def render_json(content: Any) -> bytes:
+    """StarletteのJSONResponseと同じ形式でシリアライズします"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+async def send_json(send, status_code: int, body: bytes, headers: Tuple[Tuple[bytes, bytes], ...] = ()) -> None:
+    """シリアライズ済みのJSONをレスポンスとして送信します"""
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-length", str(len(body)).encode()),
+            (b"content-type", b"application/json"),
+            *headers
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
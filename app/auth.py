@@ -0,0 +1,72 @@
+import hmac
+import os
+from typing import Optional, Union
+from fastapi import HTTPException, Header
+
+# API Key認証の設定
+API_KEY_NAME = "X-API-Key"
+
+# WEBHOOK_API_KEYのバイト列（最初に使うときに一度だけ読み込む）
+_api_key: Optional[bytes] = None
+_api_key_loaded = False
+
+def set_api_key(api_key: Optional[str] = None) -> None:
+    """
+    API Keyを設定します（キーを変更した場合やテストで使う）
+
+    Args:
+        api_key: 新しいAPI Key（Noneの場合はWEBHOOK_API_KEYから読み込み直す。空文字列の場合はすべて拒否する）
+    """
+    global _api_key, _api_key_loaded
+    value = os.getenv("WEBHOOK_API_KEY") if api_key is None else api_key
+    _api_key = value.encode() if value else None
+    _api_key_loaded = True
+
+def _expected_api_key() -> Optional[bytes]:
+    if not _api_key_loaded:
+        set_api_key()
+    return _api_key
+
+def is_valid_api_key(api_key: Union[str, bytes, None]) -> bool:
+    """
+    API Keyが正しいかどうかを返します（API Keyが未設定の場合は常にFalse）
+
+    比較にかかる時間から正しいキーを推測されないよう、一定時間で比較します。
+    ヘッダーの値はバイト列のまま渡せます（文字列の場合はStarletteと同じくlatin-1として扱う）。
+    """
+    expected = _expected_api_key()
+    if expected is None or api_key is None:
+        return False
+    if isinstance(api_key, str):
+        try:
+            api_key = api_key.encode("latin-1")
+        except UnicodeEncodeError:
+            return False
+    return hmac.compare_digest(api_key, expected)
+
+def get_api_key(api_key: str = Header(None, alias=API_KEY_NAME)) -> str:
+    """API Keyを取得する関数"""
+    if not is_valid_api_key(api_key):
+        raise HTTPException(
+            status_code=401,
+            detail={"message": "Invalid API Key"}
+        )
+    
+    return api_key
+
+def is_admin_key(api_key: Optional[str]) -> bool:
+    """管理者用API Keyが正しいかどうかを返します（ADMIN_API_KEYが未設定の場合は常にFalse）"""
+    expected = os.getenv("ADMIN_API_KEY")
+    if not expected or api_key is None:
+        return False
+    return hmac.compare_digest(api_key.encode(), expected.encode())
+
+def get_admin_api_key(api_key: str = Header(None, alias="X-Admin-Key")) -> str:
+    """管理者用API Keyを取得する関数"""
+    if not is_admin_key(api_key):
+        raise HTTPException(
+            status_code=401,
+            detail={"message": "Invalid Admin API Key"}
+        )
+
+    return api_key
@@ -0,0 +1,190 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from fastapi import Request
+from .deadline import DEADLINE_HEADER
+from .logging_config import logger
+
+FIELD_SEPARATOR = "___POST_FIELD_SEPARATOR___"
+
+def _digest(value: str, length: int = 12) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()[:length]
+
+def _sanitize_link(link: str) -> str:
+    # ユーザー名とステータスIDはハッシュ化し、重複の有無と形式だけを残す
+    parts = link.split("/")
+    if len(parts) >= 6 and parts[4] == "status":
+        status_id = str(int(_digest(parts[5]), 16))[:len(parts[5])]
+        return "/".join([*parts[:3], _digest(parts[3], 8), "status", status_id])
+    return f"https://example.com/{_digest(link)}" if link else ""
+
+def sanitize_body(raw_text: str) -> str:
+    """
+    リクエストボディから個人情報を取り除きます
+
+    テキストは同じ長さの文字に置き換え（改行は残す）、ユーザー名とリンクはハッシュ化します。
+    日付はフォーマットの違いを再現するためにそのまま残します。
+    """
+    fields = raw_text.split(FIELD_SEPARATOR)
+    if len(fields) != 4:
+        # 不正なフォーマットのリクエストはサイズとフィールド数だけを再現する
+        return FIELD_SEPARATOR.join("x" * len(field) for field in fields)
+    text, user_name, link_to_tweet, created_at = fields
+    sanitized_text = "".join("\n" if char == "\n" else "x" for char in text)
+    return FIELD_SEPARATOR.join([
+        sanitized_text,
+        _digest(user_name, 8) if user_name else "",
+        _sanitize_link(link_to_tweet),
+        created_at
+    ])
+
+def capture_flush_interval_seconds() -> float:
+    """記録したリクエストをファイルに書き込む間隔（秒）"""
+    return float(os.getenv("WEBHOOK_CAPTURE_FLUSH_SECONDS", "5"))
+
+# バッファがこの件数に達した場合は、定期的な書き込みを待たずに書き込む
+MAX_BUFFERED_RECORDS = 10000
+
+def capture_file_path(path: str, started_at: float) -> str:
+    """
+    プロセスごとのキャプチャファイルのパスを返します
+
+    data/webhook_capture.jsonl.gz の場合は data/webhook_capture-20250210T133549-1a2b3c4d.jsonl.gz のように、
+    開始時刻と識別子を付けたファイルにします。複数のプロセスが1つのgzipファイルに追記すると、
+    閉じられていない圧縮データの後に次のデータが続き、ファイル全体が読めなくなるためです。
+    """
+    directory, name = os.path.split(path)
+    stem, _, extension = name.partition(".")
+    started = time.strftime("%Y%m%dT%H%M%S", time.gmtime(started_at))
+    return os.path.join(directory, f"{stem}-{started}-{uuid.uuid4().hex[:8]}.{extension or 'jsonl.gz'}")
+
+class TrafficCapture:
+    """Webhookのリクエストを到着時刻とともにgzip圧縮したJSON Linesファイルに記録するクラス
+
+    記録するのは個人情報を取り除いたボディと、再生に必要な一部のヘッダーのみです（API Keyは記録しません）。
+    プロセスごとに別のファイルに記録し、各リクエストには到着時刻（ts、UNIX時間）を記録します。
+    記録はメモリにためておき、flush() でまとめてファイルに書き込みます（イベントループで圧縮しない）。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._started_at = time.monotonic()
+        self._started_at_wall = time.time()
+        self.file_path = capture_file_path(path, self._started_at_wall)
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = gzip.open(self.file_path, "wt", encoding="utf-8")
+        logger.info("Webhook traffic capture enabled", extra={"path": self.file_path})
+
+    def record(self, request: Request, raw_text: str) -> None:
+        """リクエストを1件記録します（ファイルへの書き込みは flush() で行う）"""
+        elapsed = time.monotonic() - self._started_at
+        entry = {
+            "ts": round(self._started_at_wall + elapsed, 6),
+            "t": round(elapsed, 6),
+            "size": len(raw_text.encode()),
+            "content_type": request.headers.get("content-type"),
+            "deadline": request.headers.get(DEADLINE_HEADER),
+            "body": sanitize_body(raw_text),
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._buffer.append(line)
+            overflow = len(self._buffer) >= MAX_BUFFERED_RECORDS
+        if overflow:
+            self.flush()
+
+    def flush(self) -> None:
+        """バッファの記録をファイルに書き込みます"""
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+            if self._file.closed:
+                return
+            if lines:
+                self._file.write("\n".join(lines) + "\n")
+                self._file.flush()
+
+    def close(self) -> None:
+        """バッファの記録を書き込み、gzipの末尾を書き込んでファイルを閉じます"""
+        self.flush()
+        with self._lock:
+            self._file.close()
+
+def read_capture(paths: Union[str, Iterable[str]]) -> Iterator[Dict[str, Any]]:
+    """キャプチャファイルを到着順に読み込みます
+
+    複数のファイル（プロセスごとのファイル）を指定した場合は、到着時刻（ts）の順に並べ、
+    t を最初のリクエストからの経過秒数にします。
+    記録中のファイルも、最後にフラッシュされたところまで読み込めます。
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    paths = list(paths)
+    if len(paths) == 1:
+        yield from _read_capture_file(paths[0])
+        return
+
+    entries = [entry for path in paths for entry in _read_capture_file(path)]
+    entries.sort(key=lambda entry: entry.get("ts", entry["t"]))
+    if entries and "ts" in entries[0]:
+        first = entries[0]["ts"]
+        for entry in entries:
+            entry["t"] = round(entry["ts"] - first, 6)
+    yield from entries
+
+def _read_capture_file(path: str) -> Iterator[Dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except EOFError:
+            # 記録中のファイルは末尾が閉じられていない
+            return
+
+_traffic_capture: Optional[TrafficCapture] = None
+_traffic_capture_path: Optional[str] = None
+
+def get_traffic_capture() -> Optional[TrafficCapture]:
+    """
+    WEBHOOK_CAPTURE_PATHが設定されている場合にTrafficCaptureを返します（未設定の場合はNone）
+    """
+    global _traffic_capture, _traffic_capture_path
+    path = os.getenv("WEBHOOK_CAPTURE_PATH")
+    if not path:
+        return None
+    if _traffic_capture is None or _traffic_capture_path != path:
+        if _traffic_capture is not None:
+            _traffic_capture.close()
+        _traffic_capture = TrafficCapture(path)
+        _traffic_capture_path = path
+    return _traffic_capture
+
+def close_traffic_capture() -> None:
+    """記録中のキャプチャがあれば閉じます（終了時に呼び出す）"""
+    global _traffic_capture, _traffic_capture_path
+    if _traffic_capture is not None:
+        _traffic_capture.close()
+        _traffic_capture = None
+        _traffic_capture_path = None
+
+async def run_capture_flush_loop(capture: TrafficCapture, interval: Optional[float] = None) -> None:
+    """
+    一定間隔でキャプチャのバッファをファイルに書き込み続けます（キャンセルされるまで）
+    """
+    interval = interval or capture_flush_interval_seconds()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(capture.flush)
+        except Exception:
+            logger.error("Failed to flush traffic capture", exc_info=True)
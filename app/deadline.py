@@ -0,0 +1,56 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from fastapi import Request
+
+# リクエスト全体の期限を指定するヘッダー（残り秒数）
+DEADLINE_HEADER = "X-Request-Deadline"
+
+DEFAULT_WEBHOOK_DEADLINE_SECONDS = 10.0
+
+class Deadline:
+    """リクエスト全体の処理期限"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """期限までの残り秒数を返します（期限切れの場合は0）"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    @classmethod
+    def from_request(cls, request: Request) -> "Deadline":
+        """
+        リクエストの期限を作成します
+
+        X-Request-Deadlineヘッダーに正の秒数が指定されている場合はそれを使い、
+        それ以外は WEBHOOK_DEADLINE_SECONDS を使います。
+        """
+        seconds = float(os.getenv("WEBHOOK_DEADLINE_SECONDS", DEFAULT_WEBHOOK_DEADLINE_SECONDS))
+        header = request.headers.get(DEADLINE_HEADER)
+        if header:
+            try:
+                value = float(header)
+            except ValueError:
+                value = 0.0
+            if value > 0:
+                seconds = value
+        return cls(seconds)
+
+# 現在のリクエストの期限（NotionServiceの各API呼び出しのタイムアウトに使う）
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """指定した期限をこのスコープ内のNotion API呼び出しに適用します（Noneの場合は期限なし）"""
+    token = current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        current_deadline.reset(token)
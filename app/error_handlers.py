@@ -1,14 +1,36 @@
 from fastapi import Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
+import json
 import logging
 from .exceptions import AppException, ValidationException
+from .request_body import BodyPreview, HeadersPreview, cached_body
 
 logger = logging.getLogger(__name__)
 
+class _BodyAnalysis(BodyPreview):
+    """ログ出力時にのみリクエストボディのJSON解析結果を文字列化するオブジェクト"""
+
+    def __str__(self) -> str:
+        body = cached_body(self.request)
+        if not body:
+            return "Empty body"
+        # 大きなボディはパースせず、切り詰めたものだけを出力する
+        if len(body) > self.limit:
+            return f"raw_body: {super().__str__()}"
+        try:
+            return f"Parsed JSON body: {json.loads(body)}"
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            return f"Invalid JSON format: {str(e)}, raw_body: {super().__str__()}"
+
+def _error_fields(request: Request, exc: Exception) -> dict:
+    """例外クラスをリクエストの状態（リクエスト全体のログで使う）に記録し、ログに付与するフィールドを返します"""
+    request.state.error_class = type(exc).__name__
+    return {"error_class": type(exc).__name__, "path": request.url.path}
+
 async def app_exception_handler(request: Request, exc: AppException):
     """アプリケーション例外のハンドラー"""
-    logger.error(f"Application error occurred: {str(exc)}")
+    logger.error(f"Application error occurred: {str(exc)}", extra=_error_fields(request, exc))
     return JSONResponse(
         status_code=exc.status_code,
         content={
@@ -18,11 +40,12 @@ async def app_exception_handler(request: Request, exc: AppException):
     )
 
 async def validation_exception_handler(request: Request, exc: ValidationException):
-    """バリデーション例外のハンドラー"""# リクエストボディを取得
-    body = await request.body()
-    body_str = body.decode() if body else ""
-
-    logger.error(f"Validation error occurred: {str(exc)}, Request body: {body_str}")
+    """バリデーション例外のハンドラー"""
+    # リクエストボディは再読み込みせず、読み込み済みのものを切り詰めてログに出力する
+    logger.error(
+        "Validation error occurred: %s, Request body: %s", exc, BodyPreview(request),
+        extra=_error_fields(request, exc)
+    )
     return JSONResponse(status_code=422, content={
         "message": str(exc),
         "details": exc.details
@@ -30,27 +53,17 @@ async def validation_exception_handler(request: Request, exc: ValidationExceptio
 
 async def request_validation_exception_handler(request: Request, exc: RequestValidationError):
     """リクエストバリデーションエラーのハンドラー"""
-    # リクエストボディを取得
-    body = await request.body()
-    body_str = body.decode() if body else ""
-
-    # JSONとしてパースを試みる
-    try:
-        if body_str:
-            import json
-            parsed_body = json.loads(body_str)
-            body_analysis = f"Parsed JSON body: {parsed_body}"
-        else:
-            body_analysis = "Empty body"
-    except json.JSONDecodeError as e:
-        body_analysis = f"Invalid JSON format: {str(e)}, position: {e.pos}, line: {e.lineno}, column: {e.colno}, raw_body: {body_str}"
-    
     logger.error(
-        f"Request validation error occurred: {exc.errors()}, "
-        f"Request details - method: {request.method}, url: {request.url}, "
-        f"headers: {dict(request.headers)}, query_params: {dict(request.query_params)}, "
-        f"body_analysis: {body_analysis}, "
-        f"raw_body: {body_str}"
+        "Request validation error occurred: %s, "
+        "Request details - method: %s, url: %s, headers: %s, query_params: %s, "
+        "body_analysis: %s",
+        exc.errors(),
+        request.method,
+        request.url,
+        HeadersPreview(request),
+        request.query_params,
+        _BodyAnalysis(request),
+        extra=_error_fields(request, exc)
     )
     
     # 日付フォーマットのエラーの場合は、専用のメッセージを返す
@@ -78,7 +91,7 @@ async def request_validation_exception_handler(request: Request, exc: RequestVal
 
 async def general_exception_handler(request: Request, exc: Exception):
     """一般的な例外のハンドラー"""
-    logger.error(f"Unexpected error occurred: {str(exc)}")
+    logger.error(f"Unexpected error occurred: {str(exc)}", extra=_error_fields(request, exc))
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
@@ -46,3 +46,16 @@ class ConfigurationException(AppException):
             status_code=500,
             details=details
         )
+
+class PayloadTooLargeException(AppException):
+    """リクエストボディが大きすぎる場合の例外"""
+    def __init__(
+        self,
+        message: str,
+        details: Optional[Dict[str, Any]] = None
+    ):
+        super().__init__(
+            message=message,
+            status_code=413,
+            details=details
+        )
@@ -1,10 +1,67 @@
+import json
 import logging
 import os
 import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
 import google.cloud.logging
 from google.cloud.logging.handlers import CloudLoggingHandler
 from google.cloud.logging_v2.handlers import setup_logging
 
+# 処理中のリクエストのID（リクエストの外ではNone）
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecordの標準の属性（これ以外の属性はextraで渡された構造化フィールドとして出力する）
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+class RequestContextFilter(logging.Filter):
+    """ログレコードに処理中のリクエストのIDを付与するフィルター"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get() or "-"
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """ログレコードを1行のJSONとして出力するフォーマッター
+
+    Cloud Runの標準出力の構造化ログとして扱えるよう、severityとmessageに加えて
+    extraで渡されたフィールドを出力します。ログが大きくなりすぎないよう、
+    LOG_BODY_PREVIEW_BYTES を超える文字列のフィールドは切り詰めます。
+    """
+
+    def __init__(self, max_field_length: Optional[int] = None):
+        super().__init__()
+        self.max_field_length = max_field_length or int(os.getenv("LOG_BODY_PREVIEW_BYTES", "1024"))
+
+    def _field(self, value: Any) -> Any:
+        if isinstance(value, str) and len(value) > self.max_field_length:
+            return f"{value[:self.max_field_length]}... ({len(value)} chars)"
+        if isinstance(value, (str, int, float, bool, type(None))):
+            return value
+        text = json.dumps(value, ensure_ascii=False, default=str)
+        if len(text) > self.max_field_length:
+            return f"{text[:self.max_field_length]}... ({len(text)} chars)"
+        return value
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "severity": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = self._field(value)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+            entry.setdefault("error_class", record.exc_info[0].__name__)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
 def setup_logger():
     """ロギングの設定を行います"""
     logger = logging.getLogger()
@@ -12,11 +69,16 @@ def setup_logger():
 
     # フォーマッターの作成
     formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] - %(message)s'
     )
 
     # 環境に応じてハンドラーを設定
-    if os.getenv('ENVIRONMENT') == 'production':
+    if os.getenv('LOG_FORMAT') == 'json':
+        # 構造化ログ（Cloud Runでは標準出力のJSONがそのまま構造化ログになる）
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+    elif os.getenv('ENVIRONMENT') == 'production':
         # Cloud Loggingクライアントの設定
         client = google.cloud.logging.Client()
         handler = CloudLoggingHandler(client)
@@ -26,8 +88,37 @@ def setup_logger():
         handler = logging.StreamHandler(sys.stdout)
         handler.setFormatter(formatter)
         logger.addHandler(handler)
+    handler.addFilter(RequestContextFilter())
 
     return logger
 
 # グローバルロガーの設定
 logger = setup_logger()
+
+@contextmanager
+def log_stage(stage: str, **fields: Any) -> Iterator[None]:
+    """
+    処理の段階ごとの所要時間をログに出力します
+
+    終了時にstageとduration_ms（失敗した場合はerror_classも）を構造化フィールドとして出力します。
+
+    Args:
+        stage: 段階の名前（create_pageなど）
+        fields: 一緒に出力するフィールド
+    """
+    started_at = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        logger.info("Stage failed", extra={
+            "stage": stage,
+            "duration_ms": round((time.perf_counter() - started_at) * 1000, 3),
+            "error_class": type(e).__name__,
+            **fields
+        })
+        raise
+    logger.info("Stage completed", extra={
+        "stage": stage,
+        "duration_ms": round((time.perf_counter() - started_at) * 1000, 3),
+        **fields
+    })
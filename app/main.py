@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, Request, Security, Depends, Header
+from fastapi import FastAPI, HTTPException, Request, Security, Depends, Header, BackgroundTasks
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel, Field, ValidationError
@@ -6,8 +6,13 @@ from datetime import datetime
 import os
 import uuid
 from dotenv import load_dotenv
-from app.routes import notion
+from app.routes import notion, dead_letters, embeds, admin
+from app.profiling import RequestProfilingMiddleware
+from app.capture import close_traffic_capture, get_traffic_capture, run_capture_flush_loop
+from app.request_context import RequestContextMiddleware
+from app.request_guard import RequestGuardMiddleware
 from app.services.notion_service import NotionService
+from app.services.dead_letter_store import DeadLetterStore, get_dead_letter_store
 from app.exceptions import (
     AppException,
     ValidationException,
@@ -21,11 +26,18 @@ from app.error_handlers import (
     request_validation_exception_handler
 )
 from app.models import Tweet, NotionPageResponse
+from app.services.digest_buffer import DigestBuffer, get_digest_buffer
+from app.services.digest_writer import STORAGE_MODE_DIGEST, DigestWriter, run_flush_loop, storage_mode
+from app.services.embed_sweeper import EmbedSweeper, embed_sweep_interval_seconds, run_sweep_loop
+from app.webhook import process_webhook
+from app.webhook_fast_path import WebhookFastPathMiddleware
+from contextlib import asynccontextmanager
+import asyncio
 from starlette.middleware.errors import ServerErrorMiddleware
 from starlette.middleware.exceptions import ExceptionMiddleware
 import json
 import logging
-from fastapi.security.api_key import APIKeyHeader
+from app.auth import get_api_key
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
@@ -39,32 +51,56 @@ notion_service = NotionService(
     database_id=os.getenv("NOTION_DATABASE_ID")
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """バックグラウンドのタスクを起動します
+
+    - ダイジェストモードの場合は、バッファを定期的に書き込む
+    - EMBED_SWEEP_INTERVAL_SECONDS が0より大きい場合は、埋め込みのないページを定期的に修復する（デフォルトは無効）
+    - キャプチャモードの場合は、記録したリクエストを定期的にファイルに書き込み、終了時にファイルを閉じる
+    """
+    tasks = []
+    capture = get_traffic_capture()
+    if capture is not None:
+        tasks.append(asyncio.create_task(run_capture_flush_loop(capture)))
+    writer = None
+    if storage_mode() == STORAGE_MODE_DIGEST:
+        writer = DigestWriter(get_digest_buffer(), notion_service)
+        tasks.append(asyncio.create_task(run_flush_loop(writer)))
+    elif embed_sweep_interval_seconds() > 0:
+        sweeper = EmbedSweeper(notion_service, dead_letter_store=get_dead_letter_store())
+        tasks.append(asyncio.create_task(run_sweep_loop(sweeper)))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        if writer is not None:
+            # 終了前にバッファに残っているいいねを書き込む（失敗した場合は次回の起動時に書き込む）
+            try:
+                await asyncio.to_thread(writer.flush)
+            except Exception:
+                logger.error("Failed to flush digest buffer on shutdown", exc_info=True)
+        try:
+            await asyncio.to_thread(close_traffic_capture)
+        except Exception:
+            logger.error("Failed to close traffic capture on shutdown", exc_info=True)
+
 app = FastAPI(
     title="Save Liked Post in Notion",
-    description="いいねしたツイートをNotionのデータベースに保存するAPIサービス"
+    description="いいねしたツイートをNotionのデータベースに保存するAPIサービス",
+    lifespan=lifespan
 )
 
-# API Key認証の設定
-API_KEY_NAME = "X-API-Key"
-
-def get_api_key(api_key: str = Header(None, alias="X-API-Key")) -> str:
-    """API Keyを取得する関数"""
-    if api_key is None:
-        raise HTTPException(
-            status_code=401,
-            detail={"message": "Invalid API Key"}
-        )
-    
-    if api_key != os.getenv("WEBHOOK_API_KEY"):
-        raise HTTPException(
-            status_code=401,
-            detail={"message": "Invalid API Key"}
-        )
-    
-    return api_key
-
 # ミドルウェアを追加
 app.add_middleware(ServerErrorMiddleware, handler=general_exception_handler)
+# WEBHOOK_FAST_PATH=1 の場合は、POST /webhook をFastAPIのルーティングを経由せずに処理する
+app.add_middleware(WebhookFastPathMiddleware, notion_service=notion_service)
+app.add_middleware(RequestProfilingMiddleware)
+# リクエストIDの割り当てと所要時間の記録は、他のミドルウェアの処理も含めるため外側で行う
+app.add_middleware(RequestContextMiddleware)
+# 不正なリクエストは、リクエストIDの割り当てやログ出力も含めて何もせずに拒否するため最も外側で行う
+app.add_middleware(RequestGuardMiddleware)
 
 # エラーハンドラーを登録
 app.add_exception_handler(RequestValidationError, request_validation_exception_handler)
@@ -81,7 +117,13 @@ async def hello_world(api_key: str = Depends(get_api_key)):
     return {"message": "Hello World"}
 
 @app.post("/webhook", response_model=NotionPageResponse)
-async def webhook_post(request: Request, api_key: str = Depends(get_api_key)):
+async def webhook_post(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    api_key: str = Depends(get_api_key),
+    dead_letter_store: DeadLetterStore = Depends(get_dead_letter_store),
+    digest_buffer: DigestBuffer = Depends(get_digest_buffer)
+):
     """Webhookエンドポイント
     
     リクエストボディは以下の順序でフィールドを___POST_FIELD_SEPARATOR___で区切って送信:
@@ -89,65 +131,24 @@ async def webhook_post(request: Request, api_key: str = Depends(get_api_key)):
     2. userName: ユーザー名
     3. linkToTweet: ツイートへのリンク
     4. createdAt: 作成日時（ISO形式または "Month DD, YYYY at HH:MMAM/PM" 形式）
-    """
-    # リクエストボディをテキストとして読み取る
-    body = await request.body()
-    raw_text = body.decode()
-    
-    # フィールドを分割
-    fields = raw_text.split("___POST_FIELD_SEPARATOR___")
-    if len(fields) != 4:
-        raise ValidationException(
-            "Invalid request format. Expected 4 fields separated by ___POST_FIELD_SEPARATOR___",
-            details={"received_fields": len(fields)}
-        )
-    
-    # フィールドを取り出す
-    text, user_name, link_to_tweet, created_at = fields
 
-    # 必須フィールドのバリデーション
-    if not text:
-        raise ValidationException(
-            "Text field cannot be empty",
-            details={}
-        )
+    リクエスト全体の期限（X-Request-Deadlineヘッダーまたは WEBHOOK_DEADLINE_SECONDS）までの
+    残り時間を各Notion API呼び出しのタイムアウトにします。
 
-    # 日付フォーマットを検証して変換
-    try:
-        # まずISO形式として解析を試みる
-        parsed_date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-    except ValueError:
-        try:
-            # 次にMonth DD, YYYY at HH:MMAM/PM形式として解析を試みる
-            parsed_date = datetime.strptime(created_at, "%B %d, %Y at %I:%M%p")
-        except ValueError:
-            raise ValidationException(
-                "Invalid date format. Expected ISO format.",
-                details={}
-            )
-    
-    # Tweetモデルを作成
-    tweet = Tweet(
-        text=text,
-        userName=user_name,
-        linkToTweet=link_to_tweet,
-        createdAt=parsed_date.isoformat()
+    STORAGE_MODE=digest の場合は、いいねをバッファに保存して202を返します（書き込みは後でまとめて行う）。
+    """
+    status_code, content = await process_webhook(
+        request, notion_service, dead_letter_store, digest_buffer, background_tasks.add_task
     )
-    
-    # NotionServiceを初期化してページを作成
-    logger.info("Creating new Notion page")
-    page = notion_service.create_page(tweet.model_dump())  # Pydanticモデルを辞書に変換
-
-    # 埋め込みコードを追加
-    if link_to_tweet:
-        logger.info("Adding tweet url")
-        notion_service.add_tweet_url(page["id"], link_to_tweet)
-
-    # レスポンスを返す
-    return NotionPageResponse(id=page["id"])
+    if status_code != 200:
+        return JSONResponse(status_code=status_code, content=content)
+    return NotionPageResponse(**content)
 
 # Notionのルーターを追加
 app.include_router(notion.router, prefix="/api/v1/notion", tags=["notion"])
+app.include_router(dead_letters.router, prefix="/api/v1/dead-letters", tags=["dead-letters"])
+app.include_router(embeds.router, prefix="/api/v1/embeds", tags=["embeds"])
+app.include_router(admin.router, prefix="/admin", tags=["admin"])
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Optional
 
 class Tweet(BaseModel):
     """ツイートデータのモデル"""
@@ -11,3 +12,48 @@ class Tweet(BaseModel):
 class NotionPageResponse(BaseModel):
     """Notionページのレスポンスモデル"""
     id: str
+
+class DeadLetter(BaseModel):
+    """書き込みに失敗したツイートのモデル"""
+    id: int
+    created_at: datetime
+    stage: str
+    error_type: str
+    error_message: str
+    tweet: Tweet
+    page_id: Optional[str] = None
+    attempts: int = 0
+    status: str = "pending"
+
+class ReplayReport(BaseModel):
+    """デッドレターの再実行結果のモデル"""
+    total: int
+    succeeded: int
+    failed: int
+    elapsed_seconds: float
+    throughput_per_second: float
+
+class SearchResult(BaseModel):
+    """検索結果のモデル（本文はNotionのページを参照）"""
+    page_id: str
+    userName: str
+    createdAt: Optional[datetime] = None
+    linkToTweet: Optional[str] = None
+
+class MigrationReport(BaseModel):
+    """データベース間の移行結果のモデル"""
+    total: int
+    migrated: int
+    skipped: int
+    failed: int
+    archived: int = 0
+    elapsed_seconds: float
+    throughput_per_second: float
+
+class EmbedSweepReport(BaseModel):
+    """埋め込みのないページの修復結果のモデル"""
+    checked: int
+    missing: int
+    repaired: int
+    pending: int
+    elapsed_seconds: float
@@ -0,0 +1,229 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+from .asgi_utils import get_header
+from .auth import is_admin_key
+
+# 個別プロファイリングの対象とするパス
+PROFILED_PATHS = frozenset({"/webhook", "/api/v1/notion/pages"})
+
+# 個別プロファイリングを要求するヘッダー（管理者用API Keyと一緒に送信する）
+PROFILE_HEADER = b"x-profile-request"
+ADMIN_API_KEY_HEADER = b"x-admin-key"
+# 個別プロファイリングを有効にするヘッダーの値
+PROFILE_HEADER_TRUE_VALUES = frozenset({b"1", b"true", b"yes", b"on"})
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROFILING_FILE = os.path.abspath(__file__)
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+def _is_app_frame(frame) -> bool:
+    filename = frame.f_code.co_filename
+    return filename.startswith(_APP_DIR) and filename != _PROFILING_FILE
+
+class StackSampler:
+    """全スレッドのスタックを一定間隔でサンプリングするプロファイラー
+
+    サンプリング中のみ呼び出し元のスレッドで動作するため、待機中のコストはありません。
+    結果はflamegraph.plなどでそのまま扱えるcollapsed stacks形式で出力します。
+    """
+
+    def __init__(self, interval: float = 0.01, app_only: bool = True):
+        self.interval = interval
+        self.app_only = app_only
+        self.samples: Counter = Counter()
+
+    def sample(self, duration: float) -> Counter:
+        """
+        指定した秒数の間スタックをサンプリングします
+
+        Args:
+            duration: サンプリングする秒数
+
+        Returns:
+            collapsed stackごとのサンプル数
+        """
+        own_thread_id = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread_id:
+                    continue
+                stack = self._collapse(frame)
+                if stack:
+                    self.samples[stack] += 1
+            time.sleep(self.interval)
+        return self.samples
+
+    def _collapse(self, frame) -> Optional[str]:
+        labels: List[str] = []
+        has_app_frame = False
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            has_app_frame = has_app_frame or _is_app_frame(frame)
+            frame = frame.f_back
+        # アプリケーションのコードを含まないスタック（待機中のスレッドなど）は除外する
+        if self.app_only and not has_app_frame:
+            return None
+        return ";".join(reversed(labels))
+
+    def collapsed(self) -> str:
+        """collapsed stacks形式の文字列を返します"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+class ProfileStore:
+    """リクエスト単位のプロファイリング結果を保持するストア（古いものから破棄）"""
+
+    def __init__(self, max_entries: int = 20):
+        self.max_entries = max_entries
+        self._profiles: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, path: str, stats_text: str, profile_id: Optional[str] = None) -> str:
+        profile_id = profile_id or uuid.uuid4().hex
+        with self._lock:
+            self._profiles[profile_id] = {"id": profile_id, "path": path, "stats": stats_text}
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, str]]:
+        with self._lock:
+            return [{"id": p["id"], "path": p["path"]} for p in self._profiles.values()]
+
+profile_store = ProfileStore()
+
+# cProfileは同時に1つしか有効にできないため、リクエスト単位のプロファイリングは直列化する
+_request_profile_lock = threading.Lock()
+
+class _ProfiledCoroutine:
+    """コルーチンが実行している間だけプロファイラーを有効にするラッパー
+
+    awaitで中断している間はイベントループが他のリクエストやタスクを実行するため、
+    中断するたびにプロファイラーを無効にし、再開するときに有効にします。
+    """
+
+    def __init__(self, coro, profiler: cProfile.Profile):
+        self.coro = coro
+        self.profiler = profiler
+
+    def __await__(self):
+        value = None
+        error: Optional[BaseException] = None
+        while True:
+            self.profiler.enable()
+            try:
+                if error is None:
+                    yielded = self.coro.send(value)
+                else:
+                    yielded = self.coro.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.profiler.disable()
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+class RequestProfilingMiddleware:
+    """ヘッダーで要求されたリクエストだけをcProfileで計測するASGIミドルウェア
+
+    X-Profile-RequestヘッダーとX-Admin-Keyヘッダーが付いたリクエストのみ計測し、
+    結果のIDをX-Profile-Idレスポンスヘッダーで返します。それ以外のリクエストは素通りします。
+    計測するのはイベントループのスレッドでこのリクエストの処理が実行している間のみで、
+    await中に実行される他のリクエストや、スレッドプールで実行される処理は含みません。
+    """
+
+    def __init__(self, app, store: ProfileStore = profile_store, sort_by: str = "cumulative", limit: int = 50):
+        self.app = app
+        self.store = store
+        self.sort_by = sort_by
+        self.limit = limit
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"] not in PROFILED_PATHS
+            or (get_header(scope["headers"], PROFILE_HEADER) or b"").strip().lower() not in PROFILE_HEADER_TRUE_VALUES
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        admin_key = get_header(scope["headers"], ADMIN_API_KEY_HEADER)
+        if not is_admin_key(admin_key.decode("latin-1") if admin_key else None):
+            await self.app(scope, receive, send)
+            return
+        # 他のリクエストを計測中の場合は計測せずに処理する
+        if not _request_profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = cProfile.Profile()
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        try:
+            await _ProfiledCoroutine(self.app(scope, receive, send_with_profile_id), profiler)
+        finally:
+            _request_profile_lock.release()
+            self._store(profile_id, scope["path"], profiler)
+
+    def _store(self, profile_id: str, path: str, profiler: cProfile.Profile) -> None:
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats(self.sort_by).print_stats(self.limit)
+        self.store.add(path, stream.getvalue(), profile_id=profile_id)
+
+def start_tracemalloc(frames: int = 1) -> bool:
+    """tracemallocによるメモリ割り当ての追跡を開始します（開始済みの場合はFalse）"""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    return True
+
+def stop_tracemalloc() -> bool:
+    """tracemallocによる追跡を停止します（停止済みの場合はFalse）"""
+    if not tracemalloc.is_tracing():
+        return False
+    tracemalloc.stop()
+    return True
+
+def tracemalloc_top(limit: int = 20, key_type: str = "lineno") -> List[Dict[str, object]]:
+    """
+    メモリ割り当ての多い箇所の上位N件を返します
+
+    Args:
+        limit: 返す件数
+        key_type: 集計単位（lineno, filename, traceback）
+    """
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    return [
+        {
+            "location": str(stat.traceback),
+            "size_bytes": stat.size,
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics(key_type)[:limit]
+    ]
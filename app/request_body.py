@@ -0,0 +1,110 @@
+import os
+from typing import Optional
+from fastapi import Request
+from .exceptions import PayloadTooLargeException, ValidationException
+
+DEFAULT_MAX_REQUEST_BODY_BYTES = 1024 * 1024
+DEFAULT_LOG_BODY_PREVIEW_BYTES = 1024
+
+# ログに出力しないヘッダー
+REDACTED_HEADERS = frozenset({"x-api-key", "x-admin-key", "authorization", "cookie"})
+
+def max_request_body_bytes() -> int:
+    """リクエストボディの最大サイズ（バイト）を返します"""
+    return int(os.getenv("MAX_REQUEST_BODY_BYTES", DEFAULT_MAX_REQUEST_BODY_BYTES))
+
+async def read_limited_body(request: Request, max_bytes: Optional[int] = None) -> bytearray:
+    """
+    リクエストボディを最大サイズまでストリーミングで読み込みます
+
+    Content-Lengthが最大サイズを超えている場合はボディを読まずに拒否し、
+    Content-Lengthがない場合も読み込んだサイズが最大サイズを超えた時点で拒否します。
+    読み込んだボディはエラーログ用に request.state.raw_body に保持します。
+
+    Args:
+        request: リクエスト
+        max_bytes: 最大サイズ（省略時は MAX_REQUEST_BODY_BYTES）
+
+    Returns:
+        リクエストボディ
+
+    Raises:
+        PayloadTooLargeException: ボディが最大サイズを超えている場合
+    """
+    max_bytes = max_bytes if max_bytes is not None else max_request_body_bytes()
+
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+        raise PayloadTooLargeException(
+            "Request body is too large",
+            details={"max_bytes": max_bytes}
+        )
+
+    body = bytearray()
+    async for chunk in request.stream():
+        if len(body) + len(chunk) > max_bytes:
+            raise PayloadTooLargeException(
+                "Request body is too large",
+                details={"max_bytes": max_bytes}
+            )
+        body += chunk
+
+    request.state.raw_body = body
+    return body
+
+def decode_body(body: bytearray) -> str:
+    """
+    リクエストボディをUTF-8としてデコードします
+
+    Raises:
+        ValidationException: UTF-8としてデコードできない場合
+    """
+    try:
+        return body.decode()
+    except UnicodeDecodeError as e:
+        raise ValidationException(
+            "Request body must be UTF-8 encoded",
+            details={"position": e.start}
+        )
+
+def cached_body(request: Request) -> Optional[bytes]:
+    """
+    既に読み込まれているリクエストボディを返します（未読の場合はNone）
+
+    エラーログのためにボディを再度読み込むことはしません。
+    """
+    body = getattr(request.state, "raw_body", None)
+    if body is None:
+        # FastAPIがボディをパースした場合はStarletteのRequestにキャッシュされている
+        body = getattr(request, "_body", None)
+    return body
+
+class BodyPreview:
+    """ログ出力時にのみリクエストボディを切り詰めて文字列化するオブジェクト"""
+
+    def __init__(self, request: Request, limit: Optional[int] = None):
+        self.request = request
+        self.limit = limit if limit is not None else int(
+            os.getenv("LOG_BODY_PREVIEW_BYTES", DEFAULT_LOG_BODY_PREVIEW_BYTES)
+        )
+
+    def __str__(self) -> str:
+        body = cached_body(self.request)
+        if body is None:
+            return "<not read>"
+        preview = bytes(body[:self.limit]).decode(errors="replace")
+        if len(body) > self.limit:
+            preview += f"... <truncated, {len(body)} bytes>"
+        return preview
+
+class HeadersPreview:
+    """ログ出力時にのみ認証情報を伏せたヘッダーを文字列化するオブジェクト"""
+
+    def __init__(self, request: Request):
+        self.request = request
+
+    def __str__(self) -> str:
+        return str({
+            key: "***" if key in REDACTED_HEADERS else value
+            for key, value in self.request.headers.items()
+        })
@@ -0,0 +1,78 @@
+import time
+import uuid
+from typing import Iterable, Optional
+from .asgi_utils import get_header
+from .logging_config import logger, request_id_var
+
+REQUEST_ID_HEADER = b"x-request-id"
+CLOUD_TRACE_HEADER = b"x-cloud-trace-context"
+REQUEST_ID_MAX_LENGTH = 128
+
+def _request_id(headers: Iterable) -> str:
+    """
+    リクエストIDを決めます
+
+    X-Request-Idヘッダー、Cloud RunのトレースID（X-Cloud-Trace-Context）の順に使い、
+    どちらもない場合は新しく発行します。
+    """
+    value = get_header(headers, REQUEST_ID_HEADER)
+    if value and len(value) <= REQUEST_ID_MAX_LENGTH and value.isascii() and value.decode().isprintable():
+        return value.decode()
+    trace = get_header(headers, CLOUD_TRACE_HEADER)
+    if trace:
+        trace_id = trace.split(b"/", 1)[0]
+        if trace_id and len(trace_id) <= REQUEST_ID_MAX_LENGTH and trace_id.isalnum():
+            return trace_id.decode()
+    return uuid.uuid4().hex
+
+class RequestContextMiddleware:
+    """リクエストごとにIDを割り当て、リクエスト全体の所要時間をログに出力するASGIミドルウェア
+
+    リクエストIDはログレコードのrequest_idフィールドとX-Request-Idレスポンスヘッダーに付与されます。
+    所要時間はレスポンスの送信が終わるまでで、BackgroundTasksなどレスポンス後の処理は含めません。
+    例外ハンドラーがrequest.state.error_classに設定した例外クラスも一緒に出力します。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _request_id(scope["headers"])
+        token = request_id_var.set(request_id)
+        started_at = time.perf_counter()
+        finished_at: Optional[float] = None
+        status_code = 500
+
+        async def send_with_request_id(message):
+            nonlocal status_code, finished_at
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (REQUEST_ID_HEADER, request_id.encode())]}
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # レスポンス後に実行する処理（埋め込みの追加など）は所要時間に含めない
+                finished_at = time.perf_counter()
+
+        error_class = None
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        except Exception as e:
+            error_class = type(e).__name__
+            raise
+        finally:
+            fields = {
+                "stage": "request",
+                "duration_ms": round(((finished_at or time.perf_counter()) - started_at) * 1000, 3),
+                "method": scope["method"],
+                "path": scope["path"],
+                "status_code": status_code,
+            }
+            error_class = error_class or scope.get("state", {}).get("error_class")
+            if error_class:
+                fields["error_class"] = error_class
+            logger.info("Request completed", extra=fields)
+            request_id_var.reset(token)
@@ -0,0 +1,206 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from .asgi_utils import get_header, render_json, send_json
+from .auth import API_KEY_NAME, is_valid_api_key
+from .logging_config import logger
+from .request_body import max_request_body_bytes
+
+# API Keyが必要なパス（get_api_keyを使うルートと同じ）
+GUARDED_PATHS = frozenset({"/webhook", "/api/v1/notion/search"})
+GUARDED_PATH_PREFIXES = ("/api/v1/dead-letters", "/api/v1/embeds")
+
+_API_KEY_HEADER = API_KEY_NAME.lower().encode()
+_CONTENT_LENGTH_HEADER = b"content-length"
+_FORWARDED_FOR_HEADER = b"x-forwarded-for"
+
+# 拒否する場合のレスポンス（401はFastAPIのHTTPExceptionと同じ内容）
+UNAUTHORIZED_BODY = render_json({"detail": {"message": "Invalid API Key"}})
+TOO_MANY_FAILURES_BODY = render_json({"detail": {"message": "Too many failed requests"}})
+
+def auth_failure_limit() -> int:
+    """クライアントごとに許容する失敗の回数（0の場合は制限しない）"""
+    return int(os.getenv("AUTH_FAILURE_LIMIT", "10"))
+
+def auth_failure_window_seconds() -> float:
+    """失敗の回数を数える期間（秒）"""
+    return float(os.getenv("AUTH_FAILURE_WINDOW_SECONDS", "60"))
+
+def rejection_logs_per_second() -> float:
+    """拒否したリクエストのログを出力する最大の頻度（件/秒）"""
+    return float(os.getenv("REJECTION_LOGS_PER_SECOND", "1"))
+
+def _is_guarded(path: str) -> bool:
+    return path in GUARDED_PATHS or path.startswith(GUARDED_PATH_PREFIXES)
+
+def _client_id(scope) -> str:
+    """
+    失敗の回数を数えるクライアントを決めます
+
+    Cloud Runでは接続元がGoogleのフロントエンドになるため、フロントエンドが末尾に追加する
+    X-Forwarded-Forの最後の値を使います（先頭の値はクライアントが自由に指定できる）。
+    """
+    forwarded = get_header(scope["headers"], _FORWARDED_FOR_HEADER)
+    if forwarded:
+        return forwarded.rsplit(b",", 1)[-1].strip().decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+class FailureLimiter:
+    """クライアントごとの失敗の回数を制限するトークンバケット
+
+    クライアントごとに limit 回まで失敗でき、window_seconds で limit 回分まで回復します。
+    記録するクライアント数は max_clients までで、超えた場合は最も古いものから忘れます。
+    イベントループのスレッドからのみ呼び出すため、ロックは使いません。
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = None,
+        window_seconds: Optional[float] = None,
+        max_clients: Optional[int] = None
+    ):
+        self.limit = auth_failure_limit() if limit is None else limit
+        self.window_seconds = window_seconds or auth_failure_window_seconds()
+        self.max_clients = max_clients or int(os.getenv("AUTH_FAILURE_MAX_CLIENTS", "10000"))
+        self.refill_per_second = self.limit / self.window_seconds
+        # クライアント -> (残りの回数, 更新時刻)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def _tokens(self, client: str, now: float) -> float:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            return float(self.limit)
+        tokens, updated_at = bucket
+        return min(float(self.limit), tokens + (now - updated_at) * self.refill_per_second)
+
+    def is_blocked(self, client: str) -> bool:
+        """失敗の回数が上限に達しているかどうかを返します"""
+        if self.limit <= 0 or client not in self._buckets:
+            return False
+        return self._tokens(client, time.monotonic()) < 1
+
+    def record_failure(self, client: str) -> None:
+        """失敗を1回記録します"""
+        if self.limit <= 0:
+            return
+        now = time.monotonic()
+        self._buckets[client] = (max(0.0, self._tokens(client, now) - 1), now)
+        self._buckets.move_to_end(client)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+    def retry_after(self, client: str) -> int:
+        """次に失敗できるようになるまでの秒数を返します"""
+        tokens = self._tokens(client, time.monotonic())
+        return max(1, int((1 - tokens) / self.refill_per_second + 0.999))
+
+class RejectionLog:
+    """拒否したリクエストのログを一定の頻度までに抑えるクラス
+
+    出力しなかった件数は理由ごとに数え、次に出力するログに含めます。
+    ログにはヘッダーやボディを含めず、理由、クライアント、パスのみを出力します。
+    """
+
+    def __init__(self, per_second: Optional[float] = None):
+        self.per_second = per_second or rejection_logs_per_second()
+        self._tokens = 1.0
+        self._updated_at = time.monotonic()
+        self._suppressed: Dict[str, int] = {}
+
+    def record(self, reason: str, client: str, path: str, status_code: int) -> None:
+        now = time.monotonic()
+        self._tokens = min(1.0, self._tokens + (now - self._updated_at) * self.per_second)
+        self._updated_at = now
+        if self._tokens < 1:
+            self._suppressed[reason] = self._suppressed.get(reason, 0) + 1
+            return
+        self._tokens -= 1
+        suppressed, self._suppressed = self._suppressed, {}
+        logger.warning("Request rejected", extra={
+            "reason": reason,
+            "client": client,
+            "path": path,
+            "status_code": status_code,
+            "suppressed": suppressed
+        })
+
+_failure_limiter: Optional[FailureLimiter] = None
+_rejection_log: Optional[RejectionLog] = None
+
+def get_failure_limiter() -> FailureLimiter:
+    """FailureLimiterのインスタンスを取得します"""
+    global _failure_limiter
+    if _failure_limiter is None:
+        _failure_limiter = FailureLimiter()
+    return _failure_limiter
+
+def get_rejection_log() -> RejectionLog:
+    """RejectionLogのインスタンスを取得します"""
+    global _rejection_log
+    if _rejection_log is None:
+        _rejection_log = RejectionLog()
+    return _rejection_log
+
+class RequestGuardMiddleware:
+    """API Keyが必要なパスへの不正なリクエストを、ボディを読む前に拒否するASGIミドルウェア
+
+    最も外側で動作し、拒否したリクエストは他のミドルウェアやルートを経由しません。
+
+    - API Keyが正しくない場合は、一定時間で比較して401を返す
+    - Content-Lengthが MAX_REQUEST_BODY_BYTES を超える POST /webhook は、ボディを読まずに413を返す
+    - 失敗の回数が上限に達したクライアントの失敗するリクエストには、401や413の代わりに429を返す
+
+    レスポンスのボディは事前に作成したものを使い、ログは RejectionLog で頻度を抑えて出力します。
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._payload_too_large: Tuple[int, bytes] = (-1, b"")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _is_guarded(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        headers = scope["headers"]
+        if not is_valid_api_key(get_header(headers, _API_KEY_HEADER)):
+            await self._reject(scope, send, "invalid_api_key", 401, UNAUTHORIZED_BODY)
+            return
+
+        if scope["method"] == "POST" and scope["path"] == "/webhook":
+            content_length = get_header(headers, _CONTENT_LENGTH_HEADER)
+            max_bytes = max_request_body_bytes()
+            if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+                await self._reject(scope, send, "payload_too_large", 413, self._payload_too_large_body(max_bytes))
+                return
+
+        await self.app(scope, receive, send)
+
+    async def _reject(self, scope, send, reason: str, status_code: int, body: bytes) -> None:
+        """
+        リクエストを拒否します
+
+        失敗の回数が上限に達したクライアントには、本来のエラーの代わりに429を返します。
+        正しいリクエストは失敗の回数によらず通すため、同じアドレスを共有する他の送信元の
+        失敗によって正しいリクエストが拒否されることはありません。
+        """
+        limiter = get_failure_limiter()
+        client = _client_id(scope)
+        if limiter.is_blocked(client):
+            get_rejection_log().record("too_many_failures", client, scope["path"], 429)
+            retry_after = str(limiter.retry_after(client)).encode()
+            await send_json(send, 429, TOO_MANY_FAILURES_BODY, ((b"retry-after", retry_after),))
+            return
+        limiter.record_failure(client)
+        get_rejection_log().record(reason, client, scope["path"], status_code)
+        await send_json(send, status_code, body)
+
+    def _payload_too_large_body(self, max_bytes: int) -> bytes:
+        # PayloadTooLargeExceptionのレスポンスと同じ内容（上限が変わった場合のみ作り直す）
+        cached_max_bytes, body = self._payload_too_large
+        if cached_max_bytes != max_bytes:
+            body = render_json({"message": "Request body is too large", "details": {"max_bytes": max_bytes}})
+            self._payload_too_large = (max_bytes, body)
+        return body
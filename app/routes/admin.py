@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Any, Dict, List
+from app.auth import get_admin_api_key
+from app.profiling import (
+    StackSampler,
+    profile_store,
+    start_tracemalloc,
+    stop_tracemalloc,
+    tracemalloc_top
+)
+import tracemalloc
+
+router = APIRouter(dependencies=[Depends(get_admin_api_key)])
+
+@router.get("/profile/cpu", response_class=PlainTextResponse)
+def sample_cpu(
+    seconds: float = Query(5.0, gt=0, le=60),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+    app_only: bool = True
+) -> str:
+    """
+    指定した秒数の間スタックをサンプリングし、collapsed stacks形式で返します
+
+    flamegraph.pl などにそのまま渡すことでflamegraphを作成できます。
+    """
+    sampler = StackSampler(interval=interval_ms / 1000, app_only=app_only)
+    sampler.sample(seconds)
+    return sampler.collapsed()
+
+@router.get("/profile/requests")
+async def list_request_profiles() -> List[Dict[str, str]]:
+    """
+    保持しているリクエスト単位のプロファイリング結果の一覧を返します
+    """
+    return profile_store.list()
+
+@router.get("/profile/requests/{profile_id}", response_class=PlainTextResponse)
+async def get_request_profile(profile_id: str) -> str:
+    """
+    リクエスト単位のプロファイリング結果を返します
+    """
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail={"message": "Profile not found"})
+    return profile["stats"]
+
+@router.post("/profile/tracemalloc/start")
+async def start_memory_tracing(frames: int = Query(1, ge=1, le=50)) -> Dict[str, Any]:
+    """
+    tracemallocによるメモリ割り当ての追跡を開始します
+    """
+    return {"started": start_tracemalloc(frames), "tracing": tracemalloc.is_tracing()}
+
+@router.get("/profile/tracemalloc/top")
+async def get_memory_top(
+    limit: int = Query(20, ge=1, le=500),
+    key_type: str = Query("lineno", pattern="^(lineno|filename|traceback)$")
+) -> List[Dict[str, Any]]:
+    """
+    メモリ割り当ての多い箇所の上位N件を返します
+    """
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=409, detail={"message": "tracemalloc is not tracing"})
+    return tracemalloc_top(limit, key_type)
+
+@router.post("/profile/tracemalloc/stop")
+async def stop_memory_tracing() -> Dict[str, Any]:
+    """
+    tracemallocによるメモリ割り当ての追跡を停止します
+    """
+    return {"stopped": stop_tracemalloc(), "tracing": tracemalloc.is_tracing()}
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, Query
+from datetime import datetime
+from typing import List, Optional
+from app.auth import get_api_key
+from app.models import DeadLetter, ReplayReport
+from app.services.dead_letter_replayer import DeadLetterReplayer
+from app.services.dead_letter_store import DeadLetterStore, get_dead_letter_store
+from app.services.notion_service import NotionService
+
+router = APIRouter(dependencies=[Depends(get_api_key)])
+
+@router.get("", response_model=List[DeadLetter])
+async def list_dead_letters(
+    error_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    status: Optional[str] = "pending",
+    limit: Optional[int] = 100,
+    store: DeadLetterStore = Depends(get_dead_letter_store)
+) -> List[DeadLetter]:
+    """
+    保存されているデッドレターを取得します
+    """
+    return store.list(error_type=error_type, since=since, until=until, status=status, limit=limit)
+
+# 1リクエストで再実行する最大件数（レート制限の下でもCloud Runのタイムアウト内に終わる件数）
+MAX_REPLAY_PER_REQUEST = 50
+
+@router.post("/replay", response_model=ReplayReport)
+def replay_dead_letters(
+    error_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(MAX_REPLAY_PER_REQUEST, ge=1, le=MAX_REPLAY_PER_REQUEST),
+    store: DeadLetterStore = Depends(get_dead_letter_store)
+) -> ReplayReport:
+    """
+    未処理のデッドレターをNotionへ再書き込みします
+
+    1リクエストで再実行するのは最大 MAX_REPLAY_PER_REQUEST 件です。
+    それ以上ある場合は繰り返し呼び出すか、コマンドから再実行してください。
+    """
+    replayer = DeadLetterReplayer(store, NotionService())
+    return replayer.replay(error_type=error_type, since=since, until=until, limit=limit)
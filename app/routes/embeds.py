@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, Query
+from datetime import datetime
+from typing import Optional
+from app.auth import get_api_key
+from app.models import EmbedSweepReport
+from app.services.dead_letter_store import DeadLetterStore, get_dead_letter_store
+from app.services.embed_sweeper import EmbedSweeper
+from app.services.notion_service import NotionService
+
+router = APIRouter(dependencies=[Depends(get_api_key)])
+
+# 1リクエストで確認する最大ページ数（レート制限の下でもCloud Runのタイムアウト内に終わる件数）
+MAX_SWEEP_PER_REQUEST = 100
+
+@router.post("/sweep", response_model=EmbedSweepReport)
+def sweep_embeds(
+    since: Optional[datetime] = None,
+    limit: int = Query(MAX_SWEEP_PER_REQUEST, ge=1, le=MAX_SWEEP_PER_REQUEST),
+    store: DeadLetterStore = Depends(get_dead_letter_store)
+) -> EmbedSweepReport:
+    """
+    URLがあるのに埋め込みのないページを探して埋め込みを追加します
+
+    1リクエストで確認するのは最大 MAX_SWEEP_PER_REQUEST ページです。
+    それ以上ある場合は繰り返し呼び出すか、コマンドから実行してください。
+    """
+    sweeper = EmbedSweeper(NotionService(), dead_letter_store=store)
+    return sweeper.sweep(since=since, limit=limit)
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from app.auth import get_api_key
+from app.exceptions import ConfigurationException
+from app.models import SearchResult
 from app.services.notion_service import NotionService
+from app.services.search_index import SearchIndex, get_search_index
 
 router = APIRouter()
 
@@ -24,3 +28,21 @@ async def create_page(page: NotionPageCreate) -> Dict[str, Any]:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/search", response_model=List[SearchResult], dependencies=[Depends(get_api_key)])
+async def search_pages(
+    q: Optional[str] = None,
+    author: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    search_index: Optional[SearchIndex] = Depends(get_search_index)
+) -> List[SearchResult]:
+    """
+    保存したいいねをローカルの検索インデックスから検索し、NotionのページIDを返します
+
+    Notion APIは呼び出しません。
+    """
+    if search_index is None:
+        raise ConfigurationException("Search index is disabled")
+    return search_index.search(q=q, author=author, since=since, until=until, limit=limit)
@@ -0,0 +1,152 @@
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+from ..exceptions import NotionAPIException
+from ..logging_config import log_stage, logger
+from .sqlite_store import SQLiteStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS authors (
+    user_name TEXT PRIMARY KEY,
+    page_id TEXT NOT NULL
+);
+"""
+
+class AuthorIndex(SQLiteStore):
+    """userNameと著者ページのIDの対応を保存するローカルインデックス
+
+    SQLiteファイルに保存するため、プロセスを再起動しても既知の著者はNotionに問い合わせずに解決できます。
+    """
+
+    SCHEMA = _SCHEMA
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        super().__init__(path or os.getenv("AUTHOR_INDEX_PATH", "data/author_index.db"))
+
+    def get(self, user_name: str) -> Optional[str]:
+        """userNameに対応する著者ページのIDを返します（未登録の場合はNone）"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT page_id FROM authors WHERE user_name = ?", (user_name,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, user_name: str, page_id: str) -> str:
+        """
+        userNameと著者ページのIDを登録します
+
+        既に登録されている場合は上書きせず、登録済みのIDを返します。
+        """
+        with self._connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO authors (user_name, page_id) VALUES (?, ?)", (user_name, page_id))
+            row = conn.execute("SELECT page_id FROM authors WHERE user_name = ?", (user_name,)).fetchone()
+        return row[0]
+
+class AuthorResolver:
+    """userNameから著者データベースのページIDを解決するクラス
+
+    LRUキャッシュ、ローカルインデックス、Notionの著者データベースの順に探し、
+    見つからない場合のみ著者ページを作成します。同じuserNameの解決は直列化されるため、
+    同じ著者のツイートが同時にいいねされても著者ページは一度だけ作成されます。
+    """
+
+    # userNameごとのロックはハッシュで分割した固定数のロックで代用する
+    LOCK_STRIPES = 64
+
+    def __init__(
+        self,
+        notion: Any,
+        authors_database_id: str,
+        index: Optional[AuthorIndex] = None,
+        title_property: Optional[str] = None,
+        cache_size: Optional[int] = None
+    ):
+        self.notion = notion
+        self.authors_database_id = authors_database_id
+        self.index = index or AuthorIndex()
+        self.title_property = title_property or os.getenv("NOTION_AUTHOR_TITLE_PROPERTY", "Name")
+        self.cache_size = cache_size or int(os.getenv("AUTHOR_CACHE_SIZE", "1024"))
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+    def _cache_get(self, user_name: str) -> Optional[str]:
+        with self._cache_lock:
+            page_id = self._cache.get(user_name)
+            if page_id is not None:
+                self._cache.move_to_end(user_name)
+            return page_id
+
+    def _cache_put(self, user_name: str, page_id: str) -> None:
+        with self._cache_lock:
+            self._cache[user_name] = page_id
+            self._cache.move_to_end(user_name)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def resolve(self, user_name: str) -> str:
+        """
+        userNameに対応する著者ページのIDを返します
+
+        Raises:
+            NotionAPIException: 著者ページの検索または作成に失敗した場合
+        """
+        page_id = self._cache_get(user_name)
+        if page_id is not None:
+            return page_id
+
+        lock = self._locks[zlib.crc32(user_name.encode()) % self.LOCK_STRIPES]
+        with lock:
+            # ロックを待っている間に他のスレッドが解決している場合がある
+            page_id = self._cache_get(user_name) or self.index.get(user_name)
+            if page_id is None:
+                page_id = self._find_or_create(user_name)
+                page_id = self.index.put(user_name, page_id)
+            self._cache_put(user_name, page_id)
+            return page_id
+
+    def _find_or_create(self, user_name: str) -> str:
+        # 他のインスタンスが作成済みの場合があるため、作成する前に著者データベースを検索する
+        from .notion_service import classify_error
+        try:
+            with log_stage("resolve_author"):
+                return self._query_or_create(user_name)
+        except Exception as e:
+            error_msg = "Failed to resolve author page"
+            logger.error(error_msg, extra={"error": str(e)}, exc_info=True)
+            raise NotionAPIException(error_msg, details={"api": "error", "error_type": classify_error(e)})
+
+    def _query_or_create(self, user_name: str) -> str:
+        response = self.notion.databases.query(
+            database_id=self.authors_database_id,
+            filter={"property": self.title_property, "title": {"equals": user_name}},
+            page_size=1
+        )
+        if response["results"]:
+            return response["results"][0]["id"]
+
+        page = self.notion.pages.create(
+            parent={"database_id": self.authors_database_id},
+            properties={self.title_property: {"title": [{"text": {"content": user_name}}]}}
+        )
+        logger.info("Created author page", extra={"page_id": page["id"]})
+        return page["id"]
+
+_resolvers: Dict[str, AuthorResolver] = {}
+_resolvers_lock = threading.Lock()
+
+def get_author_resolver(notion: Any) -> Optional[AuthorResolver]:
+    """
+    NOTION_AUTHORS_DATABASE_IDが設定されている場合にAuthorResolverを返します（未設定の場合はNone）
+
+    キャッシュを共有するため、著者データベースごとに1つのインスタンスを使います。
+    """
+    authors_database_id = os.getenv("NOTION_AUTHORS_DATABASE_ID")
+    if not authors_database_id:
+        return None
+    with _resolvers_lock:
+        resolver = _resolvers.get(authors_database_id)
+        if resolver is None:
+            resolver = _resolvers[authors_database_id] = AuthorResolver(notion, authors_database_id)
+        return resolver
@@ -0,0 +1,250 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from ..exceptions import AppException
+from ..logging_config import logger
+from ..models import MigrationReport
+from .notion_payload import AUTHOR_PAGE_ID_FIELD, BLOCKS_PER_APPEND_LIMIT, read_page_properties
+from .notion_service import NotionService
+from .rate_limiter import RateLimiter, get_rate_limiter
+from .search_index import SearchIndex
+
+# 移行先にページを作成済み（埋め込みの追加と移行元のアーカイブは未完了）
+STAGE_CREATED = "created"
+# 移行先にページと埋め込みを作成済み（移行元のアーカイブは未完了）
+STAGE_COPIED = "copied"
+# 移行が完了した
+STAGE_DONE = "done"
+
+RESULT_MIGRATED = "migrated"
+RESULT_SKIPPED = "skipped"
+RESULT_FAILED = "failed"
+
+class MigrationCheckpoint:
+    """移行の進捗を記録するチェックポイント
+
+    ページごとの進捗をJSON Lines形式で追記するため、記録のコストは移行済みの件数によらず一定です。
+    中断した移行を再開すると、完了したページは飛ばし、作成済みのページは続きから処理します。
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, str]] = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 書き込み途中で中断した行は無視する
+                        continue
+                    self._entries[entry["source"]] = entry
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def get(self, source_page_id: str) -> Optional[Dict[str, str]]:
+        """移行元のページの進捗を返します（未着手の場合はNone）"""
+        with self._lock:
+            return self._entries.get(source_page_id)
+
+    def record(self, source_page_id: str, target_page_id: str, stage: str) -> None:
+        """移行元のページの進捗を記録します"""
+        entry = {"source": source_page_id, "target": target_page_id, "stage": stage}
+        with self._lock:
+            self._entries[source_page_id] = entry
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+def _embed_blocks(blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {"object": "block", "type": "embed", "embed": {"url": block["embed"]["url"]}}
+        for block in blocks
+        if block.get("type") == "embed" and block.get("embed", {}).get("url")
+    ]
+
+class DatabaseMigrator:
+    """Notionのデータベース間でいいねを移行するクラス
+
+    移行元のページをdatabases.queryで順に読み込み、プロパティを移行先の対応に変換して
+    ページと埋め込みを作り直します。レートリミッターでNotion APIのレート制限を守りながら、
+    同時に処理するページ数を max_workers に制限して並列に移行します。
+
+    archive_source を指定した場合は、読み込みが終わってから移行したページを移行元でまとめてアーカイブし、
+    search_index から削除します。読み込み中にアーカイブすると、フィルターに一致するページが減って
+    databases.query の続きから漏れるページが出るためです。
+    """
+
+    def __init__(
+        self,
+        source: NotionService,
+        target: NotionService,
+        checkpoint: MigrationCheckpoint,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_workers: Optional[int] = None,
+        archive_source: bool = False,
+        progress_interval: int = 100,
+        search_index: Optional[SearchIndex] = None
+    ):
+        self.source = source
+        self.target = target
+        self.checkpoint = checkpoint
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.max_workers = max_workers or int(os.getenv("MIGRATION_WORKERS", "3"))
+        self.archive_source = archive_source
+        self.progress_interval = progress_interval
+        self.search_index = search_index
+        # アーカイブを待っている (移行元のページID, 移行先のページID)
+        self._pending_archive: List[Tuple[str, str]] = []
+        self._pending_archive_lock = threading.Lock()
+
+    def migrate(
+        self,
+        filter: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        on_progress: Optional[Callable[[MigrationReport], None]] = None
+    ) -> MigrationReport:
+        """
+        移行元のデータベースのページを移行します
+
+        Args:
+            filter: databases.queryのフィルター（移行するページを絞り込む）
+            limit: 移行する最大件数
+            on_progress: progress_interval 件ごとに途中経過を受け取る関数
+
+        Returns:
+            移行の結果（件数とスループット）
+        """
+        started_at = time.monotonic()
+        counts: Counter = Counter()
+        archived = 0
+        counts_lock = threading.Lock()
+        # 読み込んだページを溜め込まないよう、処理待ちのページ数を制限する
+        in_flight = threading.BoundedSemaphore(self.max_workers * 2)
+
+        def report() -> MigrationReport:
+            elapsed = time.monotonic() - started_at
+            total = sum(counts.values())
+            return MigrationReport(
+                total=total,
+                migrated=counts[RESULT_MIGRATED],
+                skipped=counts[RESULT_SKIPPED],
+                failed=counts[RESULT_FAILED],
+                archived=archived,
+                elapsed_seconds=round(elapsed, 3),
+                throughput_per_second=round(counts[RESULT_MIGRATED] / elapsed, 3) if elapsed > 0 else 0.0
+            )
+
+        def on_done(future: Future) -> None:
+            try:
+                result = future.result()
+            except Exception:
+                logger.error("Unexpected error while migrating page", exc_info=True)
+                result = RESULT_FAILED
+            finally:
+                in_flight.release()
+            with counts_lock:
+                counts[result] += 1
+                total = sum(counts.values())
+                progress = report() if on_progress and total % self.progress_interval == 0 else None
+            if progress is not None:
+                on_progress(progress)
+
+        read = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for page in self.source.iter_database_pages(filter=filter):
+                if limit is not None and read >= limit:
+                    break
+                read += 1
+                in_flight.acquire()
+                executor.submit(self._migrate_one, page).add_done_callback(on_done)
+
+        if self.archive_source:
+            archived = self._archive_sources()
+        result = report()
+        logger.info("Finished migrating pages", extra=result.model_dump())
+        return result
+
+    def _migrate_one(self, page: Dict[str, Any]) -> str:
+        """ページを1件移行し、結果を返します"""
+        source_page_id = page["id"]
+        entry = self.checkpoint.get(source_page_id)
+        if entry is not None and entry["stage"] == STAGE_DONE:
+            return RESULT_SKIPPED
+        if entry is not None and entry["stage"] == STAGE_COPIED:
+            # 前回の移行でアーカイブできなかったページは、アーカイブのみ行う
+            if self.archive_source:
+                self._queue_archive(source_page_id, entry["target"])
+            return RESULT_SKIPPED
+
+        data = read_page_properties(page, self.source.property_mapping)
+        # 著者のリレーションは移行先の設定で解決し直す
+        data.pop(AUTHOR_PAGE_ID_FIELD, None)
+        if not data.get("text"):
+            # テキストのないページ（ダイジェストページなど）は移行しない
+            return RESULT_SKIPPED
+
+        try:
+            if entry is None:
+                self.rate_limiter.acquire()
+                target_page_id = self.target.create_page(data)["id"]
+                self.checkpoint.record(source_page_id, target_page_id, STAGE_CREATED)
+            else:
+                target_page_id = entry["target"]
+
+            self.rate_limiter.acquire()
+            embeds = _embed_blocks(self.source.list_block_children(source_page_id))
+            for start in range(0, len(embeds), BLOCKS_PER_APPEND_LIMIT):
+                self.rate_limiter.acquire()
+                self.target.append_blocks(target_page_id, embeds[start:start + BLOCKS_PER_APPEND_LIMIT])
+        except AppException as e:
+            logger.error("Failed to migrate page", extra={"page_id": source_page_id, "error": str(e)})
+            return RESULT_FAILED
+
+        if self.archive_source:
+            self.checkpoint.record(source_page_id, target_page_id, STAGE_COPIED)
+            self._queue_archive(source_page_id, target_page_id)
+        else:
+            self.checkpoint.record(source_page_id, target_page_id, STAGE_DONE)
+        return RESULT_MIGRATED
+
+    def _queue_archive(self, source_page_id: str, target_page_id: str) -> None:
+        with self._pending_archive_lock:
+            self._pending_archive.append((source_page_id, target_page_id))
+
+    def _archive_sources(self) -> int:
+        """アーカイブを待っているページを移行元でアーカイブし、アーカイブした件数を返します"""
+        with self._pending_archive_lock:
+            pending, self._pending_archive = self._pending_archive, []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            archived = [page_id for page_id in executor.map(self._archive_one, pending) if page_id is not None]
+
+        if archived and self.search_index is not None:
+            # アーカイブしたページが検索結果に残らないようにする
+            try:
+                self.search_index.delete(archived)
+            except Exception:
+                logger.error("Failed to remove archived pages from search index", exc_info=True)
+        return len(archived)
+
+    def _archive_one(self, pending: Tuple[str, str]) -> Optional[str]:
+        """移行元のページを1件アーカイブし、アーカイブしたページのIDを返します（失敗した場合はNone）"""
+        source_page_id, target_page_id = pending
+        try:
+            self.rate_limiter.acquire()
+            self.source.archive_page(source_page_id)
+        except AppException as e:
+            # チェックポイントは移行済みのまま残し、再実行した場合にアーカイブのみやり直す
+            logger.error("Failed to archive source page", extra={"page_id": source_page_id, "error": str(e)})
+            return None
+        self.checkpoint.record(source_page_id, target_page_id, STAGE_DONE)
+        return source_page_id
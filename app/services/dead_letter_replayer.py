@@ -0,0 +1,92 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+from ..exceptions import AppException
+from ..logging_config import logger
+from ..models import DeadLetter, ReplayReport
+from .dead_letter_store import DeadLetterStore, STAGE_ADD_TWEET_URL, STAGE_CREATE_PAGE
+from .notion_service import NotionService
+from .rate_limiter import RateLimiter, get_rate_limiter
+
+class DeadLetterReplayer:
+    """デッドレターをNotionへ再書き込みするクラス
+
+    レートリミッターでNotion APIのレート制限を守りながら、複数のデッドレターを並列に再実行します。
+    """
+
+    def __init__(
+        self,
+        store: DeadLetterStore,
+        notion_service: NotionService,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_workers: Optional[int] = None
+    ):
+        self.store = store
+        self.notion_service = notion_service
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.max_workers = max_workers or int(os.getenv("DEAD_LETTER_REPLAY_WORKERS", "3"))
+
+    def replay(
+        self,
+        error_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None
+    ) -> ReplayReport:
+        """
+        条件に一致する未処理のデッドレターを再実行します
+
+        Args:
+            error_type: エラー種別で絞り込む
+            since: この日時以降に保存されたものに絞り込む
+            until: この日時より前に保存されたものに絞り込む
+            limit: 再実行する最大件数
+
+        Returns:
+            再実行の結果（件数とスループット）
+        """
+        # 同時に実行された他の再実行と重複しないよう、対象を再実行中にしてから処理する
+        dead_letters = self.store.claim(error_type=error_type, since=since, until=until, limit=limit)
+        logger.info("Replaying dead letters", extra={"count": len(dead_letters)})
+
+        started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self._replay_one, dead_letters))
+        elapsed = time.monotonic() - started_at
+
+        succeeded = sum(1 for result in results if result)
+        report = ReplayReport(
+            total=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded,
+            elapsed_seconds=round(elapsed, 3),
+            throughput_per_second=round(len(results) / elapsed, 3) if elapsed > 0 else 0.0
+        )
+        logger.info("Finished replaying dead letters", extra=report.model_dump())
+        return report
+
+    def _replay_one(self, dead_letter: DeadLetter) -> bool:
+        """デッドレターを1件再実行し、成功したかどうかを返します"""
+        page_id = dead_letter.page_id
+        stage = STAGE_CREATE_PAGE
+        try:
+            if dead_letter.stage == STAGE_CREATE_PAGE or not page_id:
+                self.rate_limiter.acquire()
+                page_id = self.notion_service.create_page(dead_letter.tweet.model_dump())["id"]
+
+            stage = STAGE_ADD_TWEET_URL
+            if dead_letter.tweet.linkToTweet:
+                self.rate_limiter.acquire()
+                self.notion_service.add_tweet_url(page_id, dead_letter.tweet.linkToTweet)
+        except AppException as e:
+            logger.error(
+                "Failed to replay dead letter",
+                extra={"dead_letter_id": dead_letter.id, "stage": stage, "error": str(e)}
+            )
+            self.store.record_failure(dead_letter.id, e, stage=stage, page_id=page_id)
+            return False
+
+        self.store.mark_replayed(dead_letter.id)
+        return True
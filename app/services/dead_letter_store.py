@@ -0,0 +1,241 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional, Union
+from ..exceptions import AppException
+from ..logging_config import logger
+from ..models import DeadLetter, Tweet
+from .sqlite_store import SQLiteStore
+
+STAGE_CREATE_PAGE = "create_page"
+STAGE_ADD_TWEET_URL = "add_tweet_url"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    error_type TEXT NOT NULL,
+    error_message TEXT NOT NULL,
+    tweet TEXT NOT NULL,
+    page_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    claimed_at TEXT,
+    replayed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_dead_letters_status_created_at
+    ON dead_letters (status, created_at);
+"""
+
+# 再実行中のまま残ったデッドレター（プロセスの異常終了など）を再取得できるようになるまでの秒数
+CLAIM_LEASE_SECONDS = 600
+
+def _utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _to_utc(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+def _to_dead_letter(row: sqlite3.Row) -> DeadLetter:
+    return DeadLetter(
+        id=row["id"],
+        created_at=row["created_at"],
+        stage=row["stage"],
+        error_type=row["error_type"],
+        error_message=row["error_message"],
+        tweet=Tweet(**json.loads(row["tweet"])),
+        page_id=row["page_id"],
+        attempts=row["attempts"],
+        status=row["status"]
+    )
+
+class DeadLetterStore(SQLiteStore):
+    """Notionへの書き込みに失敗したツイートを保存するローカルストア
+
+    SQLiteファイルに保存するため、プロセスが再起動しても失敗したツイートは失われません。
+    """
+
+    SCHEMA = _SCHEMA
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        super().__init__(path or os.getenv("DEAD_LETTER_DB_PATH", "data/dead_letters.db"))
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        tweet: Tweet,
+        exc: AppException,
+        stage: str = STAGE_CREATE_PAGE,
+        page_id: Optional[str] = None
+    ) -> int:
+        """
+        失敗したツイートを保存します
+
+        Args:
+            tweet: 書き込みに失敗したツイート
+            exc: 発生した例外
+            stage: 失敗した処理（create_page または add_tweet_url）
+            page_id: 作成済みのページID（add_tweet_urlで失敗した場合）
+
+        Returns:
+            保存したデッドレターのID
+        """
+        error_type = (exc.details or {}).get("error_type", "unknown")
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO dead_letters (created_at, stage, error_type, error_message, tweet, page_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (_utcnow(), stage, error_type, str(exc), tweet.model_dump_json(), page_id)
+            )
+            dead_letter_id = cursor.lastrowid
+        logger.info(
+            "Stored dead letter",
+            extra={"dead_letter_id": dead_letter_id, "stage": stage, "error_type": error_type}
+        )
+        return dead_letter_id
+
+    def list(
+        self,
+        error_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        status: Optional[str] = "pending",
+        limit: Optional[int] = None
+    ) -> List[DeadLetter]:
+        """
+        条件に一致するデッドレターを古い順に取得します
+
+        Args:
+            error_type: エラー種別で絞り込む
+            since: この日時以降に保存されたものに絞り込む
+            until: この日時より前に保存されたものに絞り込む
+            status: 状態で絞り込む（Noneの場合はすべて）
+            limit: 取得する最大件数
+        """
+        conditions = []
+        params: list = []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        self._append_filters(conditions, params, error_type, since, until)
+
+        query = "SELECT * FROM dead_letters"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [_to_dead_letter(row) for row in rows]
+
+    def claim(
+        self,
+        error_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None
+    ) -> List[DeadLetter]:
+        """
+        条件に一致する未処理のデッドレターを再実行中にして取得します
+
+        取得と状態の更新を1つの書き込みトランザクションで行うため、複数のプロセスやリクエストから
+        同時に呼び出しても同じデッドレターが二重に再実行されることはありません。
+        CLAIM_LEASE_SECONDS を過ぎても再実行中のままのものは再び取得できます。
+        """
+        now = datetime.now(timezone.utc)
+        lease_expired_at = (now - timedelta(seconds=CLAIM_LEASE_SECONDS)).isoformat()
+        conditions = ["(status = 'pending' OR (status = 'replaying' AND claimed_at < ?))"]
+        params: list = [lease_expired_at]
+        self._append_filters(conditions, params, error_type, since, until)
+
+        query = "SELECT * FROM dead_letters WHERE " + " AND ".join(conditions) + " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock, self._connect() as conn:
+            # BEGIN IMMEDIATEで書き込みロックを取得し、他のプロセスと同時に取得しないようにする
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(query, params).fetchall()
+            conn.executemany(
+                "UPDATE dead_letters SET status = 'replaying', claimed_at = ? WHERE id = ?",
+                [(now.isoformat(), row["id"]) for row in rows]
+            )
+        return [_to_dead_letter(row).model_copy(update={"status": "replaying"}) for row in rows]
+
+    @staticmethod
+    def _append_filters(
+        conditions: list,
+        params: list,
+        error_type: Optional[str],
+        since: Optional[datetime],
+        until: Optional[datetime]
+    ) -> None:
+        if error_type is not None:
+            conditions.append("error_type = ?")
+            params.append(error_type)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(_to_utc(since))
+        if until is not None:
+            conditions.append("created_at < ?")
+            params.append(_to_utc(until))
+
+    def mark_replayed(self, dead_letter_id: int) -> None:
+        """デッドレターを再実行済みにします"""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE dead_letters SET status = 'replayed', attempts = attempts + 1, replayed_at = ? "
+                "WHERE id = ?",
+                (_utcnow(), dead_letter_id)
+            )
+
+    def mark_embed_repaired(self, page_id: str) -> int:
+        """
+        埋め込みを別の経路で追加したページの、未処理の埋め込みのデッドレターを再実行済みにします
+
+        Returns:
+            再実行済みにした件数
+        """
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE dead_letters SET status = 'replayed', replayed_at = ? "
+                "WHERE page_id = ? AND stage = ? AND status = 'pending'",
+                (_utcnow(), page_id, STAGE_ADD_TWEET_URL)
+            )
+            return cursor.rowcount
+
+    def record_failure(
+        self,
+        dead_letter_id: int,
+        exc: AppException,
+        stage: Optional[str] = None,
+        page_id: Optional[str] = None
+    ) -> None:
+        """再実行に失敗したデッドレターのエラー情報を更新し、未処理に戻します"""
+        error_type = (exc.details or {}).get("error_type", "unknown")
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE dead_letters SET status = 'pending', claimed_at = NULL, "
+                "attempts = attempts + 1, error_type = ?, error_message = ?, "
+                "stage = COALESCE(?, stage), page_id = COALESCE(?, page_id) WHERE id = ?",
+                (error_type, str(exc), stage, page_id, dead_letter_id)
+            )
+
+_dead_letter_store: Optional[DeadLetterStore] = None
+
+def get_dead_letter_store() -> DeadLetterStore:
+    """DeadLetterStoreのインスタンスを取得します"""
+    global _dead_letter_store
+    if _dead_letter_store is None:
+        _dead_letter_store = DeadLetterStore()
+    return _dead_letter_store
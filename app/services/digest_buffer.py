@@ -0,0 +1,108 @@
+import json
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Union
+from ..models import Tweet
+from .sqlite_store import SQLiteStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS digest_likes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    day TEXT NOT NULL,
+    received_at TEXT NOT NULL,
+    tweet TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_digest_likes_day_id ON digest_likes (day, id);
+CREATE TABLE IF NOT EXISTS digest_pages (
+    day TEXT PRIMARY KEY,
+    page_id TEXT NOT NULL
+);
+"""
+
+class BufferedLike(NamedTuple):
+    """バッファに保存されたいいね"""
+    id: int
+    day: date
+    tweet: Dict[str, Any]
+
+class DigestBuffer(SQLiteStore):
+    """ダイジェストページに書き込む前のいいねを保存するローカルバッファ
+
+    SQLiteファイルに保存するため、書き込み前にプロセスが再起動してもいいねは失われません。
+    日ごとのダイジェストページのIDも保存し、再起動後も同じページに追記します。
+    """
+
+    SCHEMA = _SCHEMA
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        super().__init__(path or os.getenv("DIGEST_BUFFER_DB_PATH", "data/digest_buffer.db"))
+        self._page_ids: Dict[date, str] = {}
+
+    def add(self, tweet: Tweet, received_at: Optional[datetime] = None) -> int:
+        """
+        いいねをバッファに保存します
+
+        Args:
+            tweet: いいねしたツイート
+            received_at: 受信日時（この日付のダイジェストページに書き込む）
+
+        Returns:
+            保存したいいねのID
+        """
+        received_at = received_at or datetime.now(timezone.utc)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO digest_likes (day, received_at, tweet) VALUES (?, ?, ?)",
+                (received_at.date().isoformat(), received_at.isoformat(), tweet.model_dump_json())
+            )
+            return cursor.lastrowid
+
+    def count(self) -> int:
+        """バッファに残っているいいねの数を返します"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM digest_likes").fetchone()[0]
+
+    def pending(self, limit: int) -> List[BufferedLike]:
+        """書き込み前のいいねを日付、受信順に返します"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, day, tweet FROM digest_likes ORDER BY day, id LIMIT ?", (limit,)
+            ).fetchall()
+        return [BufferedLike(row[0], date.fromisoformat(row[1]), json.loads(row[2])) for row in rows]
+
+    def delete(self, ids: Sequence[int]) -> None:
+        """書き込みが完了したいいねをバッファから削除します"""
+        if not ids:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                f"DELETE FROM digest_likes WHERE id IN ({','.join('?' for _ in ids)})", list(ids)
+            )
+
+    def get_page_id(self, day: date) -> Optional[str]:
+        """指定した日のダイジェストページのIDを返します（未作成の場合はNone）"""
+        page_id = self._page_ids.get(day)
+        if page_id is None:
+            with self._connect() as conn:
+                row = conn.execute("SELECT page_id FROM digest_pages WHERE day = ?", (day.isoformat(),)).fetchone()
+            if row:
+                page_id = self._page_ids[day] = row[0]
+        return page_id
+
+    def set_page_id(self, day: date, page_id: str) -> None:
+        """指定した日のダイジェストページのIDを保存します"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO digest_pages (day, page_id) VALUES (?, ?)", (day.isoformat(), page_id)
+            )
+        self._page_ids[day] = page_id
+
+_digest_buffer: Optional[DigestBuffer] = None
+
+def get_digest_buffer() -> DigestBuffer:
+    """DigestBufferのインスタンスを取得します"""
+    global _digest_buffer
+    if _digest_buffer is None:
+        _digest_buffer = DigestBuffer()
+    return _digest_buffer
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import threading
+from datetime import date
+from typing import Optional
+from ..logging_config import logger
+from .digest_buffer import DigestBuffer
+from .notion_payload import BLOCKS_PER_APPEND_LIMIT, tweet_blocks
+from .notion_service import NotionService
+from .rate_limiter import RateLimiter, get_rate_limiter
+
+STORAGE_MODE_PAGE = "page"
+STORAGE_MODE_DIGEST = "digest"
+
+# 定期的な書き込みと、バッファの上限による書き込みが重ならないようにする
+_flush_lock = threading.Lock()
+
+def storage_mode() -> str:
+    """いいねの保存方法（page: いいねごとにページを作成、digest: 日ごとのダイジェストページに追記）"""
+    return os.getenv("STORAGE_MODE", STORAGE_MODE_PAGE).lower()
+
+def digest_flush_interval_seconds() -> float:
+    """バッファを定期的に書き込む間隔（秒）"""
+    return float(os.getenv("DIGEST_FLUSH_INTERVAL_SECONDS", "60"))
+
+def digest_max_buffer() -> int:
+    """この件数に達したら定期的な書き込みを待たずに書き込むバッファの件数"""
+    return int(os.getenv("DIGEST_MAX_BUFFER", "500"))
+
+class DigestWriter:
+    """バッファのいいねを日ごとのダイジェストページに書き込むクラス
+
+    いいね1件あたり段落と埋め込みの2ブロックを、1回のblocks.children.appendで
+    Notionの上限（100ブロック）までまとめて追加します。追加に成功したいいねのみ
+    バッファから削除するため、失敗した場合は次回の書き込みで再試行されます。
+
+    日ごとのページIDはバッファに記録しますが、バッファはインスタンスごとにあるため、
+    記録がない場合はページを作成する前にNotionのデータベースからその日のページを探します。
+    """
+
+    def __init__(
+        self,
+        buffer: DigestBuffer,
+        notion_service: NotionService,
+        rate_limiter: Optional[RateLimiter] = None
+    ):
+        self.buffer = buffer
+        self.notion_service = notion_service
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+
+    def flush(self) -> int:
+        """
+        バッファのいいねをすべて書き込み、書き込んだ件数を返します
+
+        他の書き込みが実行中の場合は何もせずに0を返します。
+
+        Raises:
+            NotionAPIException: Notion APIとの通信に失敗した場合（書き込み済みのいいねは削除済み）
+        """
+        if not _flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            flushed = 0
+            while True:
+                likes = self.buffer.pending(limit=BLOCKS_PER_APPEND_LIMIT)
+                if not likes:
+                    break
+                day = likes[0].day
+                ids = []
+                blocks = []
+                for like in likes:
+                    like_blocks = tweet_blocks(like.tweet)
+                    if like.day != day or len(blocks) + len(like_blocks) > BLOCKS_PER_APPEND_LIMIT:
+                        break
+                    ids.append(like.id)
+                    blocks.extend(like_blocks)
+
+                page_id = self._digest_page_id(day)
+                self.rate_limiter.acquire()
+                self.notion_service.append_blocks(page_id, blocks)
+                self.buffer.delete(ids)
+                flushed += len(ids)
+
+            if flushed:
+                logger.info("Flushed digest buffer", extra={"count": flushed})
+            return flushed
+        finally:
+            _flush_lock.release()
+
+    def _digest_page_id(self, day: date) -> str:
+        page_id = self.buffer.get_page_id(day)
+        if page_id is None:
+            # 他のインスタンスや再作成前のインスタンスが作成したその日のページがあれば追記する
+            self.rate_limiter.acquire()
+            page = self.notion_service.find_digest_page(day)
+            if page is None:
+                self.rate_limiter.acquire()
+                page = self.notion_service.create_digest_page(day)
+            page_id = page["id"]
+            self.buffer.set_page_id(day, page_id)
+        return page_id
+
+async def run_flush_loop(writer: DigestWriter, interval: Optional[float] = None) -> None:
+    """
+    一定間隔でバッファを書き込み続けます（キャンセルされるまで）
+
+    書き込みに失敗した場合はログを出力し、次の間隔で再試行します。
+    """
+    interval = interval or digest_flush_interval_seconds()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(writer.flush)
+        except Exception:
+            logger.error("Failed to flush digest buffer", exc_info=True)
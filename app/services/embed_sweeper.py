@@ -0,0 +1,180 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from ..exceptions import AppException
+from ..logging_config import logger
+from ..models import EmbedSweepReport
+from .dead_letter_store import DeadLetterStore
+from .notion_payload import read_page_properties
+from .notion_service import NotionService
+from .rate_limiter import RateLimiter, get_rate_limiter
+
+# 1回のblocks.children.listで取得する子ブロックの数（Notion APIの上限）
+BLOCK_LIST_PAGE_SIZE = 100
+
+# 定期的な修復と、APIやコマンドからの修復が重ならないようにする
+_sweep_lock = threading.Lock()
+
+def embed_sweep_interval_seconds() -> float:
+    """埋め込みのないページを定期的に修復する間隔（秒）。0（デフォルト）の場合は定期的な修復を行わない
+
+    _sweep_lock はプロセス内でのみ有効なため、複数のインスタンスで有効にすると同じページを
+    同時に修復して埋め込みが二重に追加されることがあります。1つのインスタンスでのみ有効にしてください。
+    """
+    return float(os.getenv("EMBED_SWEEP_INTERVAL_SECONDS", "0"))
+
+def embed_sweep_lookback_hours() -> float:
+    """定期的な修復で確認する、作成されてからの時間（時間）"""
+    return float(os.getenv("EMBED_SWEEP_LOOKBACK_HOURS", "24"))
+
+def embed_sweep_grace_seconds() -> float:
+    """作成されてからこの秒数が経っていないページは、レスポンス後の追加が終わっていない可能性があるため確認しない"""
+    return float(os.getenv("EMBED_SWEEP_GRACE_SECONDS", "300"))
+
+def _has_embed(blocks: List[Dict[str, Any]]) -> bool:
+    return any(block.get("type") == "embed" for block in blocks)
+
+class EmbedSweeper:
+    """URLがあるのに埋め込みのないページを探して埋め込みを追加するクラス
+
+    埋め込みはレスポンス後に追加するため、追加に失敗したりインスタンスが終了したりすると
+    埋め込みのないページが残ります。URLのあるページをdatabases.queryで読み込み、
+    子ブロックをblocks.children.listで1回あたり最大100件ずつ確認して、埋め込みがなければ追加します。
+    レートリミッターでNotion APIのレート制限を守りながら、max_workers 件ずつ並列に確認します。
+    """
+
+    def __init__(
+        self,
+        notion_service: NotionService,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_workers: Optional[int] = None,
+        dead_letter_store: Optional[DeadLetterStore] = None
+    ):
+        self.notion_service = notion_service
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.max_workers = max_workers or int(os.getenv("EMBED_SWEEP_WORKERS", "3"))
+        self.dead_letter_store = dead_letter_store
+
+    def sweep(
+        self,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        grace_seconds: Optional[float] = None
+    ) -> EmbedSweepReport:
+        """
+        埋め込みのないページを探して修復します
+
+        他の修復が実行中の場合は何もせずに0件の結果を返します。
+
+        Args:
+            since: この日時以降に作成されたページに絞り込む（Noneの場合は EMBED_SWEEP_LOOKBACK_HOURS 前から）
+            limit: 確認する最大ページ数
+            grace_seconds: 作成されてからこの秒数が経っていないページは確認しない
+
+        Returns:
+            修復の結果（確認したページ数、埋め込みのないページ数、修復した件数、未修復の件数）
+        """
+        started_at = time.monotonic()
+        if not _sweep_lock.acquire(blocking=False):
+            return EmbedSweepReport(checked=0, missing=0, repaired=0, pending=0, elapsed_seconds=0.0)
+        try:
+            checked = missing = repaired = 0
+            batch: List[Dict[str, Any]] = []
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for page in self.notion_service.iter_database_pages(filter=self._filter(since, grace_seconds)):
+                    if limit is not None and checked + len(batch) >= limit:
+                        break
+                    batch.append(page)
+                    if len(batch) >= self.max_workers:
+                        results = list(executor.map(self._sweep_one, batch))
+                        checked, missing, repaired = self._count(results, checked, missing, repaired)
+                        batch = []
+                if batch:
+                    results = list(executor.map(self._sweep_one, batch))
+                    checked, missing, repaired = self._count(results, checked, missing, repaired)
+        finally:
+            _sweep_lock.release()
+
+        report = EmbedSweepReport(
+            checked=checked,
+            missing=missing,
+            repaired=repaired,
+            pending=missing - repaired,
+            elapsed_seconds=round(time.monotonic() - started_at, 3)
+        )
+        logger.info("Finished sweeping embeds", extra=report.model_dump())
+        return report
+
+    def _filter(self, since: Optional[datetime], grace_seconds: Optional[float]) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        if since is None:
+            since = now - timedelta(hours=embed_sweep_lookback_hours())
+        elif since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        grace = embed_sweep_grace_seconds() if grace_seconds is None else grace_seconds
+        return {"and": [
+            {"property": self.notion_service.property_mapping["linkToTweet"], "url": {"is_not_empty": True}},
+            {"timestamp": "created_time", "created_time": {"on_or_after": since.isoformat()}},
+            {"timestamp": "created_time", "created_time": {"before": (now - timedelta(seconds=grace)).isoformat()}}
+        ]}
+
+    @staticmethod
+    def _count(results: List[Tuple[bool, bool]], checked: int, missing: int, repaired: int) -> Tuple[int, int, int]:
+        for is_missing, is_repaired in results:
+            checked += 1
+            missing += is_missing
+            repaired += is_repaired
+        return checked, missing, repaired
+
+    def _sweep_one(self, page: Dict[str, Any]) -> Tuple[bool, bool]:
+        """ページを1件確認し、埋め込みがなかったかどうかと、修復したかどうかを返します"""
+        page_id = page["id"]
+        link = read_page_properties(page, self.notion_service.property_mapping).get("linkToTweet")
+        if not link:
+            return False, False
+
+        try:
+            start_cursor = None
+            while True:
+                self.rate_limiter.acquire()
+                response = self.notion_service.get_block_children(
+                    page_id, start_cursor=start_cursor, page_size=BLOCK_LIST_PAGE_SIZE
+                )
+                if _has_embed(response["results"]):
+                    return False, False
+                if not response.get("has_more"):
+                    break
+                start_cursor = response["next_cursor"]
+
+            self.rate_limiter.acquire()
+            self.notion_service.add_tweet_url(page_id, link)
+        except AppException as e:
+            logger.error("Failed to repair embed", extra={"page_id": page_id, "error": str(e)})
+            return True, False
+
+        logger.info("Repaired missing embed", extra={"page_id": page_id})
+        if self.dead_letter_store is not None:
+            # 同じ埋め込みがデッドレターの再実行で二重に追加されないようにする
+            try:
+                self.dead_letter_store.mark_embed_repaired(page_id)
+            except Exception:
+                logger.error("Failed to update dead letters for repaired embed", exc_info=True)
+        return True, True
+
+async def run_sweep_loop(sweeper: EmbedSweeper, interval: Optional[float] = None) -> None:
+    """
+    一定間隔で埋め込みのないページを修復し続けます（キャンセルされるまで）
+
+    修復に失敗した場合はログを出力し、次の間隔で再試行します。
+    """
+    interval = interval or embed_sweep_interval_seconds()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(sweeper.sweep)
+        except Exception:
+            logger.error("Failed to sweep embeds", exc_info=True)
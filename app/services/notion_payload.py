@@ -0,0 +1,211 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+from ..exceptions import ConfigurationException, ValidationException
+
+# ツイートのフィールドとNotionデータベースのプロパティ名の対応（デフォルト）
+DEFAULT_PROPERTY_MAPPING = {
+    "userName": "ID",
+    "text": "Text",
+    "linkToTweet": "URL",
+    "createdAt": "Tweeted_at",
+}
+
+# 著者データベースのページIDを設定するフィールド（著者のリレーションを有効にした場合のみ）
+AUTHOR_PAGE_ID_FIELD = "authorPageId"
+
+# スキーマを取得できない場合に想定するフィールドごとのプロパティの型
+DEFAULT_FIELD_TYPES = {
+    "userName": "title",
+    "text": "rich_text",
+    "linkToTweet": "url",
+    "createdAt": "date",
+    AUTHOR_PAGE_ID_FIELD: "relation",
+}
+
+# Notion APIの制限
+RICH_TEXT_CONTENT_LIMIT = 2000
+RICH_TEXT_MAX_ITEMS = 100
+URL_MAX_LENGTH = 2000
+BLOCKS_PER_APPEND_LIMIT = 100
+
+def chunk_text(text: str, limit: int = RICH_TEXT_CONTENT_LIMIT) -> List[str]:
+    """
+    テキストをNotionのrich text要素1つあたりの文字数制限に収まるように分割します
+
+    Notionの文字数制限はUTF-16のコードユニット数で数えられるため、
+    BMP外の文字（絵文字など）は2文字として数えます。
+    """
+    chunks = []
+    start = 0
+    units = 0
+    for index, char in enumerate(text):
+        width = 2 if ord(char) > 0xFFFF else 1
+        if units + width > limit:
+            chunks.append(text[start:index])
+            start = index
+            units = 0
+        units += width
+    if start < len(text):
+        chunks.append(text[start:])
+    return chunks
+
+def _to_text(value: Any) -> str:
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+def _encode_rich_text(name: str, value: Any) -> List[Dict[str, Any]]:
+    chunks = chunk_text(_to_text(value))
+    if len(chunks) > RICH_TEXT_MAX_ITEMS:
+        raise ValidationException(
+            f"Property '{name}' is too long",
+            {"property": name, "max_length": RICH_TEXT_CONTENT_LIMIT * RICH_TEXT_MAX_ITEMS}
+        )
+    return [{"text": {"content": chunk}} for chunk in chunks]
+
+def _encode_title(name: str, value: Any) -> Dict[str, Any]:
+    return {"title": _encode_rich_text(name, value)}
+
+def _encode_rich_text_property(name: str, value: Any) -> Dict[str, Any]:
+    return {"rich_text": _encode_rich_text(name, value)}
+
+def _encode_url(name: str, value: Any) -> Dict[str, Any]:
+    url = str(value)
+    if len(url) > URL_MAX_LENGTH:
+        raise ValidationException(
+            f"Property '{name}' is too long",
+            {"property": name, "max_length": URL_MAX_LENGTH}
+        )
+    return {"url": url}
+
+def _encode_date(name: str, value: Any) -> Dict[str, Any]:
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            raise ValidationException(
+                f"Property '{name}' must be an ISO format date",
+                {"property": name}
+            )
+    return {"date": {"start": value.isoformat()}}
+
+def _encode_relation(name: str, value: Any) -> Dict[str, Any]:
+    return {"relation": [{"id": str(value)}]}
+
+_ENCODERS: Dict[str, Callable[[str, Any], Dict[str, Any]]] = {
+    "title": _encode_title,
+    "rich_text": _encode_rich_text_property,
+    "url": _encode_url,
+    "date": _encode_date,
+    "relation": _encode_relation,
+}
+
+class PagePayloadBuilder:
+    """コンパイル済みのプロパティの対応からページ作成用のプロパティを組み立てるクラス"""
+
+    def __init__(self, properties: List[Tuple[str, str, str]]):
+        # (フィールド名, プロパティ名, プロパティの型) のリスト
+        self.properties = properties
+        self._encoders = [
+            (field, name, _ENCODERS[property_type])
+            for field, name, property_type in properties
+        ]
+
+    def build(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        ツイートのデータからNotionのプロパティを組み立てます
+
+        Raises:
+            ValidationException: Notionの制限を超える値が含まれている場合
+        """
+        return {name: encode(name, data[field]) for field, name, encode in self._encoders}
+
+    def build_fields(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """dataに含まれるフィールドのプロパティのみを組み立てます"""
+        return {name: encode(name, data[field]) for field, name, encode in self._encoders if field in data}
+
+def tweet_blocks(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    ダイジェストページに追加するツイート1件分のブロック（本文の段落と埋め込み）を組み立てます
+
+    Raises:
+        ValidationException: Notionの制限を超える値が含まれている場合
+    """
+    header = f"@{data['userName']} ({_to_text(data['createdAt'])})\n"
+    blocks = [{
+        "object": "block",
+        "type": "paragraph",
+        "paragraph": {"rich_text": _encode_rich_text("text", header + str(data["text"]))}
+    }]
+    if data.get("linkToTweet"):
+        blocks.append({
+            "object": "block",
+            "type": "embed",
+            "embed": _encode_url("linkToTweet", data["linkToTweet"])
+        })
+    return blocks
+
+def compile_payload_builder(
+    schema: Dict[str, Dict[str, Any]],
+    mapping: Dict[str, str] = DEFAULT_PROPERTY_MAPPING
+) -> PagePayloadBuilder:
+    """
+    データベースのスキーマとプロパティの対応からPagePayloadBuilderを作成します
+
+    Args:
+        schema: databases.retrieveで取得したプロパティ（プロパティ名 -> プロパティ定義）
+        mapping: ツイートのフィールド名 -> プロパティ名
+
+    Raises:
+        ConfigurationException: 対応するプロパティが存在しない、または型に対応していない場合
+    """
+    properties = []
+    errors = {}
+    for field, name in mapping.items():
+        if name not in schema:
+            errors[field] = f"Property '{name}' does not exist in the database"
+            continue
+        property_type = schema[name].get("type")
+        if property_type not in _ENCODERS:
+            errors[field] = f"Property '{name}' has unsupported type '{property_type}'"
+            continue
+        properties.append((field, name, property_type))
+
+    if errors:
+        raise ConfigurationException("Notion database schema does not match property mapping", errors)
+    return PagePayloadBuilder(properties)
+
+def _plain_text(items: List[Dict[str, Any]]) -> str:
+    return "".join(item.get("plain_text") or item.get("text", {}).get("content", "") for item in items)
+
+def read_page_properties(
+    page: Dict[str, Any],
+    mapping: Dict[str, str] = DEFAULT_PROPERTY_MAPPING
+) -> Dict[str, Any]:
+    """
+    databases.queryなどで取得したページのプロパティをツイートのフィールドに戻します
+
+    ページに存在しないプロパティのフィールドは含めません。
+    """
+    properties = page.get("properties", {})
+    data: Dict[str, Any] = {}
+    for field, name in mapping.items():
+        prop = properties.get(name)
+        if prop is None:
+            continue
+        property_type = prop.get("type")
+        if property_type in ("title", "rich_text"):
+            data[field] = _plain_text(prop.get(property_type) or [])
+        elif property_type == "url":
+            data[field] = prop.get("url") or ""
+        elif property_type == "date":
+            data[field] = (prop.get("date") or {}).get("start")
+        elif property_type == "relation":
+            relation = prop.get("relation") or []
+            data[field] = relation[0]["id"] if relation else None
+    return data
+
+def default_schema(mapping: Dict[str, str] = DEFAULT_PROPERTY_MAPPING) -> Dict[str, Dict[str, Any]]:
+    """スキーマを取得できない場合に使うスキーマを返します"""
+    return {
+        name: {"type": DEFAULT_FIELD_TYPES.get(field, "rich_text")}
+        for field, name in mapping.items()
+    }
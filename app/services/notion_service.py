@@ -1,14 +1,112 @@
+import json
 import os
-from typing import Dict, Any, Optional
+import threading
+import time
+from datetime import date
+from typing import Dict, Any, Iterator, List, Optional
+import httpx
 from notion_client import Client
-from notion_client.errors import APIResponseError
+from notion_client.errors import APIResponseError, HTTPResponseError, RequestTimeoutError
 from ..exceptions import NotionAPIException, ValidationException, ConfigurationException
-from ..logging_config import logger
+from ..deadline import current_deadline
+from ..logging_config import log_stage, logger
+from .author_index import AuthorResolver, get_author_resolver
+from .search_index import SearchIndex, get_search_index
+from .notion_payload import (
+    AUTHOR_PAGE_ID_FIELD,
+    BLOCKS_PER_APPEND_LIMIT,
+    DEFAULT_PROPERTY_MAPPING,
+    PagePayloadBuilder,
+    compile_payload_builder,
+    default_schema
+)
+
+def classify_error(error: Exception) -> str:
+    """
+    Notion API呼び出しで発生した例外をエラー種別に分類します
+
+    Returns:
+        APIResponseErrorの場合はNotionのエラーコード（rate_limited, validation_error など）、
+        タイムアウトの場合は timeout、HTTPエラーの場合は http_<ステータスコード>、
+        それ以外は unknown
+    """
+    if isinstance(error, APIResponseError):
+        return str(error.code.value if hasattr(error.code, "value") else error.code)
+    if isinstance(error, RequestTimeoutError):
+        return "timeout"
+    if isinstance(error, HTTPResponseError):
+        return f"http_{error.status}"
+    return "unknown"
+
+class _DeadlineAwareClient(Client):
+    """現在のリクエストの期限までの残り時間を各API呼び出しのタイムアウトにするNotionクライアント"""
+
+    def _build_request(self, *args, **kwargs) -> httpx.Request:
+        deadline = current_deadline.get()
+        if deadline is not None and deadline.expired():
+            # 期限切れの場合は送信せずにタイムアウトとして扱う
+            raise RequestTimeoutError("Request deadline exceeded before calling Notion API")
+        request = super()._build_request(*args, **kwargs)
+        if deadline is not None:
+            request.extensions["timeout"] = httpx.Timeout(deadline.remaining()).as_dict()
+        return request
+
+def _load_property_mapping() -> Dict[str, str]:
+    """環境変数 NOTION_PROPERTY_MAPPING（JSON）からプロパティの対応を読み込みます"""
+    mapping = dict(DEFAULT_PROPERTY_MAPPING)
+    raw = os.getenv("NOTION_PROPERTY_MAPPING")
+    if raw:
+        try:
+            mapping.update(json.loads(raw))
+        except (json.JSONDecodeError, TypeError, ValueError) as e:
+            raise ConfigurationException("NOTION_PROPERTY_MAPPING is not valid JSON", {"error": str(e)})
+    return mapping
+
+# スキーマの取得に失敗した後、再取得を試みるまでの秒数
+SCHEMA_RETRY_SECONDS = 30.0
+
+class _SchemaCache:
+    """データベースごとのスキーマとコンパイル済みPagePayloadBuilderのキャッシュ
+
+    NotionServiceはリクエストごとに作成されることがあるため、キャッシュはモジュール単位で共有します。
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.schema: Optional[Dict[str, Any]] = None
+        self.fetched_at = 0.0
+        self.failed_at: Optional[float] = None
+        self.builders: Dict[tuple, PagePayloadBuilder] = {}
+
+_schema_caches: Dict[str, _SchemaCache] = {}
+_schema_caches_lock = threading.Lock()
+
+def _get_schema_cache(database_id: str) -> _SchemaCache:
+    with _schema_caches_lock:
+        cache = _schema_caches.get(database_id)
+        if cache is None:
+            cache = _schema_caches[database_id] = _SchemaCache()
+        return cache
+
+def clear_schema_cache() -> None:
+    """すべてのデータベースのスキーマのキャッシュを破棄します"""
+    with _schema_caches_lock:
+        _schema_caches.clear()
 
 class NotionService:
-    def __init__(self, api_key: Optional[str] = None, database_id: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        database_id: Optional[str] = None,
+        property_mapping: Optional[Dict[str, str]] = None,
+        author_resolver: Optional[AuthorResolver] = None,
+        search_index: Optional[SearchIndex] = None,
+        use_search_index: bool = True
+    ):
         self.api_key = api_key or os.getenv("NOTION_API_KEY")
         self.database_id = database_id or os.getenv("NOTION_DATABASE_ID")
+        self.property_mapping = property_mapping or _load_property_mapping()
+        self.schema_ttl = float(os.getenv("NOTION_SCHEMA_TTL_SECONDS", "600"))
         
         if not self.api_key:
             raise ConfigurationException("NOTION_API_KEY is not set")
@@ -16,11 +114,23 @@ class NotionService:
             raise ConfigurationException("NOTION_DATABASE_ID is not set")
         
         try:
-            self.notion = Client(auth=self.api_key)
+            self.notion = _DeadlineAwareClient(auth=self.api_key)
             logger.info("NotionService initialized successfully")
         except Exception as e:
             logger.error("Failed to initialize NotionService", exc_info=True)
             raise ConfigurationException("Failed to initialize Notion client", {"error": str(e)})
+
+        self.search_index = search_index
+        # 移行先など、検索インデックスの対象ではないデータベースではFalseにする
+        self.use_search_index = use_search_index
+
+        # 著者データベースが設定されている場合は、著者ページへのリレーションを追加する
+        self.author_resolver = author_resolver or get_author_resolver(self.notion)
+        if self.author_resolver is not None:
+            self.property_mapping = {
+                **self.property_mapping,
+                AUTHOR_PAGE_ID_FIELD: os.getenv("NOTION_AUTHOR_RELATION_PROPERTY", "Author")
+            }
     
     def create_page(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -37,63 +147,293 @@ class NotionService:
             作成されたページの情報
         
         Raises:
-            ValidationException: 必要なデータが不足している場合
-            NotionAPIException: Notion APIとの通信に失敗した場合
+            ValidationException: 必要なデータが不足している場合、またはNotionの制限を超える場合
+            NotionAPIException: Notion APIとの通信に失敗した場合、またはプロパティの対応が
+                データベースのスキーマと一致しない場合（error_typeはschema_mismatch）
         """
-        logger.info("Creating new Notion page", extra={"data": data})
+        # ツイートの本文やユーザー名はログに出力しない
+        logger.info("Creating new Notion page", extra={"text_length": len(data.get("text") or "")})
         
         required_fields = ["userName", "text", "linkToTweet", "createdAt"]
         missing_fields = [field for field in required_fields if not data.get(field)]
         
         if missing_fields:
             error_msg = f"Required fields are missing or empty: {', '.join(missing_fields)}"
-            logger.error(error_msg, extra={"data": data})
+            logger.error(error_msg, extra={"missing_fields": missing_fields})
             raise ValidationException(error_msg, {"missing_fields": missing_fields})
             
-        properties = {
-            "ID": {
-                "title": [
-                    {
-                        "text": {
-                            "content": data["userName"]
-                        }
-                    }
-                ]
-            },
-            "Text": {
-                "rich_text": [
-                    {
-                        "text": {
-                            "content": data["text"]
-                        }
-                    }
-                ]
-            },
-            "URL": {
-                "url": data["linkToTweet"]
-            },
-            "Tweeted_at": {
-                "date": {
-                    "start": data["createdAt"].isoformat() if hasattr(data["createdAt"], "isoformat") else data["createdAt"]
-                }
-            }
-        }
-        
+        # スキーマに合わせてプロパティを組み立て、Notionの制限を送信前に検証する
         try:
-            response = self.notion.pages.create(
-                parent={"database_id": self.database_id},
-                properties=properties
+            builder = self.get_payload_builder()
+        except ConfigurationException as e:
+            # データベースのスキーマが変更された場合も、後で再実行できるよう書き込みの失敗として扱う
+            logger.error("Property mapping does not match database schema", extra={"error": str(e)})
+            raise NotionAPIException(
+                str(e),
+                details={**(e.details or {}), "api": "error", "error_type": "schema_mismatch"}
             )
+        if self.author_resolver is not None:
+            data = {**data, AUTHOR_PAGE_ID_FIELD: self.author_resolver.resolve(data["userName"])}
+        properties = builder.build(data)
+        
+        try:
+            with log_stage("create_page"):
+                response = self._create_page_with_schema_retry(builder, properties, data)
             logger.info("Successfully created Notion page", extra={"page_id": response["id"]})
-            return response
         except APIResponseError as e:
             error_msg = "Failed to create Notion page"
             logger.error(error_msg, extra={"error": str(e)}, exc_info=True)
-            raise NotionAPIException(error_msg, details={"api": "error"})
+            raise NotionAPIException(error_msg, details={"api": "error", "error_type": classify_error(e)})
         except Exception as e:
             error_msg = "Failed to create Notion page"
             logger.error(error_msg, exc_info=True)
-            raise NotionAPIException(error_msg, details={"api": "error"})
+            raise NotionAPIException(error_msg, details={"api": "error", "error_type": classify_error(e)})
+
+        self._mirror_to_search_index(response["id"], data)
+        return response
+
+    def _mirror_to_search_index(self, page_id: str, data: Dict[str, Any]) -> None:
+        """作成したページを検索インデックスに登録します（失敗してもページの作成は失敗させない）"""
+        if not self.use_search_index:
+            return
+        search_index = self.search_index or get_search_index()
+        if search_index is None:
+            return
+        try:
+            search_index.add(page_id, data)
+        except Exception:
+            logger.error("Failed to update search index", extra={"page_id": page_id}, exc_info=True)
+
+    def _create_page_with_schema_retry(
+        self,
+        builder: PagePayloadBuilder,
+        properties: Dict[str, Any],
+        data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        ページを作成します。スキーマの不一致で失敗した場合はスキーマを取得し直して1度だけ再試行します
+
+        ツイートの内容が原因のエラーでも同じvalidation_errorになるため、スキーマを取得してから
+        SCHEMA_RETRY_SECONDS が経っていない場合は取得し直しません。
+        """
+        try:
+            return self.notion.pages.create(
+                parent={"database_id": self.database_id},
+                properties=properties
+            )
+        except APIResponseError as e:
+            if classify_error(e) != "validation_error":
+                raise
+            if time.monotonic() - _get_schema_cache(self.database_id).fetched_at < SCHEMA_RETRY_SECONDS:
+                raise
+            logger.info("Refreshing Notion database schema after validation error", extra={"error": str(e)})
+            refreshed = self.get_payload_builder(force_refresh=True)
+            # スキーマが変わっていない場合は再試行しても同じエラーになる
+            if refreshed.properties == builder.properties:
+                raise
+            return self.notion.pages.create(
+                parent={"database_id": self.database_id},
+                properties=refreshed.build(data)
+            )
+
+    def get_database_schema(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        データベースのスキーマ（プロパティ定義）を取得します
+
+        取得したスキーマは NOTION_SCHEMA_TTL_SECONDS の間、プロセス内で共有してキャッシュします。
+        取得に失敗した場合は前回取得したスキーマを使い、一度も取得できていない場合のみ
+        デフォルトのプロパティ定義を使います（デフォルトはキャッシュしません）。
+
+        Args:
+            force_refresh: キャッシュを使わずに取得し直す場合はTrue
+        """
+        cache = _get_schema_cache(self.database_id)
+        with cache.lock:
+            now = time.monotonic()
+            if not force_refresh:
+                if cache.schema is not None and now - cache.fetched_at <= self.schema_ttl:
+                    return cache.schema
+                # 取得に失敗した直後は、書き込みのたびに再取得しない
+                if cache.failed_at is not None and now - cache.failed_at < SCHEMA_RETRY_SECONDS:
+                    return cache.schema if cache.schema is not None else default_schema(self.property_mapping)
+
+            try:
+                with log_stage("retrieve_schema"):
+                    database = self.notion.databases.retrieve(database_id=self.database_id)
+            except Exception as e:
+                cache.failed_at = now
+                logger.error(
+                    "Failed to fetch Notion database schema",
+                    extra={"error": str(e), "error_type": classify_error(e), "has_cached_schema": cache.schema is not None}
+                )
+                return cache.schema if cache.schema is not None else default_schema(self.property_mapping)
+
+            cache.schema = database["properties"]
+            cache.fetched_at = now
+            cache.failed_at = None
+            cache.builders.clear()
+            logger.info("Fetched Notion database schema", extra={"properties": list(cache.schema)})
+            return cache.schema
+
+    def get_payload_builder(self, force_refresh: bool = False) -> PagePayloadBuilder:
+        """
+        データベースのスキーマからコンパイルしたPagePayloadBuilderを取得します
+
+        Raises:
+            ConfigurationException: プロパティの対応がスキーマと一致しない場合
+        """
+        cache = _get_schema_cache(self.database_id)
+        with cache.lock:
+            schema = self.get_database_schema(force_refresh=force_refresh)
+            if schema is not cache.schema:
+                # デフォルトのスキーマから作成したものはキャッシュしない
+                return compile_payload_builder(schema, self.property_mapping)
+            key = tuple(sorted(self.property_mapping.items()))
+            builder = cache.builders.get(key)
+            if builder is None:
+                builder = cache.builders[key] = compile_payload_builder(schema, self.property_mapping)
+            return builder
+
+    def iter_database_pages(
+        self,
+        filter: Optional[Dict[str, Any]] = None,
+        page_size: int = 100
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        データベースのページをdatabases.queryのページネーションで順に取得します
+
+        Raises:
+            NotionAPIException: Notion APIとの通信に失敗した場合
+        """
+        params: Dict[str, Any] = {"database_id": self.database_id, "page_size": page_size}
+        if filter is not None:
+            params["filter"] = filter
+        while True:
+            try:
+                response = self.notion.databases.query(**params)
+            except Exception as e:
+                error_msg = "Failed to query Notion database"
+                logger.error(error_msg, extra={"error": str(e)}, exc_info=True)
+                raise NotionAPIException(error_msg, details={"api": "error", "error_type": classify_error(e)})
+            yield from response["results"]
+            if not response.get("has_more"):
+                return
+            params["start_cursor"] = response["next_cursor"]
+
+    def list_block_children(self, block_id: str, page_size: int = 100) -> List[Dict[str, Any]]:
+        """
+        ブロック（ページ）の子ブロックをページネーションですべて取得します
+
+        Raises:
+            NotionAPIException: Notion APIとの通信に失敗した場合
+        """
+        blocks: List[Dict[str, Any]] = []
+        start_cursor = None
+        while True:
+            response = self.get_block_children(block_id, start_cursor=start_cursor, page_size=page_size)
+            blocks.extend(response["results"])
+            if not response.get("has_more"):
+                return blocks
+            start_cursor = response["next_cursor"]
+
+    def get_block_children(
+        self,
+        block_id: str,
+        start_cursor: Optional[str] = None,
+        page_size: int = 100
+    ) -> Dict[str, Any]:
+        """
+        ブロック（ページ）の子ブロックを1回のblocks.children.listで取得します
+
+        続きがある場合はレスポンスのnext_cursorをstart_cursorに指定して呼び出してください。
+
+        Raises:
+            NotionAPIException: Notion APIとの通信に失敗した場合
+        """
+        params: Dict[str, Any] = {"block_id": block_id, "page_size": page_size}
+        if start_cursor is not None:
+            params["start_cursor"] = start_cursor
+        try:
+            return self.notion.blocks.children.list(**params)
+        except Exception as e:
+            error_msg = "Failed to list block children"
+            logger.error(error_msg, extra={"error": str(e), "block_id": block_id}, exc_info=True)
+            raise NotionAPIException(error_msg, details={"api": "error", "error_type": classify_error(e)})
+
+    def archive_page(self, page_id: str) -> Dict[str, Any]:
+        """
+        ページをアーカイブします
+
+        Raises:
+            NotionAPIException: Notion APIとの通信に失敗した場合
+        """
+        try:
+            return self.notion.pages.update(page_id=page_id, archived=True)
+        except Exception as e:
+            error_msg = "Failed to archive Notion page"
+            logger.error(error_msg, extra={"error": str(e), "page_id": page_id}, exc_info=True)
+            raise NotionAPIException(error_msg, details={"api": "error", "error_type": classify_error(e)})
+
+    def find_digest_page(self, day: date) -> Optional[Dict[str, Any]]:
+        """
+        指定した日のダイジェストページをタイトルと日付のプロパティで探します（ない場合はNone）
+
+        Raises:
+            ConfigurationException: プロパティの対応がデータベースのスキーマと一致しない場合
+            NotionAPIException: Notion APIとの通信に失敗した場合
+        """
+        types = {field: (name, property_type) for field, name, property_type in self.get_payload_builder().properties}
+        conditions = []
+        for field, value in (("userName", f"Likes {day.isoformat()}"), ("createdAt", day.isoformat())):
+            name, property_type = types[field]
+            conditions.append({"property": name, property_type: {"equals": value}})
+        return next(self.iter_database_pages(filter={"and": conditions}, page_size=1), None)
+
+    def create_digest_page(self, day: date) -> Dict[str, Any]:
+        """
+        指定した日のダイジェストページを作成します
+
+        タイトルと日付のプロパティのみを設定し、ツイートは本文のブロックとして追加します。
+
+        Raises:
+            ConfigurationException: プロパティの対応がデータベースのスキーマと一致しない場合
+            NotionAPIException: Notion APIとの通信に失敗した場合
+        """
+        builder = self.get_payload_builder()
+        properties = builder.build_fields({"userName": f"Likes {day.isoformat()}", "createdAt": day.isoformat()})
+        try:
+            with log_stage("create_digest_page"):
+                response = self.notion.pages.create(
+                    parent={"database_id": self.database_id},
+                    properties=properties
+                )
+            logger.info("Created digest page", extra={"page_id": response["id"], "day": day.isoformat()})
+            return response
+        except Exception as e:
+            error_msg = "Failed to create digest page"
+            logger.error(error_msg, extra={"error": str(e)}, exc_info=True)
+            raise NotionAPIException(error_msg, details={"api": "error", "error_type": classify_error(e)})
+
+    def append_blocks(self, page_id: str, blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        ページの本文にブロックを追加します（1回あたりBLOCKS_PER_APPEND_LIMIT件まで）
+
+        Raises:
+            ValidationException: ブロックの数が制限を超える場合
+            NotionAPIException: Notion APIとの通信に失敗した場合
+        """
+        if len(blocks) > BLOCKS_PER_APPEND_LIMIT:
+            raise ValidationException(
+                "Too many blocks to append",
+                {"count": len(blocks), "max_count": BLOCKS_PER_APPEND_LIMIT}
+            )
+        try:
+            with log_stage("append_blocks", block_count=len(blocks)):
+                return self.notion.blocks.children.append(block_id=page_id, children=blocks)
+        except Exception as e:
+            error_msg = "Failed to append blocks"
+            logger.error(error_msg, extra={"error": str(e), "page_id": page_id}, exc_info=True)
+            raise NotionAPIException(error_msg, details={"api": "error", "error_type": classify_error(e)})
 
     def add_tweet_url(self, page_id: str, linkToTweet: str) -> Dict[str, Any]:
         """
@@ -118,25 +458,26 @@ class NotionService:
             raise ValidationException("Tweet URL is required")
             
         try:
-            response = self.notion.blocks.children.append(
-                block_id=page_id,
-                children=[
-                    {
-                        "object": "block",
-                        "type": "embed",
-                        "embed": {
-                            "url": linkToTweet
+            with log_stage("add_tweet_url"):
+                response = self.notion.blocks.children.append(
+                    block_id=page_id,
+                    children=[
+                        {
+                            "object": "block",
+                            "type": "embed",
+                            "embed": {
+                                "url": linkToTweet
+                            }
                         }
-                    }
-                ]
-            )
+                    ]
+                )
             logger.info("Successfully added embed tweet", extra={"page_id": page_id})
             return response
         except APIResponseError as e:
             error_msg = "Failed to add embed tweet"
             logger.error(error_msg, extra={"error": str(e)}, exc_info=True)
-            raise NotionAPIException(error_msg, details={"api": "error"})
+            raise NotionAPIException(error_msg, details={"api": "error", "error_type": classify_error(e)})
         except Exception as e:
             error_msg = "Failed to add embed tweet"
             logger.error(error_msg, exc_info=True)
-            raise NotionAPIException(error_msg, details={"api": "error"})
+            raise NotionAPIException(error_msg, details={"api": "error", "error_type": classify_error(e)})
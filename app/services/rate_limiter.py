@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """トークンバケット方式のレートリミッター
+
+    Notion APIのレート制限（平均3リクエスト/秒）を超えないように、
+    複数スレッドから呼び出されるNotion API呼び出しの間隔を調整します。
+    """
+
+    def __init__(self, rate_per_second: Optional[float] = None, burst: Optional[int] = None):
+        self.rate_per_second = rate_per_second or float(os.getenv("NOTION_RATE_LIMIT_PER_SECOND", "3"))
+        self.burst = burst or max(1, int(self.rate_per_second))
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.burst),
+            self._tokens + (now - self._updated_at) * self.rate_per_second
+        )
+        self._updated_at = now
+
+    def acquire(self) -> None:
+        """トークンを1つ取得します。トークンがない場合は補充されるまで待機します"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate_per_second
+            time.sleep(wait)
+
+    def consume(self) -> None:
+        """
+        待機せずにトークンを1つ消費します
+
+        トークンがない場合は前借りし、その分だけ acquire で待機している他の呼び出し元が後回しになります。
+        レスポンスを待たせられないWebhookのNotion API呼び出しに使います。
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    プロセス全体で共有するRateLimiterを取得します
+
+    Webhook、デッドレターの再実行、埋め込みの修復、ダイジェストの書き込みなどが同じトークンバケットを使うため、
+    同時に実行してもプロセス全体でNotion APIのレート制限を超えません。
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter()
+    return _rate_limiter
+
+def set_rate_limiter(rate_limiter: Optional[RateLimiter] = None) -> None:
+    """
+    共有するRateLimiterを置き換えます（Noneの場合は次回の取得時に環境変数から作り直す）
+
+    Notion APIを呼び出さない再生やテストで、レート制限をかけないために使います。
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = rate_limiter
@@ -0,0 +1,177 @@
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from ..models import SearchResult
+from .sqlite_store import SQLiteStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS likes (
+    id INTEGER PRIMARY KEY,
+    page_id TEXT NOT NULL UNIQUE,
+    user_name TEXT NOT NULL COLLATE NOCASE,
+    created_at TEXT,
+    link TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_likes_user_name_created_at ON likes (user_name, created_at);
+CREATE INDEX IF NOT EXISTS idx_likes_created_at ON likes (created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS likes_fts USING fts5(
+    text, content='likes', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS likes_ai AFTER INSERT ON likes BEGIN
+    INSERT INTO likes_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS likes_ad AFTER DELETE ON likes BEGIN
+    INSERT INTO likes_fts (likes_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS likes_au AFTER UPDATE ON likes BEGIN
+    INSERT INTO likes_fts (likes_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO likes_fts (rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+# trigramトークナイザーで全文検索できる最小の文字数（これより短い語は部分一致で絞り込む）
+TRIGRAM_MIN_LENGTH = 3
+
+def _to_utc(value: Any) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class SearchIndex(SQLiteStore):
+    """保存したいいねを検索するためのローカルの全文検索インデックス
+
+    SQLiteのFTS5（trigramトークナイザー）を使うため、空白で区切られない日本語のテキストも
+    部分一致で検索できます。検索時にNotion APIは呼び出しません。
+    """
+
+    SCHEMA = _SCHEMA
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        super().__init__(path or os.getenv("SEARCH_INDEX_DB_PATH", "data/search_index.db"))
+
+    def add(self, page_id: str, data: Dict[str, Any]) -> None:
+        """ツイートを登録します（同じページが登録済みの場合は更新）"""
+        self.add_many([(page_id, data)])
+
+    def add_many(self, entries: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        複数のツイートを1つのトランザクションで登録し、登録した件数を返します
+
+        Args:
+            entries: (ページID, ツイートのデータ) の組
+        """
+        rows = [
+            (
+                page_id,
+                data.get("userName") or "",
+                _to_utc(data.get("createdAt")),
+                data.get("linkToTweet") or None,
+                str(data.get("text") or "")
+            )
+            for page_id, data in entries
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO likes (page_id, user_name, created_at, link, text) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (page_id) DO UPDATE SET
+                    user_name = excluded.user_name,
+                    created_at = excluded.created_at,
+                    link = excluded.link,
+                    text = excluded.text
+                """,
+                rows
+            )
+        return len(rows)
+
+    def delete(self, page_ids: Iterable[str]) -> int:
+        """指定したページを削除し、削除した件数を返します（登録されていないページは無視）"""
+        with self._connect() as conn:
+            return conn.executemany("DELETE FROM likes WHERE page_id = ?", [(page_id,) for page_id in page_ids]).rowcount
+
+    def count(self) -> int:
+        """登録されているツイートの数を返します"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM likes").fetchone()[0]
+
+    def search(
+        self,
+        q: Optional[str] = None,
+        author: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 20
+    ) -> List[SearchResult]:
+        """
+        条件に一致するツイートを新しい順に返します
+
+        Args:
+            q: テキストに含まれる語（空白区切りですべてを含むものに絞り込む）
+            author: ユーザー名（大文字と小文字は区別しない）
+            since: この日時以降に作成されたものに絞り込む
+            until: この日時より前に作成されたものに絞り込む
+            limit: 返す最大件数
+        """
+        query = "SELECT l.page_id, l.user_name, l.created_at, l.link FROM likes l"
+        conditions: List[str] = []
+        params: List[Any] = []
+
+        terms = (q or "").split()
+        fts_terms = [term for term in terms if len(term) >= TRIGRAM_MIN_LENGTH]
+        if fts_terms:
+            query += " JOIN likes_fts ON likes_fts.rowid = l.id"
+            conditions.append("likes_fts MATCH ?")
+            # 検索語はFTS5の構文として解釈させず、フレーズとして扱う
+            params.append(" ".join('"' + term.replace('"', '""') + '"' for term in fts_terms))
+        for term in terms:
+            if len(term) < TRIGRAM_MIN_LENGTH:
+                conditions.append("l.text LIKE ? ESCAPE '\\'")
+                params.append(f"%{_escape_like(term)}%")
+        if author:
+            conditions.append("l.user_name = ?")
+            params.append(author)
+        if since:
+            conditions.append("l.created_at >= ?")
+            params.append(_to_utc(since))
+        if until:
+            conditions.append("l.created_at < ?")
+            params.append(_to_utc(until))
+
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY l.created_at DESC LIMIT ?"
+        params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [
+            SearchResult(
+                page_id=row["page_id"],
+                userName=row["user_name"],
+                createdAt=row["created_at"],
+                linkToTweet=row["link"]
+            )
+            for row in rows
+        ]
+
+_search_index: Optional[SearchIndex] = None
+
+def get_search_index() -> Optional[SearchIndex]:
+    """
+    SearchIndexのインスタンスを取得します（SEARCH_INDEX_ENABLED=0 の場合はNone）
+    """
+    global _search_index
+    if os.getenv("SEARCH_INDEX_ENABLED", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    if _search_index is None:
+        _search_index = SearchIndex()
+    return _search_index
@@ -0,0 +1,45 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+class SQLiteStore:
+    """ローカルのSQLiteファイルに保存するストアの基底クラス
+
+    サブクラスは SCHEMA にテーブルを作成するSQLを定義します。テーブルは最初に接続するときに
+    パスごとに一度だけ作成し、接続は操作ごとに開いてトランザクションの終了時に閉じます。
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._init_lock = threading.Lock()
+        self._initialized_path: Optional[Path] = None
+
+    def _initialize(self) -> None:
+        """テーブルを作成します（パスごとに一度だけ）"""
+        if self._initialized_path == self.path:
+            return
+        with self._init_lock:
+            if self._initialized_path == self.path:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            try:
+                conn.executescript(self.SCHEMA)
+            finally:
+                conn.close()
+            self._initialized_path = self.path
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self._initialize()
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
@@ -0,0 +1,46 @@
+"""Notionのデータベースに保存済みのいいねを検索インデックスに登録するコマンド
+
+使用例:
+    python -m app.tools.backfill_search_index --db-path data/search_index.db
+"""
+import argparse
+import time
+from dotenv import load_dotenv
+from app.services.notion_payload import read_page_properties
+from app.services.notion_service import NotionService
+from app.services.search_index import SearchIndex
+
+def backfill(notion_service: NotionService, search_index: SearchIndex, batch_size: int = 500) -> int:
+    """
+    データベースのページをすべて検索インデックスに登録し、登録した件数を返します
+
+    テキストのないページ（ダイジェストページなど）は登録しません。
+    """
+    total = 0
+    batch = []
+    for page in notion_service.iter_database_pages():
+        data = read_page_properties(page, notion_service.property_mapping)
+        if not data.get("text"):
+            continue
+        batch.append((page["id"], data))
+        if len(batch) >= batch_size:
+            total += search_index.add_many(batch)
+            batch = []
+    if batch:
+        total += search_index.add_many(batch)
+    return total
+
+def main(argv=None) -> None:
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="保存済みのいいねを検索インデックスに登録します")
+    parser.add_argument("--db-path", help="検索インデックスのパス")
+    parser.add_argument("--batch-size", type=int, default=500, help="1トランザクションで登録する件数")
+    args = parser.parse_args(argv)
+
+    started_at = time.monotonic()
+    total = backfill(NotionService(), SearchIndex(args.db_path), batch_size=args.batch_size)
+    print(f"Indexed {total} pages in {time.monotonic() - started_at:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""リプレイやベンチマークで使うNotion APIの代替実装
+
+notion_client.Clientと同じ呼び出し方（pages.create, blocks.children.append など）に対応し、
+指定した遅延の後に固定の形式のレスポンスを返します。
+"""
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from app.services.notion_payload import DEFAULT_PROPERTY_MAPPING, default_schema
+
+class _Endpoint:
+    def __init__(self, backend: "FakeNotionClient"):
+        self.backend = backend
+
+class _PagesEndpoint(_Endpoint):
+    def create(self, **kwargs: Any) -> Dict[str, Any]:
+        return self.backend._call("pages.create", kwargs, {"object": "page", "id": self.backend._next_id("page")})
+
+    def update(self, page_id: str, **kwargs: Any) -> Dict[str, Any]:
+        return self.backend._call("pages.update", {"page_id": page_id, **kwargs}, {"object": "page", "id": page_id})
+
+class _BlocksChildrenEndpoint(_Endpoint):
+    def append(self, block_id: str, **kwargs: Any) -> Dict[str, Any]:
+        return self.backend._call(
+            "blocks.children.append",
+            {"block_id": block_id, **kwargs},
+            {"object": "list", "results": kwargs.get("children", [])}
+        )
+
+    def list(self, block_id: str, **kwargs: Any) -> Dict[str, Any]:
+        return self.backend._call(
+            "blocks.children.list",
+            {"block_id": block_id, **kwargs},
+            {"object": "list", "results": [], "has_more": False, "next_cursor": None}
+        )
+
+class _BlocksEndpoint(_Endpoint):
+    def __init__(self, backend: "FakeNotionClient"):
+        super().__init__(backend)
+        self.children = _BlocksChildrenEndpoint(backend)
+
+class _DatabasesEndpoint(_Endpoint):
+    def retrieve(self, database_id: str, **kwargs: Any) -> Dict[str, Any]:
+        return self.backend._call(
+            "databases.retrieve",
+            {"database_id": database_id},
+            {"object": "database", "id": database_id, "properties": default_schema(DEFAULT_PROPERTY_MAPPING)}
+        )
+
+    def query(self, database_id: str, **kwargs: Any) -> Dict[str, Any]:
+        return self.backend._call(
+            "databases.query",
+            {"database_id": database_id, **kwargs},
+            {"object": "list", "results": [], "has_more": False, "next_cursor": None}
+        )
+
+class FakeNotionClient:
+    """Notion APIの代わりに呼び出しを記録して固定のレスポンスを返すクライアント
+
+    Args:
+        latency: 各呼び出しの遅延（秒）。実際のNotion APIの応答時間を模擬する
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: List[Dict[str, Any]] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.pages = _PagesEndpoint(self)
+        self.blocks = _BlocksEndpoint(self)
+        self.databases = _DatabasesEndpoint(self)
+
+    def _next_id(self, prefix: str) -> str:
+        with self._lock:
+            return f"fake-{prefix}-{next(self._ids)}"
+
+    def _call(self, method: str, params: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls.append({"method": method, "params": params})
+        return response
+
+    def count(self, method: Optional[str] = None) -> int:
+        """呼び出し回数を返します（methodを指定した場合はそのメソッドのみ）"""
+        with self._lock:
+            return sum(1 for call in self.calls if method is None or call["method"] == method)
@@ -0,0 +1,234 @@
+"""構造化ログ（LOG_FORMAT=json、またはCloud Loggingからエクスポートしたもの）からレイテンシとSLOのレポートを作成するコマンド
+
+ログを1行ずつ読み込み、段階ごとのレイテンシを対数バケットのヒストグラムで集計するため、
+ログの量によらず一定のメモリで数か月分のログを処理できます。
+
+使用例:
+    python -m app.tools.log_report logs/*.json.gz --slo-target 0.99 --latency-threshold-ms 3000 --window 3600
+"""
+import argparse
+import gzip
+import json
+import math
+import re
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+# リクエスト全体の所要時間を記録するログの段階名
+REQUEST_STAGE = "request"
+
+class LogHistogram:
+    """値を対数バケットに数え、相対誤差 relative_accuracy 以内で分位数を推定するヒストグラム
+
+    バケットの数は値の範囲（最大値/最小値）の対数に比例するため、件数によらずメモリは一定です。
+    """
+
+    # これより小さい値は0として数える
+    MIN_VALUE = 1e-3
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Counter = Counter()
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value < self.MIN_VALUE:
+            self.zero_count += 1
+        else:
+            self.buckets[math.ceil(math.log(value) / self._log_gamma)] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """q分位数（0〜1）の推定値を返します（値がない場合はNone）"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return max(self.min, 0.0)
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                # バケットの範囲 (gamma^(key-1), gamma^key] の中で相対誤差が最小になる値
+                estimate = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+_FRACTION = re.compile(r"(\.\d{6})\d+")
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        # Cloud Loggingのタイムスタンプはナノ秒まで含むため、マイクロ秒に切り詰める
+        parsed = datetime.fromisoformat(_FRACTION.sub(r"\1", value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def read_entries(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    ログの各行を構造化フィールドの辞書として返します（JSONでない行は飛ばす）
+
+    Cloud Loggingからエクスポートしたログの場合は、jsonPayloadのフィールドを使います。
+    """
+    for line in lines:
+        line = line.strip()
+        if not line.startswith("{"):
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if "jsonPayload" in entry:
+            payload = dict(entry["jsonPayload"])
+            payload.setdefault("time", entry.get("timestamp"))
+            entry = payload
+        yield entry
+
+class LogReport:
+    """構造化ログを1件ずつ受け取り、段階ごとのレイテンシ、例外クラスごとのエラー率、SLOの消費を集計するクラス
+
+    Args:
+        slo_target: 成功とするリクエストの目標割合（0.99 など）
+        latency_threshold_ms: これより遅いリクエストもSLO違反として数える（Noneの場合はステータスのみ）
+        window_seconds: SLOの消費を集計する期間の長さ（秒）
+    """
+
+    def __init__(
+        self,
+        slo_target: float = 0.99,
+        latency_threshold_ms: Optional[float] = None,
+        window_seconds: int = 86400
+    ):
+        self.slo_target = slo_target
+        self.latency_threshold_ms = latency_threshold_ms
+        self.window_seconds = window_seconds
+        self.stages: Dict[str, LogHistogram] = defaultdict(LogHistogram)
+        self.stage_errors: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.requests = 0
+        # 期間の開始時刻（UNIX時間） -> [リクエスト数, SLO違反の数]
+        self.windows: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        stage = entry.get("stage")
+        duration_ms = entry.get("duration_ms")
+        if not stage or not isinstance(duration_ms, (int, float)):
+            return
+        self.stages[stage].add(float(duration_ms))
+        if entry.get("error_class"):
+            self.stage_errors[stage] += 1
+        if stage != REQUEST_STAGE:
+            return
+
+        self.requests += 1
+        if entry.get("error_class"):
+            self.errors[entry["error_class"]] += 1
+        bad = (entry.get("status_code") or 500) >= 500 or (
+            self.latency_threshold_ms is not None and duration_ms > self.latency_threshold_ms
+        )
+        timestamp = _parse_time(entry.get("time"))
+        if timestamp is not None:
+            window = int(timestamp.timestamp()) // self.window_seconds * self.window_seconds
+            self.windows[window][0] += 1
+            self.windows[window][1] += int(bad)
+
+    def summary(self) -> Dict[str, Any]:
+        error_budget = 1 - self.slo_target
+        windows = []
+        for start in sorted(self.windows):
+            total, bad = self.windows[start]
+            error_rate = bad / total
+            windows.append({
+                "start": datetime.fromtimestamp(start, timezone.utc).isoformat(),
+                "requests": total,
+                "bad": bad,
+                "error_rate": round(error_rate, 6),
+                "burn_rate": round(error_rate / error_budget, 3) if error_budget > 0 else None,
+            })
+        return {
+            "stages": {
+                stage: {
+                    "count": histogram.count,
+                    "errors": self.stage_errors[stage],
+                    "p50_ms": _round(histogram.quantile(0.5)),
+                    "p90_ms": _round(histogram.quantile(0.9)),
+                    "p99_ms": _round(histogram.quantile(0.99)),
+                    "max_ms": _round(histogram.max),
+                }
+                for stage, histogram in sorted(self.stages.items())
+            },
+            "errors": {
+                error_class: {"count": count, "rate": round(count / self.requests, 6) if self.requests else None}
+                for error_class, count in self.errors.most_common()
+            },
+            "slo": {
+                "target": self.slo_target,
+                "latency_threshold_ms": self.latency_threshold_ms,
+                "window_seconds": self.window_seconds,
+                "windows": windows,
+            },
+        }
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+def _open(path: str) -> TextIO:
+    if path == "-":
+        return sys.stdin
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+def _print_text(summary: Dict[str, Any]) -> None:
+    print("Latency by stage (ms)")
+    print(f"{'stage':<20} {'count':>10} {'errors':>8} {'p50':>10} {'p90':>10} {'p99':>10} {'max':>10}")
+    for stage, s in summary["stages"].items():
+        print(f"{stage:<20} {s['count']:>10} {s['errors']:>8} {s['p50_ms']:>10} {s['p90_ms']:>10} {s['p99_ms']:>10} {s['max_ms']:>10}")
+
+    print("\nErrors by exception class (per request)")
+    for error_class, e in summary["errors"].items():
+        print(f"{error_class:<40} {e['count']:>10} {e['rate']:>10.4%}")
+
+    slo = summary["slo"]
+    print(f"\nSLO burn (target {slo['target']:.3%}, window {slo['window_seconds']}s)")
+    print(f"{'window':<27} {'requests':>10} {'bad':>8} {'error rate':>11} {'burn rate':>10}")
+    for w in slo["windows"]:
+        print(f"{w['start']:<27} {w['requests']:>10} {w['bad']:>8} {w['error_rate']:>11.4%} {str(w['burn_rate']):>10}")
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="構造化ログからレイテンシとSLOのレポートを作成します")
+    parser.add_argument("paths", nargs="+", help="ログファイル（.gzも可、-で標準入力）")
+    parser.add_argument("--slo-target", type=float, default=0.99, help="成功とするリクエストの目標割合")
+    parser.add_argument("--latency-threshold-ms", type=float, help="これより遅いリクエストもSLO違反とする")
+    parser.add_argument("--window", type=int, default=86400, help="SLOの消費を集計する期間（秒）")
+    parser.add_argument("--json", action="store_true", help="JSON形式で出力する")
+    args = parser.parse_args(argv)
+
+    report = LogReport(args.slo_target, args.latency_threshold_ms, args.window)
+    for path in args.paths:
+        f = _open(path)
+        try:
+            for entry in read_entries(f):
+                report.add(entry)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+    summary = report.summary()
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        _print_text(summary)
+
+if __name__ == "__main__":
+    main()
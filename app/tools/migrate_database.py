@@ -0,0 +1,80 @@
+"""Notionのデータベース間でいいねを移行するコマンド
+
+使用例:
+    # 2024年より前のいいねをアーカイブ用のデータベースに移動
+    python -m app.tools.migrate_database --target ARCHIVE_DATABASE_ID --before 2024-01-01 --archive
+
+    # 新しいスキーマのデータベースにすべてコピー（プロパティ名の対応を指定）
+    python -m app.tools.migrate_database --target NEW_DATABASE_ID --target-mapping '{"userName": "Author"}'
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+from dotenv import load_dotenv
+from app.models import MigrationReport
+from app.services.database_migrator import DatabaseMigrator, MigrationCheckpoint
+from app.services.notion_payload import DEFAULT_PROPERTY_MAPPING
+from app.services.notion_service import NotionService
+from app.services.rate_limiter import RateLimiter
+from app.services.search_index import get_search_index
+
+def _print_progress(report: MigrationReport) -> None:
+    print(
+        f"processed={report.total} migrated={report.migrated} skipped={report.skipped} "
+        f"failed={report.failed} archived={report.archived} throughput={report.throughput_per_second}/s",
+        file=sys.stderr
+    )
+
+def main(argv=None) -> None:
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Notionのデータベース間でいいねを移行します")
+    parser.add_argument("--source", help="移行元のデータベースID（デフォルトはNOTION_DATABASE_ID）")
+    parser.add_argument("--target", required=True, help="移行先のデータベースID")
+    parser.add_argument("--source-mapping", type=json.loads, help="移行元のプロパティ名の対応（JSON、指定したものだけデフォルトを上書き）")
+    parser.add_argument("--target-mapping", type=json.loads, help="移行先のプロパティ名の対応（JSON、指定したものだけデフォルトを上書き）")
+    parser.add_argument("--before", type=datetime.fromisoformat, help="ツイートの作成日時がこの日時より前のものに絞り込む（ISO形式）")
+    parser.add_argument("--archive", action="store_true", help="移行したページを移行元でアーカイブする")
+    parser.add_argument("--limit", type=int, help="移行する最大件数")
+    parser.add_argument("--workers", type=int, help="並列数")
+    parser.add_argument("--rate", type=float, help="1秒あたりの最大リクエスト数")
+    parser.add_argument("--checkpoint", help="チェックポイントのパス（同じパスを指定すると中断したところから再開）")
+    args = parser.parse_args(argv)
+
+    source = NotionService(
+        database_id=args.source,
+        property_mapping={**DEFAULT_PROPERTY_MAPPING, **args.source_mapping} if args.source_mapping else None
+    )
+    # 検索インデックスはWebhookで保存するデータベースのものなので、移行先のページは登録しない
+    target = NotionService(
+        database_id=args.target,
+        property_mapping={**DEFAULT_PROPERTY_MAPPING, **args.target_mapping} if args.target_mapping else None,
+        use_search_index=False
+    )
+
+    query_filter = None
+    if args.before:
+        created_at_property = source.property_mapping.get("createdAt", DEFAULT_PROPERTY_MAPPING["createdAt"])
+        query_filter = {"property": created_at_property, "date": {"before": args.before.isoformat()}}
+
+    checkpoint = MigrationCheckpoint(
+        args.checkpoint or f"data/migration-{source.database_id}-{target.database_id}.jsonl"
+    )
+    try:
+        migrator = DatabaseMigrator(
+            source,
+            target,
+            checkpoint,
+            rate_limiter=RateLimiter(args.rate) if args.rate else None,
+            max_workers=args.workers,
+            archive_source=args.archive,
+            search_index=get_search_index() if args.archive else None
+        )
+        report = migrator.migrate(filter=query_filter, limit=args.limit, on_progress=_print_progress)
+    finally:
+        checkpoint.close()
+    print(report.model_dump_json(indent=2))
+
+if __name__ == "__main__":
+    main()
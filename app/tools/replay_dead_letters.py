@@ -0,0 +1,42 @@
+"""デッドレターをNotionへ再書き込みするコマンド
+
+使用例:
+    python -m app.tools.replay_dead_letters --error-type rate_limited --since 2025-02-10T00:00:00
+"""
+import argparse
+from datetime import datetime
+from dotenv import load_dotenv
+from app.services.dead_letter_replayer import DeadLetterReplayer
+from app.services.dead_letter_store import DeadLetterStore
+from app.services.notion_service import NotionService
+from app.services.rate_limiter import RateLimiter
+
+def main(argv=None) -> None:
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="デッドレターをNotionへ再書き込みします")
+    parser.add_argument("--error-type", help="エラー種別で絞り込む（例: rate_limited）")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="この日時以降に保存されたものに絞り込む（ISO形式）")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="この日時より前に保存されたものに絞り込む（ISO形式）")
+    parser.add_argument("--limit", type=int, help="再実行する最大件数")
+    parser.add_argument("--workers", type=int, help="並列数")
+    parser.add_argument("--rate", type=float, help="1秒あたりの最大リクエスト数")
+    parser.add_argument("--db-path", help="デッドレターストアのパス")
+    args = parser.parse_args(argv)
+
+    replayer = DeadLetterReplayer(
+        DeadLetterStore(args.db_path),
+        NotionService(),
+        rate_limiter=RateLimiter(args.rate) if args.rate else None,
+        max_workers=args.workers
+    )
+    report = replayer.replay(
+        error_type=args.error_type,
+        since=args.since,
+        until=args.until,
+        limit=args.limit
+    )
+    print(report.model_dump_json(indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""キャプチャしたWebhookのトラフィックをアプリケーションに再生するコマンド
+
+キャプチャ（WEBHOOK_CAPTURE_PATH で記録したプロセスごとのファイル）を、記録時の到着間隔のまま、
+または --speed で指定した倍率で、同じプロセス内のアプリケーションに送信します。
+Notion APIは FakeNotionClient に置き換えるため、実際のデータベースには書き込みません。
+
+使用例:
+    # ビルドごとに計測して保存
+    python -m app.tools.replay_traffic data/webhook_capture-*.jsonl.gz --speed 10 --output base.json
+    python -m app.tools.replay_traffic data/webhook_capture-*.jsonl.gz --speed 10 --output candidate.json
+    # 2つのビルドの結果を比較
+    python -m app.tools.replay_traffic --compare base.json candidate.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+REPLAY_API_KEY = "replay-api-key"
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+def summarize(latencies: List[float], statuses: List[int], duration: float, notion_calls: int) -> Dict[str, Any]:
+    """再生結果を集計します（レイテンシはミリ秒）"""
+    values = sorted(latency * 1000 for latency in latencies)
+    status_counts: Dict[str, int] = {}
+    for status in statuses:
+        status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+    return {
+        "requests": len(values),
+        "duration_seconds": round(duration, 3),
+        "throughput_per_second": round(len(values) / duration, 3) if duration > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(values, 0.5), 3),
+            "p90": round(_percentile(values, 0.9), 3),
+            "p99": round(_percentile(values, 0.99), 3),
+            "max": round(values[-1], 3) if values else 0.0,
+            "mean": round(sum(values) / len(values), 3) if values else 0.0,
+        },
+        "status_counts": status_counts,
+        "notion_calls": notion_calls,
+    }
+
+async def replay(
+    entries: List[Dict[str, Any]],
+    speed: float = 1.0,
+    notion_latency: float = 0.0,
+    concurrency: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    キャプチャを同じプロセス内のアプリケーションに再生し、レイテンシとスループットを返します
+
+    Args:
+        entries: キャプチャの各リクエスト
+        speed: 再生速度の倍率（0以下の場合は間隔を空けずに送信する）
+        notion_latency: FakeNotionClientの1呼び出しあたりの遅延（秒）
+        concurrency: 同時に送信する最大リクエスト数（省略時は制限なし）
+    """
+    import httpx
+    from app import main
+    from app.auth import set_api_key
+    from app.services.rate_limiter import RateLimiter, set_rate_limiter
+    from app.tools.fake_notion import FakeNotionClient
+
+    fake_notion = FakeNotionClient(latency=notion_latency)
+    main.notion_service.notion = fake_notion
+    set_api_key(REPLAY_API_KEY)
+    # FakeNotionClientにはレート制限がないため、共有のレートリミッターで待機しない
+    set_rate_limiter(RateLimiter(rate_per_second=1e9, burst=10**9))
+
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+    latencies: List[float] = []
+    statuses: List[int] = []
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+        async def send(entry: Dict[str, Any]) -> None:
+            headers = {"X-API-Key": REPLAY_API_KEY, "Content-Type": entry.get("content_type") or "text/plain"}
+            if entry.get("deadline"):
+                headers["X-Request-Deadline"] = entry["deadline"]
+            if semaphore:
+                await semaphore.acquire()
+            try:
+                sent_at = time.perf_counter()
+                response = await client.post("/webhook", content=entry["body"].encode(), headers=headers)
+                latencies.append(time.perf_counter() - sent_at)
+                statuses.append(response.status_code)
+            finally:
+                if semaphore:
+                    semaphore.release()
+
+        started_at = time.perf_counter()
+        tasks = []
+        for entry in entries:
+            if speed > 0:
+                delay = entry["t"] / speed - (time.perf_counter() - started_at)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(entry)))
+        await asyncio.gather(*tasks)
+        duration = time.perf_counter() - started_at
+
+    return summarize(latencies, statuses, duration, fake_notion.count())
+
+def compare(base: Dict[str, Any], candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """2つの再生結果を比較します（変化率は candidate / base - 1）"""
+    def change(before: float, after: float) -> Optional[float]:
+        return round(after / before - 1, 4) if before else None
+
+    return {
+        "throughput_per_second": {
+            "base": base["throughput_per_second"],
+            "candidate": candidate["throughput_per_second"],
+            "change": change(base["throughput_per_second"], candidate["throughput_per_second"]),
+        },
+        "latency_ms": {
+            key: {
+                "base": base["latency_ms"][key],
+                "candidate": candidate["latency_ms"][key],
+                "change": change(base["latency_ms"][key], candidate["latency_ms"][key]),
+            }
+            for key in base["latency_ms"]
+        },
+    }
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="キャプチャしたWebhookのトラフィックを再生します")
+    parser.add_argument(
+        "capture",
+        nargs="*",
+        help="キャプチャファイル（WEBHOOK_CAPTURE_PATH で記録したもの。複数指定した場合は到着時刻の順に再生する）"
+    )
+    parser.add_argument("--speed", type=float, default=1.0, help="再生速度の倍率（0で間隔を空けずに送信）")
+    parser.add_argument("--notion-latency", type=float, default=0.0, help="Notion API呼び出しの模擬遅延（秒）")
+    parser.add_argument("--concurrency", type=int, help="同時に送信する最大リクエスト数")
+    parser.add_argument("--output", help="結果を保存するJSONファイル")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "CANDIDATE"), help="2つの結果ファイルを比較する")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            candidate = json.load(f)
+        print(json.dumps(compare(base, candidate), indent=2))
+        return
+
+    if not args.capture:
+        parser.error("capture is required unless --compare is given")
+
+    # 再生中のデッドレターなどは一時ディレクトリに保存し、キャプチャは無効にする
+    os.environ.setdefault("DEAD_LETTER_DB_PATH", os.path.join(tempfile.mkdtemp(), "dead_letters.db"))
+    os.environ.setdefault("NOTION_API_KEY", "replay")
+    os.environ.setdefault("NOTION_DATABASE_ID", "replay")
+    os.environ.pop("WEBHOOK_CAPTURE_PATH", None)
+
+    from app.capture import read_capture
+    entries = list(read_capture(args.capture))
+    report = asyncio.run(replay(entries, args.speed, args.notion_latency, args.concurrency))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
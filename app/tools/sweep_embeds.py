@@ -0,0 +1,40 @@
+"""URLがあるのに埋め込みのないページを探して埋め込みを追加するコマンド
+
+使用例:
+    python -m app.tools.sweep_embeds --since 2025-02-01T00:00:00
+"""
+import argparse
+from datetime import datetime
+from dotenv import load_dotenv
+from app.services.dead_letter_store import DeadLetterStore
+from app.services.embed_sweeper import EmbedSweeper
+from app.services.notion_service import NotionService
+from app.services.rate_limiter import RateLimiter
+
+def main(argv=None) -> None:
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="埋め込みのないページを探して埋め込みを追加します")
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="この日時以降に作成されたページに絞り込む（ISO形式。省略時は EMBED_SWEEP_LOOKBACK_HOURS 前から）"
+    )
+    parser.add_argument("--limit", type=int, help="確認する最大ページ数")
+    parser.add_argument("--grace-seconds", type=float, help="作成されてからこの秒数が経っていないページは確認しない")
+    parser.add_argument("--workers", type=int, help="並列数")
+    parser.add_argument("--rate", type=float, help="1秒あたりの最大リクエスト数")
+    parser.add_argument("--db-path", help="デッドレターストアのパス（修復したページのデッドレターを再実行済みにする）")
+    args = parser.parse_args(argv)
+
+    sweeper = EmbedSweeper(
+        NotionService(),
+        rate_limiter=RateLimiter(args.rate) if args.rate else None,
+        max_workers=args.workers,
+        dead_letter_store=DeadLetterStore(args.db_path)
+    )
+    report = sweeper.sweep(since=args.since, limit=args.limit, grace_seconds=args.grace_seconds)
+    print(report.model_dump_json(indent=2))
+
+if __name__ == "__main__":
+    main()
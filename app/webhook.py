@@ -0,0 +1,167 @@
+"""Webhookのリクエストの処理（FastAPIのルートと高速パスで共有する）"""
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+from starlette.requests import Request
+from .capture import FIELD_SEPARATOR, get_traffic_capture
+from .deadline import Deadline, deadline_scope
+from .exceptions import NotionAPIException, ValidationException
+from .models import Tweet
+from .request_body import decode_body, read_limited_body
+from .services.dead_letter_store import DeadLetterStore, STAGE_ADD_TWEET_URL, STAGE_CREATE_PAGE
+from .services.digest_buffer import DigestBuffer
+from .services.digest_writer import STORAGE_MODE_DIGEST, DigestWriter, digest_max_buffer, storage_mode
+from .services.notion_payload import tweet_blocks
+from .services.notion_service import NotionService
+from .services.rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# レスポンス後に実行する処理を登録する関数（BackgroundTasks.add_taskと同じ呼び出し方）
+Defer = Callable[..., Any]
+
+def parse_tweet(raw_text: str) -> Tweet:
+    """
+    リクエストボディをTweetに変換します
+
+    Raises:
+        ValidationException: フィールドの数、テキスト、日付のフォーマットが不正な場合
+    """
+    # フィールドを分割
+    fields = raw_text.split(FIELD_SEPARATOR)
+    if len(fields) != 4:
+        raise ValidationException(
+            "Invalid request format. Expected 4 fields separated by ___POST_FIELD_SEPARATOR___",
+            details={"received_fields": len(fields)}
+        )
+
+    # フィールドを取り出す
+    text, user_name, link_to_tweet, created_at = fields
+
+    # 必須フィールドのバリデーション
+    if not text:
+        raise ValidationException(
+            "Text field cannot be empty",
+            details={}
+        )
+
+    # 日付フォーマットを検証して変換
+    try:
+        # まずISO形式として解析を試みる
+        parsed_date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            # 次にMonth DD, YYYY at HH:MMAM/PM形式として解析を試みる
+            parsed_date = datetime.strptime(created_at, "%B %d, %Y at %I:%M%p")
+        except ValueError:
+            raise ValidationException(
+                "Invalid date format. Expected ISO format.",
+                details={}
+            )
+
+    return Tweet(
+        text=text,
+        userName=user_name,
+        linkToTweet=link_to_tweet,
+        createdAt=parsed_date.isoformat()
+    )
+
+async def process_webhook(
+    request: Request,
+    notion_service: NotionService,
+    dead_letter_store: DeadLetterStore,
+    digest_buffer: DigestBuffer,
+    defer: Defer
+) -> Tuple[int, Dict[str, Any]]:
+    """
+    Webhookのリクエストを処理し、ステータスコードとレスポンスの内容を返します
+
+    認証は呼び出し元で行います。
+
+    Raises:
+        AppException: リクエストが不正な場合、またはNotionへの書き込みに失敗した場合
+    """
+    deadline = Deadline.from_request(request)
+
+    # リクエストボディを最大サイズまでストリーミングで読み取り、一度だけデコードする
+    raw_text = decode_body(await read_limited_body(request))
+
+    # キャプチャモードの場合はリクエストを記録する
+    capture = get_traffic_capture()
+    if capture is not None:
+        capture.record(request, raw_text)
+
+    tweet = parse_tweet(raw_text)
+
+    if storage_mode() == STORAGE_MODE_DIGEST:
+        return buffer_like(digest_buffer, notion_service, tweet, defer)
+
+    # NotionServiceを初期化してページを作成
+    logger.info("Creating new Notion page")
+    # レスポンスを待たせないよう待機はせず、共有のレートリミッターのトークンのみ消費する
+    # （デッドレターの再実行や埋め込みの修復など、待機できる処理が後回しになる）
+    get_rate_limiter().consume()
+    with deadline_scope(deadline):
+        try:
+            page = notion_service.create_page(tweet.model_dump())  # Pydanticモデルを辞書に変換
+        except NotionAPIException as e:
+            store_dead_letter(dead_letter_store, tweet, e, STAGE_CREATE_PAGE)
+            raise
+
+    # 埋め込みはレスポンスに必要ないため、レスポンス後に追加する
+    # （失敗した場合はデッドレターに保存し、埋め込みのないページは定期的な調整でも修復される）
+    if tweet.linkToTweet:
+        defer(add_tweet_url_in_background, notion_service, dead_letter_store, tweet, page["id"])
+
+    return 200, {"id": page["id"]}
+
+def buffer_like(
+    buffer: DigestBuffer,
+    notion_service: NotionService,
+    tweet: Tweet,
+    defer: Defer
+) -> Tuple[int, Dict[str, Any]]:
+    """いいねをダイジェストのバッファに保存します（上限に達した場合はレスポンス後に書き込む）"""
+    # 書き込み時に失敗しないよう、Notionの制限を超えるいいねはここで拒否する
+    tweet_blocks(tweet.model_dump())
+    like_id = buffer.add(tweet)
+    if buffer.count() >= digest_max_buffer():
+        defer(flush_digest_buffer, buffer, notion_service)
+    return 202, {"id": str(like_id), "status": "buffered"}
+
+def flush_digest_buffer(buffer: DigestBuffer, notion_service: NotionService) -> None:
+    try:
+        DigestWriter(buffer, notion_service).flush()
+    except Exception:
+        logger.error("Failed to flush digest buffer", exc_info=True)
+
+def add_tweet_url_in_background(
+    notion_service: NotionService,
+    store: DeadLetterStore,
+    tweet: Tweet,
+    page_id: str
+) -> None:
+    """レスポンス後に埋め込みを追加します（失敗した場合はデッドレターに保存）"""
+    # レスポンス後はリクエストの期限を適用しない
+    with deadline_scope(None):
+        try:
+            get_rate_limiter().acquire()
+            notion_service.add_tweet_url(page_id, tweet.linkToTweet)
+        except NotionAPIException as e:
+            store_dead_letter(store, tweet, e, STAGE_ADD_TWEET_URL, page_id)
+
+def store_dead_letter(
+    store: DeadLetterStore,
+    tweet: Tweet,
+    exc: NotionAPIException,
+    stage: str,
+    page_id: Optional[str] = None
+) -> None:
+    """書き込みに失敗したツイートをデッドレターストアに保存します
+
+    保存に失敗しても元の例外を優先するため、ここではログ出力のみ行います。
+    """
+    try:
+        store.add(tweet, exc, stage=stage, page_id=page_id)
+    except Exception:
+        logger.error("Failed to store dead letter", exc_info=True)
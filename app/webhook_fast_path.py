@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import os
+from typing import Any, Callable, List, Tuple
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from .asgi_utils import get_header, render_json, send_json
+from .auth import API_KEY_NAME, is_valid_api_key
+from .error_handlers import app_exception_handler, general_exception_handler, validation_exception_handler
+from .exceptions import AppException, ValidationException
+from .request_guard import UNAUTHORIZED_BODY
+from .services.dead_letter_store import get_dead_letter_store
+from .services.digest_buffer import get_digest_buffer
+from .services.notion_service import NotionService
+from .webhook import process_webhook
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = "/webhook"
+
+_API_KEY_HEADER = API_KEY_NAME.lower().encode()
+
+def fast_path_enabled() -> bool:
+    """WEBHOOK_FAST_PATHが有効かどうかを返します"""
+    return os.getenv("WEBHOOK_FAST_PATH", "").lower() in ("1", "true", "yes", "on")
+
+class WebhookFastPathMiddleware:
+    """POST /webhook をFastAPIのルーティング、依存性注入、レスポンスモデルの検証を経由せずに処理するASGIミドルウェア
+
+    WEBHOOK_FAST_PATH=1 の場合のみ有効です。認証、バリデーション、エラーレスポンスの内容は
+    FastAPIのルートと同じで、処理本体（process_webhook）と例外ハンドラーも共有します。
+    それ以外のリクエストは素通りします。
+    """
+
+    def __init__(self, app, notion_service: NotionService):
+        self.app = app
+        self.notion_service = notion_service
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"] != WEBHOOK_PATH
+            or scope["method"] != "POST"
+            or not fast_path_enabled()
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # 通常はRequestGuardMiddlewareで拒否済みだが、単独で使われた場合のために確認する
+        if not is_valid_api_key(get_header(scope["headers"], _API_KEY_HEADER)):
+            await send_json(send, 401, UNAUTHORIZED_BODY)
+            return
+
+        request = Request(scope, receive)
+        deferred: List[Tuple[Callable[..., Any], tuple, dict]] = []
+
+        def defer(func: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+            deferred.append((func, args, kwargs))
+
+        try:
+            status_code, content = await process_webhook(
+                request,
+                self.notion_service,
+                self._dependency(scope, get_dead_letter_store),
+                self._dependency(scope, get_digest_buffer),
+                defer
+            )
+        except ValidationException as e:
+            response = await validation_exception_handler(request, e)
+            await response(scope, receive, send)
+            return
+        except AppException as e:
+            response = await app_exception_handler(request, e)
+            await response(scope, receive, send)
+            return
+        except Exception as e:
+            # ServerErrorMiddlewareと同じく、500を返した後に例外を送出してサーバーに記録させる
+            response = await general_exception_handler(request, e)
+            await response(scope, receive, send)
+            raise
+
+        await send_json(send, status_code, render_json(content))
+
+        # BackgroundTasksと同じく、レスポンスを送信した後に実行する
+        for func, args, kwargs in deferred:
+            try:
+                if asyncio.iscoroutinefunction(func):
+                    await func(*args, **kwargs)
+                else:
+                    await run_in_threadpool(func, *args, **kwargs)
+            except Exception:
+                logger.error("Deferred webhook task failed", exc_info=True)
+
+    @staticmethod
+    def _dependency(scope, dependency: Callable[[], Any]) -> Any:
+        """FastAPIのdependency_overridesを考慮して依存するオブジェクトを取得します"""
+        overrides = getattr(scope.get("app"), "dependency_overrides", {})
+        return overrides.get(dependency, dependency)()
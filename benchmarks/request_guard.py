@@ -0,0 +1,128 @@
+"""不正なリクエストが大量に送られた場合の、拒否のスループットを比較するベンチマーク
+
+API Keyが正しくない POST /webhook を次の3つの方法で拒否し、1秒あたりの処理件数を計測します。
+
+- route: RequestGuardMiddlewareを経由せず、FastAPIのルートのget_api_keyで拒否する
+- guard_401: RequestGuardMiddlewareで拒否する（毎回異なるクライアントから送信）
+- guard_429: 失敗の回数が上限に達したクライアントからのリクエストをRequestGuardMiddlewareで拒否する
+
+ログは実際と同じく出力し、出力先のみ捨てます。
+
+使用例:
+    python -m benchmarks.request_guard --requests 20000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+from typing import Callable, List
+
+SEPARATOR = "___POST_FIELD_SEPARATOR___"
+BODY = SEPARATOR.join([
+    "benchmark tweet", "benchuser", "https://twitter.com/benchuser/status/123456789", "2025-02-10T13:35:49Z"
+]).encode()
+
+def _scope(app, client: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/webhook",
+        "raw_path": b"/webhook",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"content-type", b"text/plain"),
+            (b"content-length", str(len(BODY)).encode()),
+            (b"x-api-key", b"invalid-api-key"),
+            (b"x-forwarded-for", client.encode()),
+        ],
+        "client": ("127.0.0.1", 12345),
+        "server": ("localhost", 80),
+        "app": app,
+    }
+
+async def _request(asgi, scope: dict) -> int:
+    sent_body = False
+    status = 0
+
+    async def receive():
+        nonlocal sent_body
+        if sent_body:
+            return {"type": "http.disconnect"}
+        sent_body = True
+        return {"type": "http.request", "body": BODY, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await asgi(scope, receive, send)
+    return status
+
+async def _measure(asgi, scopes: Callable[[int], dict], requests: int, expected: int) -> List[float]:
+    timings = []
+    for i in range(requests):
+        scope = scopes(i)
+        started_at = time.perf_counter()
+        status = await _request(asgi, scope)
+        timings.append((time.perf_counter() - started_at) * 1e6)
+        assert status == expected, status
+    return timings
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="不正なリクエストの拒否のスループットを比較します")
+    parser.add_argument("--requests", type=int, default=10000, help="方法ごとに送信するリクエスト数")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("NOTION_API_KEY", "benchmark")
+    os.environ.setdefault("NOTION_DATABASE_ID", "benchmark")
+    os.environ["WEBHOOK_API_KEY"] = "benchmark-api-key"
+    os.environ["SEARCH_INDEX_ENABLED"] = "0"
+    os.environ.pop("WEBHOOK_FAST_PATH", None)
+
+    from app import main as app_main
+    from app import request_guard
+    from app.request_guard import FailureLimiter, RequestGuardMiddleware
+    # ログの出力先のみ捨てる（ログの作成と整形のコストは計測に含める）
+    devnull = open(os.devnull, "w")
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(devnull)
+
+    app = app_main.app
+    asyncio.run(_request(app, _scope(app, "warmup")))
+    guard = app.middleware_stack
+    while not isinstance(guard, RequestGuardMiddleware):
+        guard = guard.app
+
+    # route と guard_401 は毎回異なるクライアントから送信し、失敗の回数の制限にかからないようにする
+    def rotating(i: int) -> dict:
+        return _scope(app, f"198.51.{i // 256 % 256}.{i % 256}")
+
+    def flooding(i: int) -> dict:
+        return _scope(app, "203.0.113.5")
+
+    results = {}
+    results["route"] = asyncio.run(_measure(guard.app, rotating, args.requests, 401))
+    request_guard._failure_limiter = FailureLimiter()
+    results["guard_401"] = asyncio.run(_measure(guard, rotating, args.requests, 401))
+    # 同じクライアントから上限まで失敗させてから計測する
+    request_guard._failure_limiter = FailureLimiter()
+    for i in range(request_guard._failure_limiter.limit):
+        asyncio.run(_request(guard, flooding(i)))
+    results["guard_429"] = asyncio.run(_measure(guard, flooding, args.requests, 429))
+
+    print(f"{'':<10} {'req/s':>10} {'p50 (us)':>10} {'p99 (us)':>10}")
+    for name, timings in results.items():
+        p99 = statistics.quantiles(timings, n=100)[98]
+        print(f"{name:<10} {1e6 / statistics.fmean(timings):>10.0f} {statistics.median(timings):>10.1f} {p99:>10.1f}")
+
+if __name__ == "__main__":
+    main()
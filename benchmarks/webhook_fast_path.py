@@ -0,0 +1,111 @@
+"""POST /webhook のFastAPIのルートと高速パス（WEBHOOK_FAST_PATH=1）のリクエストあたりの処理時間を比較するベンチマーク
+
+Notion APIは遅延0のFakeNotionClientで置き換え、ASGIアプリケーションを直接呼び出すため、
+計測されるのはフレームワークとアプリケーションの処理時間のみです。
+
+使用例:
+    python -m benchmarks.webhook_fast_path --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+SEPARATOR = "___POST_FIELD_SEPARATOR___"
+BODY = SEPARATOR.join([
+    "benchmark tweet", "benchuser", "https://twitter.com/benchuser/status/123456789", "2025-02-10T13:35:49Z"
+]).encode()
+API_KEY = "benchmark-api-key"
+
+def _scope() -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/webhook",
+        "raw_path": b"/webhook",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"content-type", b"text/plain"),
+            (b"content-length", str(len(BODY)).encode()),
+            (b"x-api-key", API_KEY.encode()),
+        ],
+        "client": ("127.0.0.1", 12345),
+        "server": ("localhost", 80),
+    }
+
+async def _request(app) -> int:
+    sent_body = False
+    status = 0
+
+    async def receive():
+        nonlocal sent_body
+        if sent_body:
+            return {"type": "http.disconnect"}
+        sent_body = True
+        return {"type": "http.request", "body": BODY, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(_scope(), receive, send)
+    return status
+
+async def _measure(app, requests: int, warmup: int) -> List[float]:
+    for _ in range(warmup):
+        assert await _request(app) == 200
+    timings = []
+    for _ in range(requests):
+        started_at = time.perf_counter()
+        await _request(app)
+        timings.append((time.perf_counter() - started_at) * 1e6)
+    return timings
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="POST /webhook のルートと高速パスの処理時間を比較します")
+    parser.add_argument("--requests", type=int, default=3000, help="計測するリクエスト数")
+    parser.add_argument("--warmup", type=int, default=200, help="計測前に送信するリクエスト数")
+    args = parser.parse_args(argv)
+
+    # 計測に関係のない書き込みとログ出力を無効にする
+    data_dir = tempfile.mkdtemp()
+    os.environ.setdefault("NOTION_API_KEY", "benchmark")
+    os.environ.setdefault("NOTION_DATABASE_ID", "benchmark")
+    os.environ["WEBHOOK_API_KEY"] = API_KEY
+    os.environ["SEARCH_INDEX_ENABLED"] = "0"
+    os.environ["DEAD_LETTER_DB_PATH"] = os.path.join(data_dir, "dead_letters.db")
+    os.environ.pop("WEBHOOK_CAPTURE_PATH", None)
+    os.environ.pop("STORAGE_MODE", None)
+
+    import logging
+    from app import main as app_main
+    from app.services.rate_limiter import RateLimiter, set_rate_limiter
+    from app.tools.fake_notion import FakeNotionClient
+    logging.disable(logging.CRITICAL)
+    app_main.notion_service.notion = FakeNotionClient()
+    # FakeNotionClientにはレート制限がないため、共有のレートリミッターで待機しない
+    set_rate_limiter(RateLimiter(rate_per_second=1e9, burst=10**9))
+
+    results = {}
+    for name, fast_path in (("route", "0"), ("fast_path", "1")):
+        os.environ["WEBHOOK_FAST_PATH"] = fast_path
+        results[name] = asyncio.run(_measure(app_main.app, args.requests, args.warmup))
+
+    print(f"{'':<10} {'mean (us)':>10} {'p50 (us)':>10} {'p99 (us)':>10}")
+    for name, timings in results.items():
+        p99 = statistics.quantiles(timings, n=100)[98]
+        print(f"{name:<10} {statistics.fmean(timings):>10.1f} {statistics.median(timings):>10.1f} {p99:>10.1f}")
+    saved = statistics.median(results["route"]) - statistics.median(results["fast_path"])
+    print(f"\nframework overhead saved per request (p50): {saved:.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,76 @@
 import os
 import pytest
 from fastapi.testclient import TestClient
+from app.auth import set_api_key
 from app.main import app
+from app.services.dead_letter_store import DeadLetterStore, get_dead_letter_store
+from app.services.digest_buffer import DigestBuffer, get_digest_buffer
+from app.services.rate_limiter import RateLimiter, set_rate_limiter
+from app import request_guard
+from app.services import search_index as search_index_module
+from app.services.search_index import SearchIndex, get_search_index
 
 @pytest.fixture(autouse=True)
 def setup_env():
     """テスト環境のセットアップ"""
     # テスト用のAPI Keyを環境変数に設定
     os.environ["WEBHOOK_API_KEY"] = "test-api-key"
+    set_api_key("test-api-key")
     yield
     # テスト後にAPI Keyを削除
     os.environ.pop("WEBHOOK_API_KEY", None)
+    set_api_key()
+
+@pytest.fixture(autouse=True)
+def reset_request_guard(monkeypatch):
+    """クライアントごとの失敗の回数とログの頻度をテストごとにリセットする"""
+    monkeypatch.setattr(request_guard, "_failure_limiter", None)
+    monkeypatch.setattr(request_guard, "_rejection_log", None)
+
+@pytest.fixture(autouse=True)
+def shared_rate_limiter():
+    """Notion APIを呼び出さないテストでは、共有のレートリミッターで待機しないようにする"""
+    rate_limiter = RateLimiter(rate_per_second=1000, burst=1000)
+    set_rate_limiter(rate_limiter)
+    yield rate_limiter
+    set_rate_limiter()
+
+@pytest.fixture
+def dead_letter_store(tmp_path):
+    """一時ディレクトリに保存するデッドレターストアを提供するフィクスチャ"""
+    return DeadLetterStore(tmp_path / "dead_letters.db")
+
+@pytest.fixture(autouse=True)
+def override_dead_letter_store(dead_letter_store):
+    """アプリケーションが使うデッドレターストアを一時ディレクトリのものに差し替える"""
+    app.dependency_overrides[get_dead_letter_store] = lambda: dead_letter_store
+    yield
+    app.dependency_overrides.pop(get_dead_letter_store, None)
+
+@pytest.fixture
+def digest_buffer(tmp_path):
+    """一時ディレクトリに保存するダイジェストのバッファを提供するフィクスチャ"""
+    return DigestBuffer(tmp_path / "digest_buffer.db")
+
+@pytest.fixture(autouse=True)
+def override_digest_buffer(digest_buffer):
+    """アプリケーションが使うダイジェストのバッファを一時ディレクトリのものに差し替える"""
+    app.dependency_overrides[get_digest_buffer] = lambda: digest_buffer
+    yield
+    app.dependency_overrides.pop(get_digest_buffer, None)
+
+@pytest.fixture
+def search_index(tmp_path):
+    """一時ディレクトリに保存する検索インデックスを提供するフィクスチャ"""
+    return SearchIndex(tmp_path / "search_index.db")
+
+@pytest.fixture(autouse=True)
+def override_search_index(search_index, monkeypatch):
+    """ページ作成時の登録先と検索APIの参照先を一時ディレクトリのインデックスに差し替える"""
+    monkeypatch.setattr(search_index_module, "_search_index", search_index)
+    app.dependency_overrides[get_search_index] = lambda: search_index
+    yield
+    app.dependency_overrides.pop(get_search_index, None)
 
 @pytest.fixture
 def test_client():
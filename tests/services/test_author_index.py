@@ -0,0 +1,93 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from app.exceptions import NotionAPIException
+from app.services.author_index import AuthorIndex, AuthorResolver
+from app.services.notion_service import NotionService, clear_schema_cache
+from app.tools.fake_notion import FakeNotionClient
+
+SCHEMA = {
+    "properties": {
+        "ID": {"type": "title"},
+        "Text": {"type": "rich_text"},
+        "URL": {"type": "url"},
+        "Tweeted_at": {"type": "date"},
+        "Author": {"type": "relation"}
+    }
+}
+
+@pytest.fixture
+def author_index(tmp_path):
+    return AuthorIndex(tmp_path / "author_index.db")
+
+@pytest.fixture
+def notion():
+    return FakeNotionClient(latency=0.01)
+
+def test_resolve_creates_author_once_for_concurrent_requests(notion, author_index):
+    """同じ著者の解決が同時に行われても著者ページは一度だけ作成されることのテスト"""
+    resolver = AuthorResolver(notion, "authors-db", index=author_index)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        page_ids = list(executor.map(resolver.resolve, ["test_user"] * 16))
+
+    assert len(set(page_ids)) == 1
+    assert notion.count("pages.create") == 1
+    assert notion.count("databases.query") == 1
+
+def test_resolve_uses_persistent_index(notion, author_index):
+    """再起動後もローカルインデックスから著者を解決できることのテスト"""
+    page_id = AuthorResolver(notion, "authors-db", index=author_index).resolve("test_user")
+
+    restarted = AuthorResolver(notion, "authors-db", index=AuthorIndex(author_index.path))
+    assert restarted.resolve("test_user") == page_id
+    assert notion.count() == 2
+
+def test_resolve_finds_existing_author(notion, author_index, monkeypatch):
+    """著者データベースに既に存在する著者は作成しないことのテスト"""
+    monkeypatch.setattr(
+        notion.databases, "query",
+        lambda database_id, **kwargs: {"results": [{"id": "existing-author"}], "has_more": False}
+    )
+    resolver = AuthorResolver(notion, "authors-db", index=author_index)
+
+    assert resolver.resolve("test_user") == "existing-author"
+    assert notion.count("pages.create") == 0
+
+def test_resolve_evicts_least_recently_used(notion, author_index):
+    """キャッシュの上限を超えた著者は最も使われていないものから破棄されることのテスト"""
+    resolver = AuthorResolver(notion, "authors-db", index=author_index, cache_size=2)
+    for user_name in ["a", "b", "a", "c"]:
+        resolver.resolve(user_name)
+
+    assert list(resolver._cache) == ["a", "c"]
+
+def test_resolve_raises_notion_api_exception(notion, author_index, monkeypatch):
+    """著者ページの作成に失敗した場合のテスト"""
+    def fail(**kwargs):
+        raise Exception("API Error")
+    monkeypatch.setattr(notion.pages, "create", fail)
+    resolver = AuthorResolver(notion, "authors-db", index=author_index)
+
+    with pytest.raises(NotionAPIException):
+        resolver.resolve("test_user")
+    assert author_index.get("test_user") is None
+
+def test_create_page_adds_author_relation(notion, author_index, monkeypatch):
+    """著者データベースが設定されている場合にリレーションが追加されることのテスト"""
+    monkeypatch.setattr(notion.databases, "retrieve", lambda database_id, **kwargs: SCHEMA)
+    clear_schema_cache()
+    resolver = AuthorResolver(notion, "authors-db", index=author_index)
+    notion_service = NotionService(author_resolver=resolver)
+    notion_service.notion = notion
+
+    notion_service.create_page({
+        "userName": "test_user",
+        "text": "test text",
+        "linkToTweet": "https://twitter.com/test_user/status/123456789",
+        "createdAt": "2024-01-01T00:00:00"
+    })
+    clear_schema_cache()
+
+    tweet_page = [call for call in notion.calls if call["method"] == "pages.create"][-1]
+    author_page_id = author_index.get("test_user")
+    assert tweet_page["params"]["properties"]["Author"] == {"relation": [{"id": author_page_id}]}
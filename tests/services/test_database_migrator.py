@@ -0,0 +1,130 @@
+import pytest
+from app.services.database_migrator import (
+    STAGE_COPIED,
+    STAGE_CREATED,
+    STAGE_DONE,
+    DatabaseMigrator,
+    MigrationCheckpoint
+)
+from app.services.notion_service import NotionService, clear_schema_cache
+from app.services.rate_limiter import RateLimiter
+from app.tools.fake_notion import FakeNotionClient
+
+def make_page(i, text=None):
+    return {"id": f"source-{i}", "properties": {
+        "ID": {"type": "title", "title": [{"plain_text": "test_user"}]},
+        "Text": {"type": "rich_text", "rich_text": [{"plain_text": f"tweet {i}" if text is None else text}]},
+        "URL": {"type": "url", "url": f"https://twitter.com/test_user/status/{i}"},
+        "Tweeted_at": {"type": "date", "date": {"start": "2023-02-10T13:35:00.000+00:00"}}
+    }}
+
+@pytest.fixture
+def source(monkeypatch):
+    """アーカイブしたページはdatabases.queryの結果から除かれる（Notionと同じ）"""
+    pages = [make_page(i) for i in range(5)] + [make_page(5, text="")]
+    archived = set()
+    notion = FakeNotionClient()
+    def query(database_id, start_cursor=None, **kwargs):
+        start = int(start_cursor or 0)
+        live = [page for page in pages if page["id"] not in archived]
+        return {"results": live[start:start + 2], "has_more": start + 2 < len(live), "next_cursor": str(start + 2)}
+    original_update = notion.pages.update
+    def update(page_id, **kwargs):
+        if kwargs.get("archived"):
+            archived.add(page_id)
+        return original_update(page_id=page_id, **kwargs)
+    def list_children(block_id, **kwargs):
+        return {"results": [
+            {"type": "paragraph", "paragraph": {"rich_text": []}},
+            {"type": "embed", "embed": {"url": f"https://twitter.com/{block_id}", "caption": []}}
+        ], "has_more": False}
+    monkeypatch.setattr(notion.databases, "query", query)
+    monkeypatch.setattr(notion.blocks.children, "list", list_children)
+    monkeypatch.setattr(notion.pages, "update", update)
+    service = NotionService(database_id="source-db")
+    service.notion = notion
+    return service
+
+@pytest.fixture
+def target():
+    clear_schema_cache()
+    service = NotionService(database_id="target-db", use_search_index=False)
+    service.notion = FakeNotionClient()
+    yield service
+    clear_schema_cache()
+
+def make_migrator(source, target, checkpoint, **kwargs):
+    return DatabaseMigrator(
+        source, target, checkpoint, rate_limiter=RateLimiter(rate_per_second=1000, burst=1000), **kwargs
+    )
+
+def test_migrate_recreates_pages_with_embeds(source, target, tmp_path, search_index):
+    """ページと埋め込みを移行先に作り直し、読み込みが終わってから移行元をアーカイブすることのテスト"""
+    search_index.add("source-0", {"userName": "test_user", "text": "tweet 0"})
+    search_index.add("other", {"userName": "test_user", "text": "tweet other"})
+    checkpoint = MigrationCheckpoint(tmp_path / "checkpoint.jsonl")
+    progress = []
+
+    report = make_migrator(
+        source, target, checkpoint, archive_source=True, progress_interval=2, search_index=search_index
+    ).migrate(on_progress=progress.append)
+
+    # アーカイブで移行元のページが減っても、読み込みから漏れるページはない
+    assert (report.total, report.migrated, report.skipped, report.failed, report.archived) == (6, 5, 1, 0, 5)
+    assert target.notion.count("pages.create") == 5
+    appended = [call["params"]["children"] for call in target.notion.calls if call["method"] == "blocks.children.append"]
+    assert all(len(children) == 1 and children[0]["type"] == "embed" for children in appended)
+    assert source.notion.count("pages.update") == 5
+    assert sorted(p.total for p in progress) == [2, 4, 6]
+    assert checkpoint.get("source-4")["stage"] == STAGE_DONE
+    # アーカイブしたページは検索インデックスから削除し、移行先のページは登録しない
+    assert [r.page_id for r in search_index.search(q="tweet")] == ["other"]
+
+def test_migrate_retries_failed_archives(source, target, tmp_path, monkeypatch):
+    """アーカイブに失敗したページを再実行した場合に、アーカイブのみやり直すことのテスト"""
+    path = tmp_path / "checkpoint.jsonl"
+    checkpoint = MigrationCheckpoint(path)
+    original_update = source.notion.pages.update
+    def fail(page_id, **kwargs):
+        raise Exception("API Error")
+    monkeypatch.setattr(source.notion.pages, "update", fail)
+
+    report = make_migrator(source, target, checkpoint, archive_source=True).migrate()
+
+    assert (report.migrated, report.archived) == (5, 0)
+    assert checkpoint.get("source-0")["stage"] == STAGE_COPIED
+
+    monkeypatch.setattr(source.notion.pages, "update", original_update)
+    report = make_migrator(source, target, checkpoint, archive_source=True).migrate()
+
+    assert (report.migrated, report.skipped, report.archived) == (0, 6, 5)
+    assert target.notion.count("pages.create") == 5
+    assert checkpoint.get("source-0")["stage"] == STAGE_DONE
+
+def test_migrate_resumes_from_checkpoint(source, target, tmp_path):
+    """チェックポイントから再開した場合に完了したページを飛ばすことのテスト"""
+    path = tmp_path / "checkpoint.jsonl"
+    checkpoint = MigrationCheckpoint(path)
+    checkpoint.record("source-0", "target-0", STAGE_DONE)
+    checkpoint.record("source-1", "target-1", STAGE_CREATED)
+    checkpoint.close()
+
+    resumed = MigrationCheckpoint(path)
+    report = make_migrator(source, target, resumed).migrate()
+
+    assert (report.migrated, report.skipped) == (4, 2)
+    # 作成済みのページは作り直さず、埋め込みの追加から続ける
+    assert target.notion.count("pages.create") == 3
+    assert resumed.get("source-1") == {"source": "source-1", "target": "target-1", "stage": STAGE_DONE}
+
+def test_migrate_counts_failures(source, target, tmp_path, monkeypatch):
+    """移行先への書き込みに失敗したページを失敗として数えることのテスト"""
+    def fail(**kwargs):
+        raise Exception("API Error")
+    monkeypatch.setattr(target.notion.pages, "create", fail)
+    checkpoint = MigrationCheckpoint(tmp_path / "checkpoint.jsonl")
+
+    report = make_migrator(source, target, checkpoint, max_workers=2).migrate(limit=3)
+
+    assert (report.total, report.failed) == (3, 3)
+    assert checkpoint.get("source-0") is None
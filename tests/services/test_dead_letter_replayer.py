@@ -0,0 +1,102 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.exceptions import NotionAPIException
+from app.models import Tweet
+from app.services.dead_letter_replayer import DeadLetterReplayer
+from app.services.dead_letter_store import STAGE_ADD_TWEET_URL, STAGE_CREATE_PAGE
+from app.services.rate_limiter import RateLimiter
+
+def make_tweet(text="test text"):
+    return Tweet(
+        text=text,
+        userName="test_user",
+        linkToTweet="https://twitter.com/test_user/status/123456789",
+        createdAt=datetime(2025, 2, 10, 13, 35, 49)
+    )
+
+def make_error(error_type):
+    return NotionAPIException("Failed to create Notion page", details={"api": "error", "error_type": error_type})
+
+class FakeNotionService:
+    def __init__(self, fail_create=False):
+        self.fail_create = fail_create
+        self.created = []
+        self.embedded = []
+
+    def create_page(self, data):
+        if self.fail_create:
+            raise make_error("rate_limited")
+        self.created.append(data)
+        return {"id": f"page-{len(self.created)}"}
+
+    def add_tweet_url(self, page_id, link_to_tweet):
+        self.embedded.append(page_id)
+        return {"id": page_id}
+
+def test_store_filters_by_error_type_and_time_window(dead_letter_store):
+    """エラー種別と期間での絞り込みのテスト"""
+    dead_letter_store.add(make_tweet("a"), make_error("rate_limited"))
+    dead_letter_store.add(make_tweet("b"), make_error("validation_error"))
+
+    rate_limited = dead_letter_store.list(error_type="rate_limited")
+    assert [d.tweet.text for d in rate_limited] == ["a"]
+    assert rate_limited[0].stage == STAGE_CREATE_PAGE
+
+    now = datetime.now(timezone.utc)
+    assert len(dead_letter_store.list(since=now - timedelta(minutes=1))) == 2
+    assert dead_letter_store.list(since=now + timedelta(minutes=1)) == []
+    assert dead_letter_store.list(until=now - timedelta(minutes=1)) == []
+
+def test_replay_creates_pages_and_marks_replayed(dead_letter_store):
+    """デッドレターの再実行のテスト"""
+    dead_letter_store.add(make_tweet("a"), make_error("rate_limited"))
+    dead_letter_store.add(make_tweet("b"), make_error("timeout"), stage=STAGE_ADD_TWEET_URL, page_id="existing-page")
+    notion_service = FakeNotionService()
+
+    replayer = DeadLetterReplayer(dead_letter_store, notion_service, RateLimiter(1000), max_workers=2)
+    report = replayer.replay()
+
+    assert report.total == 2
+    assert report.succeeded == 2
+    assert report.failed == 0
+    assert report.throughput_per_second > 0
+    # add_tweet_urlで失敗したものはページを作り直さない
+    assert len(notion_service.created) == 1
+    assert sorted(notion_service.embedded) == ["existing-page", "page-1"]
+    assert dead_letter_store.list() == []
+    assert len(dead_letter_store.list(status="replayed")) == 2
+
+def test_replay_failure_keeps_dead_letter_pending(dead_letter_store):
+    """再実行に失敗したデッドレターが残ることのテスト"""
+    dead_letter_store.add(make_tweet(), make_error("timeout"))
+
+    replayer = DeadLetterReplayer(dead_letter_store, FakeNotionService(fail_create=True), RateLimiter(1000))
+    report = replayer.replay()
+
+    assert report.failed == 1
+    pending = dead_letter_store.list()
+    assert len(pending) == 1
+    assert pending[0].attempts == 1
+    assert pending[0].error_type == "rate_limited"
+
+def test_claim_does_not_return_same_dead_letter_twice(dead_letter_store):
+    """同時に再実行しても同じデッドレターが二重に取得されないことのテスト"""
+    for text in ["a", "b", "c"]:
+        dead_letter_store.add(make_tweet(text), make_error("timeout"))
+
+    first = dead_letter_store.claim(limit=2)
+    second = dead_letter_store.claim()
+
+    assert [d.tweet.text for d in first] == ["a", "b"]
+    assert [d.tweet.text for d in second] == ["c"]
+    assert dead_letter_store.claim() == []
+    assert dead_letter_store.list() == []
+
+def test_concurrent_first_access_initializes_once(tmp_path):
+    """初回アクセスが同時に行われてもテーブルが作成されることのテスト"""
+    from concurrent.futures import ThreadPoolExecutor
+    from app.services.dead_letter_store import DeadLetterStore
+    store = DeadLetterStore(tmp_path / "concurrent.db")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: store.list(), range(16)))
+    assert results == [[]] * 16
@@ -0,0 +1,114 @@
+import pytest
+from datetime import date, datetime, timezone
+from app.exceptions import NotionAPIException
+from app.models import Tweet
+from app.services.digest_buffer import DigestBuffer
+from app.services.digest_writer import DigestWriter
+from app.services.rate_limiter import RateLimiter
+
+def make_tweet(text="test text"):
+    return Tweet(
+        text=text,
+        userName="test_user",
+        linkToTweet="https://twitter.com/test_user/status/123456789",
+        createdAt=datetime(2025, 2, 10, 13, 35, 49)
+    )
+
+class FakeNotionService:
+    def __init__(self, fail_append=False, existing_pages=None):
+        self.fail_append = fail_append
+        self.existing_pages = existing_pages or {}
+        self.digest_pages = []
+        self.appended = []
+
+    def find_digest_page(self, day):
+        page_id = self.existing_pages.get(day)
+        return {"id": page_id} if page_id else None
+
+    def create_digest_page(self, day):
+        self.digest_pages.append(day)
+        return {"id": f"digest-{day.isoformat()}"}
+
+    def append_blocks(self, page_id, blocks):
+        if self.fail_append:
+            raise NotionAPIException("Failed to append blocks", details={"api": "error", "error_type": "rate_limited"})
+        self.appended.append((page_id, len(blocks)))
+        return {"results": blocks}
+
+def make_writer(buffer, notion_service):
+    return DigestWriter(buffer, notion_service, rate_limiter=RateLimiter(rate_per_second=1000, burst=1000))
+
+def test_flush_appends_up_to_block_limit_per_call(digest_buffer):
+    """1回の追加でNotionの上限までブロックをまとめることのテスト"""
+    received_at = datetime(2025, 2, 10, 12, 0, tzinfo=timezone.utc)
+    for i in range(120):
+        digest_buffer.add(make_tweet(f"tweet {i}"), received_at=received_at)
+    notion_service = FakeNotionService()
+
+    assert make_writer(digest_buffer, notion_service).flush() == 120
+    assert notion_service.digest_pages == [date(2025, 2, 10)]
+    assert notion_service.appended == [("digest-2025-02-10", 100), ("digest-2025-02-10", 100), ("digest-2025-02-10", 40)]
+    assert digest_buffer.count() == 0
+
+def test_flush_writes_each_day_to_its_own_page(digest_buffer):
+    """受信日ごとに別のダイジェストページに書き込むことのテスト"""
+    digest_buffer.add(make_tweet("a"), received_at=datetime(2025, 2, 10, tzinfo=timezone.utc))
+    digest_buffer.add(make_tweet("b"), received_at=datetime(2025, 2, 11, tzinfo=timezone.utc))
+    notion_service = FakeNotionService()
+
+    make_writer(digest_buffer, notion_service).flush()
+
+    assert notion_service.appended == [("digest-2025-02-10", 2), ("digest-2025-02-11", 2)]
+
+def test_flush_reuses_persisted_digest_page(digest_buffer):
+    """再起動後も同じ日のダイジェストページに追記することのテスト"""
+    received_at = datetime(2025, 2, 10, tzinfo=timezone.utc)
+    notion_service = FakeNotionService()
+    digest_buffer.add(make_tweet(), received_at=received_at)
+    make_writer(digest_buffer, notion_service).flush()
+
+    restarted = DigestBuffer(digest_buffer.path)
+    restarted.add(make_tweet(), received_at=received_at)
+    make_writer(restarted, notion_service).flush()
+
+    assert notion_service.digest_pages == [date(2025, 2, 10)]
+    assert len(notion_service.appended) == 2
+
+def test_flush_reuses_digest_page_created_by_other_instance(digest_buffer):
+    """バッファに記録がなくても、Notionにあるその日のダイジェストページに追記することのテスト"""
+    digest_buffer.add(make_tweet(), received_at=datetime(2025, 2, 10, tzinfo=timezone.utc))
+    notion_service = FakeNotionService(existing_pages={date(2025, 2, 10): "existing-digest"})
+
+    make_writer(digest_buffer, notion_service).flush()
+
+    assert notion_service.digest_pages == []
+    assert notion_service.appended == [("existing-digest", 2)]
+    assert digest_buffer.get_page_id(date(2025, 2, 10)) == "existing-digest"
+
+def test_flush_keeps_likes_on_failure(digest_buffer):
+    """書き込みに失敗したいいねがバッファに残ることのテスト"""
+    digest_buffer.add(make_tweet())
+
+    with pytest.raises(NotionAPIException):
+        make_writer(digest_buffer, FakeNotionService(fail_append=True)).flush()
+
+    assert digest_buffer.count() == 1
+
+def test_webhook_buffers_like_in_digest_mode(test_client, digest_buffer, monkeypatch):
+    """ダイジェストモードではNotionを呼ばずにバッファに保存することのテスト"""
+    monkeypatch.setenv("STORAGE_MODE", "digest")
+    from app.services.notion_service import NotionService
+    def fail(*args, **kwargs):
+        raise AssertionError("Notion must not be called")
+    monkeypatch.setattr(NotionService, "create_page", fail)
+
+    raw_body = "test tweet___POST_FIELD_SEPARATOR___testuser___POST_FIELD_SEPARATOR___https://twitter.com/testuser/status/123456789___POST_FIELD_SEPARATOR___2025-02-10T13:35:49Z"
+    response = test_client.post(
+        "/webhook",
+        content=raw_body.encode(),
+        headers={"X-API-Key": "test-api-key", "Content-Type": "text/plain"}
+    )
+
+    assert response.status_code == 202
+    assert response.json()["status"] == "buffered"
+    assert digest_buffer.count() == 1
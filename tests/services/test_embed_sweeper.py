@@ -0,0 +1,82 @@
+import pytest
+from app.exceptions import NotionAPIException
+from app.models import Tweet
+from app.services.embed_sweeper import EmbedSweeper
+from app.services.notion_service import NotionService
+from app.services.rate_limiter import RateLimiter
+from app.tools.fake_notion import FakeNotionClient
+
+def make_page(i, url=None):
+    return {"id": f"page-{i}", "properties": {
+        "ID": {"type": "title", "title": [{"plain_text": "test_user"}]},
+        "URL": {"type": "url", "url": f"https://twitter.com/test_user/status/{i}" if url is None else url}
+    }}
+
+EMBED = {"type": "embed", "embed": {"url": "https://twitter.com/test_user/status/0"}}
+PARAGRAPH = {"type": "paragraph", "paragraph": {"rich_text": []}}
+
+@pytest.fixture
+def notion_service(monkeypatch):
+    """page-0は埋め込みあり、page-1は2回目の一覧に埋め込みあり、page-2とpage-3は埋め込みなし"""
+    pages = [make_page(i) for i in range(4)] + [make_page(4, url="")]
+    children = {
+        "page-0": [[EMBED]],
+        "page-1": [[PARAGRAPH], [EMBED]],
+        "page-2": [[PARAGRAPH]],
+        "page-3": [[]],
+    }
+    notion = FakeNotionClient()
+    def query(database_id, start_cursor=None, **kwargs):
+        notion.calls.append({"method": "databases.query", "params": kwargs})
+        start = int(start_cursor or 0)
+        return {"results": pages[start:start + 2], "has_more": start + 2 < len(pages), "next_cursor": str(start + 2)}
+    def list_children(block_id, start_cursor=None, **kwargs):
+        notion.calls.append({"method": "blocks.children.list", "params": {"block_id": block_id, **kwargs}})
+        batches = children[block_id]
+        index = int(start_cursor or 0)
+        has_more = index + 1 < len(batches)
+        return {"results": batches[index], "has_more": has_more, "next_cursor": str(index + 1) if has_more else None}
+    monkeypatch.setattr(notion.databases, "query", query)
+    monkeypatch.setattr(notion.blocks.children, "list", list_children)
+    service = NotionService(database_id="test-db")
+    service.notion = notion
+    return service
+
+def make_sweeper(notion_service, **kwargs):
+    return EmbedSweeper(notion_service, rate_limiter=RateLimiter(rate_per_second=1000, burst=1000), **kwargs)
+
+def appended_pages(notion_service):
+    return sorted(
+        call["params"]["block_id"] for call in notion_service.notion.calls
+        if call["method"] == "blocks.children.append"
+    )
+
+def test_sweep_repairs_pages_without_embed(notion_service, dead_letter_store):
+    """埋め込みのないページだけに埋め込みを追加し、デッドレターを再実行済みにすることのテスト"""
+    dead_letter_store.add(
+        Tweet(text="t", userName="u", linkToTweet="https://twitter.com/test_user/status/2", createdAt="2025-02-10"),
+        NotionAPIException("Failed to add embed tweet", details={"error_type": "timeout"}),
+        stage="add_tweet_url",
+        page_id="page-2"
+    )
+
+    report = make_sweeper(notion_service, dead_letter_store=dead_letter_store).sweep()
+
+    assert (report.checked, report.missing, report.repaired, report.pending) == (5, 2, 2, 0)
+    assert appended_pages(notion_service) == ["page-2", "page-3"]
+    assert dead_letter_store.list() == []
+    # URLのあるページと、作成から猶予時間が経過したページに絞り込んで読み込む
+    conditions = notion_service.notion.calls[0]["params"]["filter"]["and"]
+    assert conditions[0] == {"property": "URL", "url": {"is_not_empty": True}}
+    assert list(conditions[1]["created_time"]) == ["on_or_after"]
+    assert list(conditions[2]["created_time"]) == ["before"]
+
+def test_sweep_reports_pending_when_repair_fails(notion_service, monkeypatch):
+    """埋め込みの追加に失敗したページが未修復として数えられることのテスト"""
+    def fail(block_id, **kwargs):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(notion_service.notion.blocks.children, "append", fail)
+
+    report = make_sweeper(notion_service).sweep(limit=3)
+
+    assert (report.checked, report.missing, report.repaired, report.pending) == (3, 1, 0, 1)
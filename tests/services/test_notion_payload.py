@@ -0,0 +1,66 @@
+import pytest
+from datetime import datetime
+from app.exceptions import ConfigurationException, ValidationException
+from app.services.notion_payload import (
+    RICH_TEXT_CONTENT_LIMIT,
+    chunk_text,
+    compile_payload_builder,
+    default_schema
+)
+
+VALID_DATA = {
+    "userName": "test_user",
+    "text": "test text",
+    "linkToTweet": "https://twitter.com/test_user/status/123456789",
+    "createdAt": datetime(2025, 2, 10, 13, 35, 49)
+}
+
+def test_default_schema_builds_current_properties():
+    """デフォルトのスキーマで従来と同じプロパティが組み立てられることのテスト"""
+    builder = compile_payload_builder(default_schema())
+    assert builder.build(VALID_DATA) == {
+        "ID": {"title": [{"text": {"content": "test_user"}}]},
+        "Text": {"rich_text": [{"text": {"content": "test text"}}]},
+        "URL": {"url": "https://twitter.com/test_user/status/123456789"},
+        "Tweeted_at": {"date": {"start": "2025-02-10T13:35:49"}}
+    }
+
+def test_chunk_text_respects_limit():
+    """長いテキストが文字数制限ごとに分割されることのテスト"""
+    text = "a" * (RICH_TEXT_CONTENT_LIMIT * 2 + 1)
+    chunks = chunk_text(text)
+    assert [len(chunk) for chunk in chunks] == [RICH_TEXT_CONTENT_LIMIT, RICH_TEXT_CONTENT_LIMIT, 1]
+    assert "".join(chunks) == text
+
+def test_chunk_text_counts_utf16_code_units():
+    """絵文字などサロゲートペアの文字が2文字として数えられることのテスト"""
+    chunks = chunk_text("😀" * RICH_TEXT_CONTENT_LIMIT)
+    assert [len(chunk) for chunk in chunks] == [RICH_TEXT_CONTENT_LIMIT // 2, RICH_TEXT_CONTENT_LIMIT // 2]
+
+def test_build_rejects_too_long_text():
+    """Notionの制限を超えるテキストが送信前に拒否されることのテスト"""
+    builder = compile_payload_builder(default_schema())
+    with pytest.raises(ValidationException) as exc_info:
+        builder.build({**VALID_DATA, "text": "a" * (RICH_TEXT_CONTENT_LIMIT * 100 + 1)})
+    assert "Property 'Text' is too long" in str(exc_info.value)
+
+def test_compile_with_custom_mapping_and_types():
+    """プロパティ名と型がスキーマに合わせて変換されることのテスト"""
+    schema = {
+        "Name": {"type": "title"},
+        "Author": {"type": "rich_text"},
+        "Link": {"type": "url"},
+        "Date": {"type": "date"}
+    }
+    mapping = {"text": "Name", "userName": "Author", "linkToTweet": "Link", "createdAt": "Date"}
+    properties = compile_payload_builder(schema, mapping).build(VALID_DATA)
+    assert properties["Name"] == {"title": [{"text": {"content": "test text"}}]}
+    assert properties["Author"] == {"rich_text": [{"text": {"content": "test_user"}}]}
+
+def test_compile_rejects_schema_mismatch():
+    """スキーマにないプロパティや未対応の型がエラーになることのテスト"""
+    schema = {"ID": {"type": "title"}, "Text": {"type": "files"}}
+    with pytest.raises(ConfigurationException) as exc_info:
+        compile_payload_builder(schema)
+    assert exc_info.value.details["text"] == "Property 'Text' has unsupported type 'files'"
+    assert exc_info.value.details["linkToTweet"] == "Property 'URL' does not exist in the database"
@@ -2,13 +2,31 @@ import os
 import pytest
 from datetime import datetime
 from dotenv import load_dotenv
-from app.services.notion_service import NotionService
+from app.services.notion_service import SCHEMA_RETRY_SECONDS, NotionService, _get_schema_cache, clear_schema_cache
 from app.exceptions import NotionAPIException, ValidationException, ConfigurationException
 from notion_client.errors import APIResponseError
 
 # テスト用の環境変数を読み込む
 load_dotenv(".env.test")
 
+DEFAULT_SCHEMA = {
+    "properties": {
+        "ID": {"type": "title"},
+        "Text": {"type": "rich_text"},
+        "URL": {"type": "url"},
+        "Tweeted_at": {"type": "date"}
+    }
+}
+
+@pytest.fixture(autouse=True)
+def mock_database_schema(monkeypatch):
+    """スキーマの取得でNotion APIを呼ばないようにモックし、キャッシュを破棄する"""
+    from notion_client.api_endpoints import DatabasesEndpoint
+    monkeypatch.setattr(DatabasesEndpoint, "retrieve", lambda self, database_id, **kwargs: DEFAULT_SCHEMA)
+    clear_schema_cache()
+    yield
+    clear_schema_cache()
+
 def test_notion_service_initialization_without_api_key(monkeypatch):
     """API Keyが設定されていない場合のテスト"""
     monkeypatch.delenv("NOTION_API_KEY", raising=False)
@@ -94,3 +112,149 @@ def test_add_tweet_url_with_api_error(monkeypatch):
     with pytest.raises(NotionAPIException) as exc_info:
         notion_service.add_tweet_url(page_id, link_to_tweet)
     assert "Failed to add embed tweet" in str(exc_info.value)
+
+SCHEMA = DEFAULT_SCHEMA
+
+VALID_DATA = {
+    "userName": "test_user",
+    "text": "test text",
+    "linkToTweet": "https://twitter.com/test_user/status/123456789",
+    "createdAt": datetime(2025, 2, 10, 13, 35, 49)
+}
+
+def make_api_error(code):
+    import httpx
+    return APIResponseError(httpx.Response(400), "API Error", code)
+
+def test_database_schema_is_cached(monkeypatch):
+    """データベースのスキーマがキャッシュされることのテスト"""
+    calls = []
+    def mock_retrieve(database_id):
+        calls.append(database_id)
+        return SCHEMA
+
+    notion_service = NotionService()
+    monkeypatch.setattr(notion_service.notion.databases, "retrieve", mock_retrieve)
+    monkeypatch.setattr(notion_service.notion.pages, "create", lambda **kwargs: {"id": "test-page-id"})
+
+    notion_service.create_page(VALID_DATA)
+    notion_service.create_page(VALID_DATA)
+    assert len(calls) == 1
+
+    # TTLが切れたら取得し直す
+    notion_service.schema_ttl = 0
+    notion_service.create_page(VALID_DATA)
+    assert len(calls) == 2
+
+def test_schema_is_refreshed_on_validation_error(monkeypatch):
+    """スキーマの不一致で失敗した場合にスキーマを取得し直して再試行することのテスト"""
+    schemas = [SCHEMA, {"properties": {**SCHEMA["properties"], "Text": {"type": "title"}, "ID": {"type": "rich_text"}}}]
+    created = []
+    def mock_create(**kwargs):
+        created.append(kwargs["properties"])
+        if len(created) == 1:
+            raise make_api_error("validation_error")
+        return {"id": "test-page-id"}
+
+    notion_service = NotionService()
+    monkeypatch.setattr(notion_service.notion.databases, "retrieve", lambda database_id: schemas.pop(0))
+    monkeypatch.setattr(notion_service.notion.pages, "create", mock_create)
+    # スキーマを取得してから SCHEMA_RETRY_SECONDS 以上経っている
+    notion_service.get_payload_builder()
+    _get_schema_cache(notion_service.database_id).fetched_at -= SCHEMA_RETRY_SECONDS + 1
+
+    assert notion_service.create_page(VALID_DATA) == {"id": "test-page-id"}
+    assert created[1]["Text"] == {"title": [{"text": {"content": "test text"}}]}
+
+def test_schema_is_not_refreshed_right_after_fetch(monkeypatch):
+    """スキーマを取得した直後のvalidation_errorではスキーマを取得し直さないことのテスト"""
+    calls = []
+    def mock_retrieve(database_id):
+        calls.append(database_id)
+        return SCHEMA
+    def mock_create(**kwargs):
+        raise make_api_error("validation_error")
+
+    notion_service = NotionService()
+    monkeypatch.setattr(notion_service.notion.databases, "retrieve", mock_retrieve)
+    monkeypatch.setattr(notion_service.notion.pages, "create", mock_create)
+
+    with pytest.raises(NotionAPIException):
+        notion_service.create_page(VALID_DATA)
+    assert len(calls) == 1
+
+def test_property_mapping_from_env(monkeypatch):
+    """環境変数でプロパティの対応を変更できることのテスト"""
+    monkeypatch.setenv("NOTION_PROPERTY_MAPPING", '{"userName": "Author"}')
+    schema = {"properties": {**SCHEMA["properties"], "Author": {"type": "rich_text"}}}
+    created = []
+
+    notion_service = NotionService()
+    monkeypatch.setattr(notion_service.notion.databases, "retrieve", lambda database_id: schema)
+    monkeypatch.setattr(notion_service.notion.pages, "create", lambda **kwargs: created.append(kwargs) or {"id": "id"})
+
+    notion_service.create_page(VALID_DATA)
+    assert "ID" not in created[0]["properties"]
+    assert created[0]["properties"]["Author"] == {"rich_text": [{"text": {"content": "test_user"}}]}
+
+def test_schema_mismatch_is_detected_before_sending(monkeypatch):
+    """スキーマと一致しない場合にNotionへ送信する前にエラーになることのテスト"""
+    def mock_create(**kwargs):
+        raise AssertionError("pages.create should not be called")
+
+    notion_service = NotionService()
+    monkeypatch.setattr(notion_service.notion.databases, "retrieve", lambda database_id: {"properties": {"ID": {"type": "title"}}})
+    monkeypatch.setattr(notion_service.notion.pages, "create", mock_create)
+
+    with pytest.raises(NotionAPIException) as exc_info:
+        notion_service.create_page(VALID_DATA)
+    assert "does not match property mapping" in str(exc_info.value)
+    assert exc_info.value.details["error_type"] == "schema_mismatch"
+
+def test_schema_cache_is_shared_between_instances(monkeypatch):
+    """スキーマのキャッシュがNotionServiceのインスタンス間で共有されることのテスト"""
+    from notion_client.api_endpoints import DatabasesEndpoint
+    calls = []
+    def mock_retrieve(self, database_id, **kwargs):
+        calls.append(database_id)
+        return SCHEMA
+    monkeypatch.setattr(DatabasesEndpoint, "retrieve", mock_retrieve)
+
+    NotionService().get_payload_builder()
+    NotionService().get_payload_builder()
+    assert len(calls) == 1
+
+def test_schema_fetch_failure_keeps_last_good_schema(monkeypatch):
+    """スキーマの取得に失敗した場合に前回のスキーマを使い続けることのテスト"""
+    custom_schema = {"properties": {**SCHEMA["properties"], "Text": {"type": "title"}, "ID": {"type": "rich_text"}}}
+    responses = [custom_schema, make_api_error("rate_limited")]
+    def mock_retrieve(database_id):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    notion_service = NotionService()
+    monkeypatch.setattr(notion_service.notion.databases, "retrieve", mock_retrieve)
+
+    notion_service.get_payload_builder()
+    notion_service.schema_ttl = 0
+    builder = notion_service.get_payload_builder()
+    assert ("text", "Text", "title") in builder.properties
+
+def test_find_digest_page_queries_title_and_date(monkeypatch):
+    """その日のダイジェストページをタイトルと日付のプロパティで探すことのテスト"""
+    from datetime import date
+    queries = []
+    notion_service = NotionService()
+    def query(**kwargs):
+        queries.append(kwargs)
+        return {"results": [{"id": "digest-page"}], "has_more": False}
+    monkeypatch.setattr(notion_service.notion.databases, "query", query)
+
+    assert notion_service.find_digest_page(date(2025, 2, 10)) == {"id": "digest-page"}
+    assert queries[0]["page_size"] == 1
+    assert queries[0]["filter"] == {"and": [
+        {"property": "ID", "title": {"equals": "Likes 2025-02-10"}},
+        {"property": "Tweeted_at", "date": {"equals": "2025-02-10"}}
+    ]}
@@ -0,0 +1,50 @@
+import pytest
+from app.services.database_migrator import DatabaseMigrator
+from app.services.dead_letter_replayer import DeadLetterReplayer
+from app.services.digest_writer import DigestWriter
+from app.services.embed_sweeper import EmbedSweeper
+from app.services.rate_limiter import RateLimiter, get_rate_limiter
+
+RAW_BODY = "test tweet___POST_FIELD_SEPARATOR___test_user___POST_FIELD_SEPARATOR___https://twitter.com/test_user/status/1___POST_FIELD_SEPARATOR___2025-02-10T13:35:49Z"
+
+def test_consume_delays_acquire(monkeypatch):
+    """待機せずに消費したトークンの分だけ、acquireの待機が長くなることのテスト"""
+    now = [0.0]
+    sleeps = []
+    monkeypatch.setattr("app.services.rate_limiter.time.monotonic", lambda: now[0])
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+    monkeypatch.setattr("app.services.rate_limiter.time.sleep", sleep)
+    limiter = RateLimiter(rate_per_second=2, burst=2)
+
+    for _ in range(4):
+        limiter.consume()
+    limiter.acquire()
+
+    # 2トークンを前借りしているため、1トークンを取得できるのは1.5秒後
+    assert sum(sleeps) == pytest.approx(1.5)
+
+def test_services_share_rate_limiter(dead_letter_store, digest_buffer):
+    """レートリミッターを指定しない場合は、プロセス全体で共有するものを使うことのテスト"""
+    shared = get_rate_limiter()
+
+    assert DeadLetterReplayer(dead_letter_store, None).rate_limiter is shared
+    assert EmbedSweeper(None).rate_limiter is shared
+    assert DigestWriter(digest_buffer, None).rate_limiter is shared
+    assert DatabaseMigrator(None, None, None).rate_limiter is shared
+
+def test_webhook_uses_shared_rate_limiter(test_client, shared_rate_limiter, monkeypatch):
+    """Webhookのページ作成と埋め込みの追加が、共有のレートリミッターのトークンを使うことのテスト"""
+    from app.services.notion_service import NotionService
+    monkeypatch.setattr(NotionService, "create_page", lambda self, data: {"id": "test-page-id"})
+    monkeypatch.setattr(NotionService, "add_tweet_url", lambda self, page_id, link: {"id": page_id})
+    calls = []
+    monkeypatch.setattr(shared_rate_limiter, "consume", lambda: calls.append("consume"))
+    monkeypatch.setattr(shared_rate_limiter, "acquire", lambda: calls.append("acquire"))
+
+    response = test_client.post("/webhook", content=RAW_BODY.encode(), headers={"X-API-Key": "test-api-key"})
+
+    assert response.status_code == 200
+    # ページの作成はレスポンスを待たせないよう待機せず、レスポンス後の埋め込みの追加は待機する
+    assert calls == ["consume", "acquire"]
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+from app.services.notion_service import NotionService, clear_schema_cache
+from app.tools.backfill_search_index import backfill
+from app.tools.fake_notion import FakeNotionClient
+
+def make_data(text, user_name="test_user", created_at="2025-02-10T13:35:49Z"):
+    return {
+        "userName": user_name,
+        "text": text,
+        "linkToTweet": f"https://twitter.com/{user_name}/status/123456789",
+        "createdAt": created_at
+    }
+
+def test_search_by_text_author_and_date(search_index):
+    """テキスト、ユーザー名、期間での検索のテスト"""
+    search_index.add("page-1", make_data("Notion APIのレート制限について"))
+    search_index.add("page-2", make_data("今日の天気は晴れ", user_name="other_user"))
+    search_index.add("page-3", make_data("APIの設計", created_at="2025-03-01T00:00:00Z"))
+
+    assert [r.page_id for r in search_index.search(q="レート制限")] == ["page-1"]
+    assert [r.page_id for r in search_index.search(q="API")] == ["page-3", "page-1"]
+    assert [r.page_id for r in search_index.search(q="天気")] == ["page-2"]
+    assert [r.page_id for r in search_index.search(author="OTHER_USER")] == ["page-2"]
+    assert [r.page_id for r in search_index.search(
+        q="API", since=datetime(2025, 2, 1, tzinfo=timezone.utc), until=datetime(2025, 2, 28)
+    )] == ["page-1"]
+
+def test_search_treats_query_as_plain_text(search_index):
+    """FTS5の構文を含む検索語でもエラーにならないことのテスト"""
+    search_index.add("page-1", make_data('say "hello" OR NOT world*'))
+
+    assert [r.page_id for r in search_index.search(q='"hello" OR')] == ["page-1"]
+    assert search_index.search(q="100%") == []
+
+def test_add_updates_existing_page(search_index):
+    """同じページを登録し直した場合に更新されることのテスト"""
+    search_index.add("page-1", make_data("old text"))
+    search_index.add("page-1", make_data("new text"))
+
+    assert search_index.count() == 1
+    assert search_index.search(q="old") == []
+    assert [r.page_id for r in search_index.search(q="new")] == ["page-1"]
+
+def test_create_page_mirrors_into_search_index(search_index, monkeypatch):
+    """ページの作成時に検索インデックスに登録されることのテスト"""
+    notion_service = NotionService()
+    notion_service.notion = FakeNotionClient()
+    clear_schema_cache()
+
+    page = notion_service.create_page(make_data("mirrored tweet"))
+    clear_schema_cache()
+
+    assert [r.page_id for r in search_index.search(q="mirrored")] == [page["id"]]
+
+def test_backfill_reads_all_pages(search_index, monkeypatch):
+    """既存のページをページネーションで取得して登録することのテスト"""
+    pages = [
+        {"id": f"page-{i}", "properties": {
+            "ID": {"type": "title", "title": [{"plain_text": "test_user"}]},
+            "Text": {"type": "rich_text", "rich_text": [{"plain_text": f"tweet {i}"}]},
+            "URL": {"type": "url", "url": "https://twitter.com/test_user/status/1"},
+            "Tweeted_at": {"type": "date", "date": {"start": "2025-02-10T13:35:00.000+00:00"}}
+        }}
+        for i in range(5)
+    ]
+    notion = FakeNotionClient()
+    def query(database_id, start_cursor=None, **kwargs):
+        start = int(start_cursor or 0)
+        return {"results": pages[start:start + 2], "has_more": start + 2 < len(pages), "next_cursor": str(start + 2)}
+    monkeypatch.setattr(notion.databases, "query", query)
+    notion_service = NotionService()
+    notion_service.notion = notion
+
+    assert backfill(notion_service, search_index, batch_size=2) == 5
+    assert [r.page_id for r in search_index.search(q="tweet 3")] == ["page-3"]
+
+def test_search_endpoint(test_client, search_index):
+    """検索APIのテスト"""
+    search_index.add("page-1", make_data("search endpoint"))
+
+    response = test_client.get(
+        "/api/v1/notion/search", params={"q": "endpoint"}, headers={"X-API-Key": "test-api-key"}
+    )
+
+    assert response.status_code == 200
+    assert [r["page_id"] for r in response.json()] == ["page-1"]
+    assert test_client.get("/api/v1/notion/search", params={"q": "endpoint"}).status_code == 401
@@ -0,0 +1,108 @@
+import asyncio
+import gzip
+import json
+import pytest
+from app.capture import TrafficCapture, close_traffic_capture, get_traffic_capture, read_capture, sanitize_body
+from app.tools.replay_traffic import compare, replay
+
+RAW_BODY = '''Secret tweet
+with line breaks___POST_FIELD_SEPARATOR___test_user___POST_FIELD_SEPARATOR___https://twitter.com/test_user/status/123456789___POST_FIELD_SEPARATOR___February 11, 2025 at 01:25AM'''
+HEADERS = {"X-API-Key": "test-api-key", "Content-Type": "text/plain"}
+
+@pytest.fixture
+def capture_path(tmp_path, monkeypatch):
+    """キャプチャモードを有効にするフィクスチャ"""
+    path = tmp_path / "capture.jsonl.gz"
+    monkeypatch.setenv("WEBHOOK_CAPTURE_PATH", str(path))
+    yield path
+    close_traffic_capture()
+
+@pytest.fixture
+def mock_notion(monkeypatch):
+    """NotionServiceのメソッドをモック"""
+    from app.services.notion_service import NotionService
+    monkeypatch.setattr(NotionService, "create_page", lambda self, data: {"id": "test-page-id"})
+    monkeypatch.setattr(NotionService, "add_tweet_url", lambda self, page_id, link: {"id": page_id})
+
+def test_sanitize_body_removes_personal_data():
+    """個人情報が取り除かれ、サイズと日付フォーマットが残ることのテスト"""
+    sanitized = sanitize_body(RAW_BODY)
+    text, user_name, link, created_at = sanitized.split("___POST_FIELD_SEPARATOR___")
+
+    assert "Secret" not in text and "test_user" not in sanitized
+    assert len(text) == len("Secret tweet\nwith line breaks")
+    assert "\n" in text
+    assert link.startswith("https://twitter.com/") and "/status/" in link
+    assert created_at == "February 11, 2025 at 01:25AM"
+    # 同じ入力は同じ値になるため、重複したリクエストも再現できる
+    assert sanitize_body(RAW_BODY) == sanitized
+
+def test_webhook_requests_are_captured(test_client, capture_path, mock_notion):
+    """キャプチャモードでリクエストが記録されることのテスト"""
+    test_client.post("/webhook", content=RAW_BODY.encode(), headers=HEADERS)
+    test_client.post("/webhook", content=RAW_BODY.encode(), headers={**HEADERS, "X-Request-Deadline": "5"})
+
+    capture = get_traffic_capture()
+    # 記録はバッファにためられ、flush() でファイルに書き込まれる
+    assert list(read_capture(capture.file_path)) == []
+    capture.flush()
+
+    entries = list(read_capture(capture.file_path))
+    assert len(entries) == 2
+    assert entries[0]["t"] <= entries[1]["t"]
+    assert entries[0]["size"] == len(RAW_BODY.encode())
+    assert entries[1]["deadline"] == "5"
+    assert capture.file_path.startswith(str(capture_path.parent / "capture-"))
+    close_traffic_capture()
+    with gzip.open(capture.file_path, "rt") as f:
+        assert "test-api-key" not in f.read()
+
+def test_captures_from_multiple_processes_are_merged(tmp_path, monkeypatch):
+    """プロセスごとのキャプチャを到着時刻の順に読み込めることのテスト"""
+    import time
+    from fastapi import Request
+    request = Request({"type": "http", "headers": [(b"content-type", b"text/plain")]})
+    clock = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    first = TrafficCapture(str(tmp_path / "capture.jsonl.gz"))
+    clock[0] = 1010.0
+    second = TrafficCapture(str(tmp_path / "capture.jsonl.gz"))
+
+    second.record(request, "second")
+    first.record(request, "first")
+    # 1つ目のプロセスは閉じずに終了した（最後にフラッシュしたところまで読める）
+    first.flush()
+    second.close()
+
+    entries = list(read_capture(sorted(str(p) for p in tmp_path.glob("capture-*.jsonl.gz"))))
+    assert first.file_path != second.file_path
+    assert [len(entry["body"]) for entry in entries] == [len("first"), len("second")]
+    assert entries[0]["t"] == 0
+    assert entries[1]["t"] == pytest.approx(10, abs=1)
+
+def test_replay_capture_against_fake_notion(monkeypatch):
+    """キャプチャをFakeNotionClientに対して再生できることのテスト"""
+    from app import main
+    # 再生で差し替えられるNotionクライアントをテスト後に元に戻す（API Keyはconftestで戻す）
+    monkeypatch.setattr(main.notion_service, "notion", main.notion_service.notion)
+    entries = [
+        {"t": 0.0, "size": 0, "content_type": "text/plain", "deadline": None, "body": sanitize_body(RAW_BODY)},
+        {"t": 0.01, "size": 0, "content_type": "text/plain", "deadline": None, "body": "invalid"},
+    ]
+
+    report = asyncio.run(replay(entries, speed=0))
+
+    assert report["requests"] == 2
+    assert report["status_counts"] == {"200": 1, "422": 1}
+    # 成功したリクエストはページ作成と埋め込みの追加を呼び出す
+    assert report["notion_calls"] >= 2
+    assert report["latency_ms"]["max"] >= report["latency_ms"]["p50"]
+
+def test_compare_reports():
+    """2つの再生結果の比較のテスト"""
+    base = {"throughput_per_second": 10.0, "latency_ms": {"p50": 20.0, "p99": 40.0}}
+    candidate = {"throughput_per_second": 20.0, "latency_ms": {"p50": 10.0, "p99": 40.0}}
+    result = compare(base, candidate)
+    assert result["throughput_per_second"]["change"] == 1.0
+    assert result["latency_ms"]["p50"]["change"] == -0.5
+    assert result["latency_ms"]["p99"]["change"] == 0.0
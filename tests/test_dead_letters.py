@@ -0,0 +1,91 @@
+from app.exceptions import NotionAPIException
+
+RAW_BODY = '''Test tweet___POST_FIELD_SEPARATOR___test_user___POST_FIELD_SEPARATOR___https://twitter.com/test_user/status/123456789___POST_FIELD_SEPARATOR___2025-02-10T13:35:49Z'''
+HEADERS = {"X-API-Key": "test-api-key", "Content-Type": "text/plain"}
+
+def test_failed_write_is_stored_as_dead_letter(test_client, dead_letter_store, monkeypatch):
+    """Notionへの書き込みに失敗したツイートがデッドレターとして保存されることのテスト"""
+    def mock_create_page(self, data):
+        raise NotionAPIException("Failed to create Notion page", details={"api": "error", "error_type": "rate_limited"})
+
+    from app.services.notion_service import NotionService
+    monkeypatch.setattr(NotionService, "create_page", mock_create_page)
+
+    response = test_client.post("/webhook", content=RAW_BODY.encode(), headers=HEADERS)
+    assert response.status_code == 500
+
+    dead_letters = dead_letter_store.list()
+    assert len(dead_letters) == 1
+    assert dead_letters[0].error_type == "rate_limited"
+    assert dead_letters[0].tweet.userName == "test_user"
+
+def test_schema_mismatch_is_stored_as_dead_letter(test_client, dead_letter_store, monkeypatch):
+    """データベースのスキーマがプロパティの対応と一致しない場合もデッドレターとして保存されることのテスト"""
+    from notion_client.api_endpoints import DatabasesEndpoint
+    from app.services.notion_service import clear_schema_cache
+    schema = {"properties": {"ID": {"type": "title"}, "Body": {"type": "rich_text"},
+                             "URL": {"type": "url"}, "Tweeted_at": {"type": "date"}}}
+    monkeypatch.setattr(DatabasesEndpoint, "retrieve", lambda self, database_id, **kwargs: schema)
+    clear_schema_cache()
+    try:
+        response = test_client.post("/webhook", content=RAW_BODY.encode(), headers=HEADERS)
+    finally:
+        clear_schema_cache()
+    assert response.status_code == 500
+
+    dead_letters = dead_letter_store.list()
+    assert len(dead_letters) == 1
+    assert dead_letters[0].error_type == "schema_mismatch"
+    assert dead_letters[0].stage == "create_page"
+
+def test_failed_embed_is_stored_with_page_id(test_client, dead_letter_store, monkeypatch):
+    """埋め込みの追加に失敗した場合に作成済みのページIDが保存されることのテスト"""
+    def mock_create_page(self, data):
+        return {"id": "test-page-id"}
+
+    def mock_add_tweet_url(self, page_id, link_to_tweet):
+        raise NotionAPIException("Failed to add embed tweet", details={"api": "error", "error_type": "timeout"})
+
+    from app.services.notion_service import NotionService
+    monkeypatch.setattr(NotionService, "create_page", mock_create_page)
+    monkeypatch.setattr(NotionService, "add_tweet_url", mock_add_tweet_url)
+
+    response = test_client.post("/webhook", content=RAW_BODY.encode(), headers=HEADERS)
+    # 埋め込みはレスポンス後に追加するため、ページの作成に成功していれば200を返す
+    assert response.status_code == 200
+
+    dead_letters = dead_letter_store.list()
+    assert dead_letters[0].stage == "add_tweet_url"
+    assert dead_letters[0].page_id == "test-page-id"
+
+def test_replay_endpoint(test_client, dead_letter_store, monkeypatch):
+    """デッドレター再実行エンドポイントのテスト"""
+    def mock_create_page_error(self, data):
+        raise NotionAPIException("Failed to create Notion page", details={"api": "error", "error_type": "rate_limited"})
+
+    def mock_create_page(self, data):
+        return {"id": "test-page-id"}
+
+    def mock_add_tweet_url(self, page_id, link_to_tweet):
+        return {"id": page_id}
+
+    from app.services.notion_service import NotionService
+    monkeypatch.setattr(NotionService, "create_page", mock_create_page_error)
+    test_client.post("/webhook", content=RAW_BODY.encode(), headers=HEADERS)
+
+    monkeypatch.setattr(NotionService, "create_page", mock_create_page)
+    monkeypatch.setattr(NotionService, "add_tweet_url", mock_add_tweet_url)
+
+    response = test_client.get("/api/v1/dead-letters", headers=HEADERS)
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+    response = test_client.post("/api/v1/dead-letters/replay?error_type=rate_limited", headers=HEADERS)
+    assert response.status_code == 200
+    assert response.json()["succeeded"] == 1
+    assert dead_letter_store.list() == []
+
+def test_dead_letter_endpoints_require_api_key(test_client):
+    """デッドレターのエンドポイントにAPI Keyが必要なことのテスト"""
+    response = test_client.get("/api/v1/dead-letters")
+    assert response.status_code == 401
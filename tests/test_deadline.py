@@ -0,0 +1,100 @@
+import httpx
+import pytest
+from app.deadline import Deadline, current_deadline, deadline_scope
+from app.exceptions import NotionAPIException
+from app.services.notion_service import NotionService, clear_schema_cache
+
+RAW_BODY = '''Test tweet___POST_FIELD_SEPARATOR___test_user___POST_FIELD_SEPARATOR___https://twitter.com/test_user/status/123456789___POST_FIELD_SEPARATOR___2025-02-10T13:35:49Z'''
+HEADERS = {"X-API-Key": "test-api-key", "Content-Type": "text/plain"}
+
+SCHEMA = {
+    "properties": {
+        "ID": {"type": "title"},
+        "Text": {"type": "rich_text"},
+        "URL": {"type": "url"},
+        "Tweeted_at": {"type": "date"}
+    }
+}
+
+@pytest.fixture
+def notion_service_with_transport():
+    """Notion APIへのリクエストを記録するNotionServiceを提供するフィクスチャ"""
+    clear_schema_cache()
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if "/databases/" in request.url.path:
+            return httpx.Response(200, json=SCHEMA)
+        return httpx.Response(200, json={"id": "test-page-id"})
+
+    notion_service = NotionService()
+    notion_service.notion.client = httpx.Client(transport=httpx.MockTransport(handler))
+    yield notion_service, requests
+    clear_schema_cache()
+
+def test_deadline_from_header(test_client, monkeypatch):
+    """X-Request-Deadlineヘッダーと設定から期限が作成されることのテスト"""
+    from starlette.requests import Request
+    monkeypatch.setenv("WEBHOOK_DEADLINE_SECONDS", "7")
+
+    def make_request(headers):
+        return Request({"type": "http", "headers": headers})
+
+    assert Deadline.from_request(make_request([])).seconds == 7
+    assert Deadline.from_request(make_request([(b"x-request-deadline", b"3.5")])).seconds == 3.5
+    assert Deadline.from_request(make_request([(b"x-request-deadline", b"invalid")])).seconds == 7
+
+def test_notion_calls_use_remaining_time_as_timeout(notion_service_with_transport):
+    """各Notion API呼び出しのタイムアウトに期限までの残り時間が使われることのテスト"""
+    notion_service, requests = notion_service_with_transport
+
+    with deadline_scope(Deadline(5)):
+        notion_service.add_tweet_url("test-page-id", "https://twitter.com/test_user/status/123456789")
+
+    timeout = requests[-1].extensions["timeout"]
+    assert 0 < timeout["read"] <= 5
+    assert timeout["connect"] == timeout["read"]
+
+def test_notion_call_without_deadline_uses_client_timeout(notion_service_with_transport):
+    """期限がない場合はクライアントのタイムアウトが使われることのテスト"""
+    notion_service, requests = notion_service_with_transport
+
+    notion_service.add_tweet_url("test-page-id", "https://twitter.com/test_user/status/123456789")
+    assert requests[-1].extensions["timeout"]["read"] == 60
+
+def test_expired_deadline_skips_notion_call(notion_service_with_transport):
+    """期限切れの場合はNotion APIを呼ばずにタイムアウトになることのテスト"""
+    notion_service, requests = notion_service_with_transport
+
+    with deadline_scope(Deadline(0)):
+        with pytest.raises(NotionAPIException) as exc_info:
+            notion_service.add_tweet_url("test-page-id", "https://twitter.com/test_user/status/123456789")
+    assert exc_info.value.details["error_type"] == "timeout"
+    assert requests == []
+
+def test_embed_is_added_after_response(test_client, monkeypatch):
+    """埋め込みの追加がレスポンス後に期限なしで行われることのテスト"""
+    calls = []
+
+    def mock_create_page(self, data):
+        calls.append(("create_page", current_deadline.get()))
+        return {"id": "test-page-id"}
+
+    def mock_add_tweet_url(self, page_id, link_to_tweet):
+        calls.append(("add_tweet_url", current_deadline.get()))
+        return {"id": page_id}
+
+    monkeypatch.setattr(NotionService, "create_page", mock_create_page)
+    monkeypatch.setattr(NotionService, "add_tweet_url", mock_add_tweet_url)
+
+    response = test_client.post(
+        "/webhook",
+        content=RAW_BODY.encode(),
+        headers={**HEADERS, "X-Request-Deadline": "3"}
+    )
+    assert response.status_code == 200
+    assert calls[0][0] == "create_page"
+    assert calls[0][1].seconds == 3
+    # 埋め込みはレスポンス後に期限なしで追加される
+    assert calls[1] == ("add_tweet_url", None)
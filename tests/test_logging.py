@@ -0,0 +1,106 @@
+import io
+import json
+import logging
+import pytest
+from app.logging_config import JsonFormatter, RequestContextFilter, log_stage, request_id_var
+from app.tools.log_report import LogHistogram, LogReport, read_entries
+
+@pytest.fixture
+def json_logs():
+    """ルートロガーの出力をJSON形式で取得するフィクスチャ"""
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(RequestContextFilter())
+    root = logging.getLogger()
+    root.addHandler(handler)
+    yield lambda: [json.loads(line) for line in stream.getvalue().splitlines()]
+    root.removeHandler(handler)
+
+def test_json_formatter_includes_request_id_and_extra_fields(json_logs):
+    """構造化ログにリクエストIDとextraのフィールドが含まれることのテスト"""
+    token = request_id_var.set("req-1")
+    try:
+        with log_stage("create_page"):
+            pass
+    finally:
+        request_id_var.reset(token)
+
+    entry = json_logs()[-1]
+    assert entry["request_id"] == "req-1"
+    assert entry["stage"] == "create_page"
+    assert entry["duration_ms"] >= 0
+    assert entry["severity"] == "INFO"
+
+def test_log_stage_records_error_class(json_logs):
+    """失敗した段階のログに例外クラスが含まれることのテスト"""
+    with pytest.raises(ValueError):
+        with log_stage("add_tweet_url"):
+            raise ValueError("boom")
+
+    assert json_logs()[-1]["error_class"] == "ValueError"
+
+def test_request_logs_carry_request_id(test_client, json_logs):
+    """リクエストごとにIDが割り当てられ、レスポンスヘッダーとログに付与されることのテスト"""
+    response = test_client.get("/webhook", headers={"X-API-Key": "test-api-key", "X-Request-Id": "abc123"})
+
+    assert response.headers["X-Request-Id"] == "abc123"
+    request_log = [e for e in json_logs() if e.get("stage") == "request"][-1]
+    assert request_log["request_id"] == "abc123"
+    assert request_log["status_code"] == 200
+    assert request_log["path"] == "/webhook"
+
+@pytest.mark.parametrize("fast_path", ["0", "1"])
+def test_request_duration_excludes_tasks_after_response(test_client, json_logs, monkeypatch, fast_path):
+    """レスポンス後の埋め込みの追加がリクエストの所要時間に含まれないことのテスト"""
+    import time
+    from app.services.notion_service import NotionService
+    monkeypatch.setattr(NotionService, "create_page", lambda self, data: {"id": "test-page-id"})
+    monkeypatch.setattr(NotionService, "add_tweet_url", lambda self, page_id, link: time.sleep(0.3))
+    monkeypatch.setenv("WEBHOOK_FAST_PATH", fast_path)
+    body = "___POST_FIELD_SEPARATOR___".join(["t", "u", "https://twitter.com/u/status/1", "2025-02-10T13:35:49Z"])
+
+    response = test_client.post("/webhook", content=body.encode(), headers={"X-API-Key": "test-api-key"})
+
+    assert response.status_code == 200
+    request_log = [e for e in json_logs() if e.get("stage") == "request"][-1]
+    assert request_log["duration_ms"] < 300
+
+def test_json_formatter_truncates_large_fields(json_logs):
+    """大きなフィールドが切り詰められて出力されることのテスト"""
+    logging.getLogger("test").info("Large fields", extra={"text": "x" * 5000, "data": {"text": "y" * 5000}})
+
+    entry = json_logs()[-1]
+    assert len(entry["text"]) < 1100
+    assert len(entry["data"]) < 1100
+
+def test_log_histogram_quantiles_within_relative_accuracy():
+    """対数バケットのヒストグラムの分位数が相対誤差の範囲内であることのテスト"""
+    histogram = LogHistogram(relative_accuracy=0.01)
+    for value in range(1, 10001):
+        histogram.add(float(value))
+
+    assert histogram.quantile(0.5) == pytest.approx(5000, rel=0.02)
+    assert histogram.quantile(0.99) == pytest.approx(9900, rel=0.02)
+    assert len(histogram.buckets) < 1000
+
+def test_log_report_computes_errors_and_slo_burn():
+    """例外クラスごとのエラー率と期間ごとのSLOの消費の集計のテスト"""
+    lines = [
+        json.dumps({"time": "2025-02-10T00:10:00+00:00", "stage": "request", "duration_ms": 100, "status_code": 200}),
+        json.dumps({"time": "2025-02-10T00:20:00+00:00", "stage": "request", "duration_ms": 5000, "status_code": 200}),
+        json.dumps({"time": "2025-02-10T01:10:00+00:00", "stage": "request", "duration_ms": 80, "status_code": 500,
+                    "error_class": "NotionAPIException"}),
+        json.dumps({"timestamp": "2025-02-10T01:20:00.123456789Z", "jsonPayload": {
+            "stage": "request", "duration_ms": 90, "status_code": 200}}),
+        json.dumps({"stage": "create_page", "duration_ms": 70, "error_class": "RequestTimeoutError"}),
+        "not a json line",
+    ]
+    report = LogReport(slo_target=0.9, latency_threshold_ms=3000, window_seconds=3600)
+    for entry in read_entries(lines):
+        report.add(entry)
+
+    summary = report.summary()
+    assert summary["errors"] == {"NotionAPIException": {"count": 1, "rate": 0.25}}
+    assert summary["stages"]["create_page"]["errors"] == 1
+    assert [(w["requests"], w["bad"], w["burn_rate"]) for w in summary["slo"]["windows"]] == [(2, 1, 5.0), (2, 1, 5.0)]
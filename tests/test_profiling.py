@@ -0,0 +1,155 @@
+import threading
+import pytest
+from app.profiling import StackSampler
+
+ADMIN_HEADERS = {"X-Admin-Key": "test-admin-key"}
+RAW_BODY = '''Test tweet___POST_FIELD_SEPARATOR___test_user___POST_FIELD_SEPARATOR___https://twitter.com/test_user/status/123456789___POST_FIELD_SEPARATOR___2025-02-10T13:35:49Z'''
+
+@pytest.fixture(autouse=True)
+def setup_admin_key(monkeypatch):
+    """テスト用の管理者API Keyを設定"""
+    monkeypatch.setenv("ADMIN_API_KEY", "test-admin-key")
+
+@pytest.fixture
+def mock_notion(monkeypatch):
+    """NotionServiceのメソッドをモック"""
+    from app.services.notion_service import NotionService
+    monkeypatch.setattr(NotionService, "create_page", lambda self, data: {"id": "test-page-id"})
+    monkeypatch.setattr(NotionService, "add_tweet_url", lambda self, page_id, link: {"id": page_id})
+
+def busy_app_function(stop_event):
+    while not stop_event.is_set():
+        sum(range(1000))
+
+def test_stack_sampler_returns_collapsed_stacks():
+    """スタックサンプリングがcollapsed stacks形式で結果を返すことのテスト"""
+    stop_event = threading.Event()
+    # tests/配下の関数はアプリケーションのコードではないため、app_only=Falseでサンプリングする
+    thread = threading.Thread(target=busy_app_function, args=(stop_event,))
+    thread.start()
+    try:
+        sampler = StackSampler(interval=0.001, app_only=False)
+        sampler.sample(0.1)
+    finally:
+        stop_event.set()
+        thread.join()
+
+    lines = sampler.collapsed().splitlines()
+    busy_lines = [line for line in lines if "test_profiling.py:busy_app_function" in line]
+    assert busy_lines
+    stack, count = busy_lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert stack.split(";")[-1].startswith("test_profiling.py:busy_app_function")
+
+def test_admin_endpoints_require_admin_key(test_client):
+    """管理者用エンドポイントに管理者API Keyが必要なことのテスト"""
+    response = test_client.get("/admin/profile/requests")
+    assert response.status_code == 401
+
+    response = test_client.get("/admin/profile/requests", headers={"X-Admin-Key": "invalid"})
+    assert response.status_code == 401
+
+def test_admin_endpoints_disabled_without_admin_key_env(test_client, monkeypatch):
+    """ADMIN_API_KEYが未設定の場合は管理者用エンドポイントが使えないことのテスト"""
+    monkeypatch.delenv("ADMIN_API_KEY")
+    response = test_client.get("/admin/profile/requests", headers={"X-Admin-Key": ""})
+    assert response.status_code == 401
+
+def test_cpu_profile_endpoint(test_client):
+    """CPUサンプリングエンドポイントのテスト"""
+    response = test_client.get("/admin/profile/cpu?seconds=0.05&app_only=false", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+def test_request_profiling_by_header(test_client, mock_notion):
+    """ヘッダーによるリクエスト単位のプロファイリングのテスト"""
+    headers = {
+        "X-API-Key": "test-api-key",
+        "Content-Type": "text/plain",
+        "X-Profile-Request": "1",
+        **ADMIN_HEADERS
+    }
+    response = test_client.post("/webhook", content=RAW_BODY.encode(), headers=headers)
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+
+    response = test_client.get(f"/admin/profile/requests/{profile_id}", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert "function calls" in response.text
+    assert "webhook_post" in response.text
+
+def test_request_profiling_ignored_without_admin_key(test_client, mock_notion):
+    """管理者API Keyがない場合はプロファイリングされないことのテスト"""
+    headers = {"X-API-Key": "test-api-key", "Content-Type": "text/plain", "X-Profile-Request": "1"}
+    response = test_client.post("/webhook", content=RAW_BODY.encode(), headers=headers)
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+def test_tracemalloc_top(test_client):
+    """tracemallocの上位N件取得のテスト"""
+    response = test_client.get("/admin/profile/tracemalloc/top", headers=ADMIN_HEADERS)
+    assert response.status_code == 409
+
+    response = test_client.post("/admin/profile/tracemalloc/start", headers=ADMIN_HEADERS)
+    assert response.json()["tracing"] is True
+    try:
+        data = [bytearray(1024) for _ in range(100)]
+        response = test_client.get("/admin/profile/tracemalloc/top?limit=5", headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        top = response.json()
+        assert 0 < len(top) <= 5
+        assert {"location", "size_bytes", "count"} <= set(top[0])
+    finally:
+        response = test_client.post("/admin/profile/tracemalloc/stop", headers=ADMIN_HEADERS)
+    assert response.json()["tracing"] is False
+
+def test_request_profiling_ignored_for_falsy_header(test_client, mock_notion):
+    """X-Profile-Requestヘッダーが真でない値の場合はプロファイリングされないことのテスト"""
+    headers = {
+        "X-API-Key": "test-api-key",
+        "Content-Type": "text/plain",
+        "X-Profile-Request": "0",
+        **ADMIN_HEADERS
+    }
+    response = test_client.post("/webhook", content=RAW_BODY.encode(), headers=headers)
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+def test_request_profile_excludes_other_tasks():
+    """await中に実行される他のタスクがリクエストのプロファイルに含まれないことのテスト"""
+    import asyncio
+    from app.profiling import ProfileStore, RequestProfilingMiddleware
+
+    def other_task_work():
+        return sum(range(1000))
+
+    async def other_task():
+        for _ in range(10):
+            other_task_work()
+            await asyncio.sleep(0)
+
+    def profiled_work():
+        return sum(range(1000))
+
+    async def app(scope, receive, send):
+        for _ in range(10):
+            profiled_work()
+            await asyncio.sleep(0)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def run():
+        scope = {"type": "http", "path": "/webhook", "headers": [
+            (b"x-profile-request", b"1"), (b"x-admin-key", ADMIN_HEADERS["X-Admin-Key"].encode())
+        ]}
+        async def send(message):
+            pass
+        await asyncio.gather(middleware(scope, None, send), other_task())
+
+    store = ProfileStore()
+    middleware = RequestProfilingMiddleware(app, store=store)
+    asyncio.run(run())
+
+    stats = store.get(store.list()[0]["id"])["stats"]
+    assert "profiled_work" in stats
+    assert "other_task_work" not in stats
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import tracemalloc
+import pytest
+from fastapi import Request
+from app.request_body import read_limited_body, decode_body
+
+HEADERS = {"X-API-Key": "test-api-key", "Content-Type": "text/plain"}
+
+def make_request(chunks, headers=None):
+    """チャンクに分割されたボディを返すRequestを作成"""
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {"type": "http", "method": "POST", "path": "/webhook", "headers": headers or []}
+    return Request(scope, receive)
+
+def test_webhook_rejects_large_body_by_content_length(test_client, monkeypatch):
+    """Content-Lengthが最大サイズを超える場合に413を返すことのテスト"""
+    monkeypatch.setenv("MAX_REQUEST_BODY_BYTES", "100")
+    response = test_client.post("/webhook", content=b"a" * 101, headers=HEADERS)
+    assert response.status_code == 413
+    assert response.json() == {
+        "message": "Request body is too large",
+        "details": {"max_bytes": 100}
+    }
+
+def test_webhook_rejects_large_chunked_body(test_client, monkeypatch):
+    """Content-Lengthがないボディも最大サイズを超えた時点で413を返すことのテスト"""
+    monkeypatch.setenv("MAX_REQUEST_BODY_BYTES", "100")
+    response = test_client.post("/webhook", content=iter([b"a" * 60, b"a" * 60]), headers=HEADERS)
+    assert response.status_code == 413
+
+def test_webhook_rejects_invalid_utf8(test_client):
+    """UTF-8としてデコードできないボディに422を返すことのテスト"""
+    response = test_client.post("/webhook", content=b"\xff\xfe", headers=HEADERS)
+    assert response.status_code == 422
+    assert response.json()["message"] == "Request body must be UTF-8 encoded"
+
+def test_validation_error_log_truncates_body(test_client, monkeypatch, caplog):
+    """バリデーションエラーのログでボディが切り詰められ、API Keyが出力されないことのテスト"""
+    monkeypatch.setenv("LOG_BODY_PREVIEW_BYTES", "10")
+    with caplog.at_level(logging.ERROR):
+        response = test_client.post("/webhook", content=b"x" * 500, headers=HEADERS)
+    assert response.status_code == 422
+    message = next(r.getMessage() for r in caplog.records if "Validation error occurred" in r.getMessage())
+    assert "x" * 10 + "... <truncated, 500 bytes>" in message
+    assert "x" * 11 not in message
+
+def test_request_validation_error_log_redacts_headers(test_client, caplog):
+    """リクエストバリデーションエラーのログでAPI Keyが伏せられることのテスト"""
+    with caplog.at_level(logging.ERROR):
+        response = test_client.post(
+            "/api/v1/notion/pages",
+            content=b'{"userName": "test_user"}',
+            headers={"X-API-Key": "test-api-key", "Content-Type": "application/json"}
+        )
+    assert response.status_code == 422
+    message = next(r.getMessage() for r in caplog.records if "Request validation error occurred" in r.getMessage())
+    assert "test-api-key" not in message
+    assert "Parsed JSON body: {'userName': 'test_user'}" in message
+
+def test_read_limited_body_peak_memory():
+    """ボディ読み込みとデコードのピークメモリがボディサイズの数倍に収まることのテスト"""
+    chunk_size = 64 * 1024
+    body_size = 16 * chunk_size
+    chunks = [b"a" * chunk_size for _ in range(body_size // chunk_size)]
+    request = make_request(chunks)
+
+    async def read_and_decode():
+        return decode_body(await read_limited_body(request, max_bytes=body_size))
+
+    tracemalloc.start()
+    try:
+        text = asyncio.run(read_and_decode())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(text) == body_size
+    # 読み込んだボディ（bytearrayの拡張分を含む）とデコード後の文字列の分のみ
+    assert peak < 2.5 * body_size
+
+def test_webhook_post_peak_memory(test_client, monkeypatch):
+    """Webhookリクエスト全体（読み込み、分割、Tweetの作成）のピークメモリのテスト"""
+    from app.services.notion_service import NotionService
+    monkeypatch.setattr(NotionService, "create_page", lambda self, data: {"id": "test-page-id"})
+    monkeypatch.setattr(NotionService, "add_tweet_url", lambda self, page_id, link: {"id": page_id})
+
+    separator = "___POST_FIELD_SEPARATOR___"
+    fields = ["a" * (512 * 1024), "test_user", "https://twitter.com/test_user/status/123456789", "2025-02-10T13:35:49Z"]
+    body = separator.join(fields).encode()
+    # 初回リクエストでのモジュールの読み込みなどを計測に含めないようにする
+    test_client.post("/webhook", content=b"x" + body[-200:], headers=HEADERS)
+
+    tracemalloc.start()
+    try:
+        response = test_client.post("/webhook", content=body, headers=HEADERS)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert response.status_code == 200
+    # テストクライアント側のバッファを含めても、ボディサイズの数倍に収まる
+    assert peak < 4 * len(body)
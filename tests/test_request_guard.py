@@ -0,0 +1,106 @@
+import logging
+import pytest
+from app import auth
+from app.request_guard import FailureLimiter, RejectionLog
+
+SEPARATOR = "___POST_FIELD_SEPARATOR___"
+VALID_BODY = SEPARATOR.join([
+    "test tweet", "testuser", "https://twitter.com/testuser/status/123456789", "2025-02-10T13:35:49Z"
+]).encode()
+
+@pytest.fixture
+def body_reads(monkeypatch):
+    """リクエストボディの読み込みを記録する"""
+    reads = []
+    from starlette.requests import Request
+    original = Request.stream
+    def stream(self):
+        reads.append(self.url.path)
+        return original(self)
+    monkeypatch.setattr(Request, "stream", stream)
+    return reads
+
+def test_invalid_key_is_rejected_without_reading_body(test_client, body_reads):
+    """API Keyが正しくない場合はボディを読まずに401を返すことのテスト"""
+    response = test_client.post("/webhook", content=VALID_BODY, headers={"X-API-Key": "invalid"})
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": {"message": "Invalid API Key"}}
+    assert body_reads == []
+
+def test_oversized_body_is_rejected_without_reading_body(test_client, body_reads, monkeypatch):
+    """Content-Lengthが最大サイズを超える場合はボディを読まずに413を返すことのテスト"""
+    monkeypatch.setenv("MAX_REQUEST_BODY_BYTES", "16")
+
+    response = test_client.post("/webhook", content=VALID_BODY, headers={"X-API-Key": "test-api-key"})
+
+    assert response.status_code == 413
+    assert response.json() == {"message": "Request body is too large", "details": {"max_bytes": 16}}
+    assert body_reads == []
+
+def test_repeated_failures_are_rate_limited_per_client(test_client, monkeypatch):
+    """失敗を繰り返したクライアントの失敗するリクエストが429になり、正しいリクエストは通ることのテスト"""
+    from app import request_guard
+    monkeypatch.setattr(request_guard, "_failure_limiter", FailureLimiter(limit=3, window_seconds=60))
+    attacker = {"X-Forwarded-For": "10.0.0.1, 203.0.113.5"}
+
+    statuses = [test_client.get("/webhook", headers={**attacker, "X-API-Key": "invalid"}).status_code for _ in range(4)]
+    blocked = test_client.get("/webhook", headers={**attacker, "X-API-Key": "invalid"})
+    # X-Forwarded-Forの先頭の値を変えても同じクライアントとして扱う
+    spoofed = test_client.get("/webhook", headers={"X-Forwarded-For": "10.0.0.2, 203.0.113.5", "X-API-Key": "invalid"})
+    # 同じアドレスからでも、正しいAPI Keyのリクエストは拒否しない
+    valid = test_client.get("/webhook", headers={**attacker, "X-API-Key": "test-api-key"})
+    other = test_client.get("/webhook", headers={"X-Forwarded-For": "203.0.113.6", "X-API-Key": "invalid"})
+
+    assert statuses == [401, 401, 401, 429]
+    assert blocked.status_code == 429
+    assert blocked.json() == {"detail": {"message": "Too many failed requests"}}
+    assert int(blocked.headers["Retry-After"]) >= 1
+    assert spoofed.status_code == 429
+    assert valid.status_code == 200
+    assert other.status_code == 401
+
+def test_failure_limiter_recovers_and_bounds_clients(monkeypatch):
+    """失敗の回数が時間とともに回復し、記録するクライアント数が上限を超えないことのテスト"""
+    now = [0.0]
+    monkeypatch.setattr("app.request_guard.time.monotonic", lambda: now[0])
+    limiter = FailureLimiter(limit=2, window_seconds=10, max_clients=2)
+
+    limiter.record_failure("a")
+    limiter.record_failure("a")
+    assert limiter.is_blocked("a")
+    now[0] = 5.0
+    assert not limiter.is_blocked("a")
+
+    limiter.record_failure("b")
+    limiter.record_failure("c")
+    assert len(limiter._buckets) == 2
+    assert "a" not in limiter._buckets
+
+def test_rejection_log_is_sampled(monkeypatch, caplog):
+    """拒否したリクエストのログが頻度を抑えて出力され、抑えた件数が含まれることのテスト"""
+    now = [0.0]
+    monkeypatch.setattr("app.request_guard.time.monotonic", lambda: now[0])
+    log = RejectionLog(per_second=1)
+
+    with caplog.at_level(logging.WARNING):
+        for _ in range(5):
+            log.record("invalid_api_key", "203.0.113.5", "/webhook", 401)
+        now[0] = 1.0
+        log.record("invalid_api_key", "203.0.113.5", "/webhook", 401)
+
+    records = [r for r in caplog.records if r.getMessage() == "Request rejected"]
+    assert len(records) == 2
+    assert records[1].suppressed == {"invalid_api_key": 4}
+
+def test_api_key_is_read_once(monkeypatch):
+    """API Keyは一度だけ読み込まれ、set_api_keyで変更できることのテスト"""
+    assert auth.is_valid_api_key(b"test-api-key")
+    monkeypatch.setenv("WEBHOOK_API_KEY", "rotated-key")
+    assert auth.is_valid_api_key("test-api-key")
+
+    auth.set_api_key()
+    assert not auth.is_valid_api_key("test-api-key")
+    assert auth.is_valid_api_key("rotated-key")
+    auth.set_api_key("")
+    assert not auth.is_valid_api_key("")
@@ -0,0 +1,68 @@
+import pytest
+from app.exceptions import NotionAPIException
+
+SEPARATOR = "___POST_FIELD_SEPARATOR___"
+VALID_BODY = SEPARATOR.join([
+    "test tweet", "testuser", "https://twitter.com/testuser/status/123456789", "2025-02-10T13:35:49Z"
+]).encode()
+HEADERS = {"X-API-Key": "test-api-key", "Content-Type": "text/plain"}
+
+@pytest.fixture
+def mock_notion(monkeypatch):
+    """NotionServiceのメソッドをモック"""
+    from app.services.notion_service import NotionService
+    monkeypatch.setattr(NotionService, "create_page", lambda self, data: {"id": "test-page-id"})
+    monkeypatch.setattr(NotionService, "add_tweet_url", lambda self, page_id, link: {"id": page_id})
+
+def post_both(test_client, monkeypatch, **kwargs):
+    """FastAPIのルートと高速パスに同じリクエストを送信し、両方のレスポンスを返す"""
+    monkeypatch.delenv("WEBHOOK_FAST_PATH", raising=False)
+    route = test_client.post("/webhook", **kwargs)
+    monkeypatch.setenv("WEBHOOK_FAST_PATH", "1")
+    fast = test_client.post("/webhook", **kwargs)
+    return route, fast
+
+@pytest.mark.parametrize("body, headers", [
+    (VALID_BODY, HEADERS),
+    (VALID_BODY, {"Content-Type": "text/plain"}),
+    (VALID_BODY, {"X-API-Key": "invalid", "Content-Type": "text/plain"}),
+    (b"only one field", HEADERS),
+    (VALID_BODY.replace(b"2025-02-10T13:35:49Z", b"invalid-date"), HEADERS),
+    (SEPARATOR.join(["", "u", "l", "2025-02-10T13:35:49Z"]).encode(), HEADERS),
+    (b"\xff\xfe", HEADERS),
+    (b"x" * 2048, {**HEADERS, "Content-Length": "2048"}),
+])
+def test_fast_path_matches_route(test_client, monkeypatch, mock_notion, body, headers):
+    """高速パスのレスポンスがFastAPIのルートと同じであることのテスト"""
+    monkeypatch.setenv("MAX_REQUEST_BODY_BYTES", "1024")
+
+    route, fast = post_both(test_client, monkeypatch, content=body, headers=headers)
+
+    assert fast.status_code == route.status_code
+    assert fast.json() == route.json()
+
+def test_fast_path_notion_error_stores_dead_letter(test_client, monkeypatch, dead_letter_store):
+    """高速パスでもNotion APIのエラーがデッドレターに保存されることのテスト"""
+    def fail(self, data):
+        raise NotionAPIException("Failed to create Notion page", details={"api": "error", "error_type": "timeout"})
+    from app.services.notion_service import NotionService
+    monkeypatch.setattr(NotionService, "create_page", fail)
+
+    route, fast = post_both(test_client, monkeypatch, content=VALID_BODY, headers=HEADERS)
+
+    assert fast.status_code == route.status_code == 500
+    assert fast.json() == route.json()
+    assert len(dead_letter_store.list()) == 2
+
+def test_fast_path_defers_embed_after_response(test_client, monkeypatch):
+    """高速パスでも埋め込みをレスポンス後に追加することのテスト"""
+    embedded = []
+    from app.services.notion_service import NotionService
+    monkeypatch.setattr(NotionService, "create_page", lambda self, data: {"id": "test-page-id"})
+    monkeypatch.setattr(NotionService, "add_tweet_url", lambda self, page_id, link: embedded.append(page_id))
+    monkeypatch.setenv("WEBHOOK_FAST_PATH", "1")
+
+    response = test_client.post("/webhook", content=VALID_BODY, headers=HEADERS)
+
+    assert response.json() == {"id": "test-page-id"}
+    assert embedded == ["test-page-id"]